@@ -0,0 +1,88 @@
+"""Synthetic monday.com GraphQL server for offline benchmarks.
+
+Builds on the tests' FakeMondayServer. Items are generated on the fly from
+their index, so very large boards cost no memory on the server side. Item
+``i`` of a board is always the same.
+"""
+import json
+import random
+
+from tests.unit.fake_monday import FakeMondayServer
+
+DEFAULT_TYPE_MIX = {"text": 40, "numbers": 20, "status": 15, "date": 10, "people": 10, "timeline": 5}
+
+
+def parse_type_mix(spec):
+    """Parse ``"text=40,numbers=20"`` into ``{"text": 40, "numbers": 20}``."""
+    mix = {}
+    for part in spec.split(","):
+        column_type, _, weight = part.partition("=")
+        mix[column_type.strip()] = int(weight or 1)
+    return mix
+
+
+def synthetic_columns(column_count, type_mix, seed=0):
+    rng = random.Random(seed)
+    types = rng.choices(list(type_mix), weights=list(type_mix.values()), k=column_count)
+    return [
+        {"id": f"col_{c}", "title": f"Column {c}", "type": column_type}
+        for c, column_type in enumerate(types)
+    ]
+
+
+def synthetic_cell(column_type, i):
+    if column_type == "numbers":
+        return f'"{i * 1.5}"', str(i * 1.5)
+    if column_type == "status":
+        label = ("Working on it", "Done", "Stuck")[i % 3]
+        return json.dumps({"index": i % 3, "post_id": None}), label
+    if column_type == "date":
+        day = f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}"
+        return json.dumps({"date": day, "time": "10:00:00"}), f"{day} 10:00"
+    if column_type == "people":
+        return json.dumps({"personsAndTeams": [{"id": 1000 + i % 50, "kind": "person"}]}), f"User {i % 50}"
+    if column_type == "timeline":
+        return json.dumps({"from": "2024-01-01", "to": f"2024-02-{i % 28 + 1:02d}"}), "Jan 1 - Feb"
+    return json.dumps(f"value {i}"), f"value {i}"
+
+
+def synthetic_item(board_id, columns, i):
+    column_values = []
+    for column in columns:
+        value, text = synthetic_cell(column["type"], i)
+        column_values.append({"id": column["id"], "text": text, "type": column["type"], "value": value})
+    return {
+        "id": f"{board_id}{i:09d}",
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": f"2024-03-{i % 28 + 1:02d}T00:00:00Z",
+        "name": f"Item {i}",
+        "board": {"id": board_id},
+        "column_values": column_values,
+    }
+
+
+class SyntheticMondayServer(FakeMondayServer):
+    """FakeMondayServer whose boards share synthetic columns and generate their items per page.
+
+    Pages hold at most ``page_size`` items, whatever ``limit`` the client asks for.
+    """
+
+    def __init__(self, board_ids, item_count, column_count, type_mix=None, latency=0.0, seed=0, page_size=None):
+        self.item_count = item_count
+        self.columns = synthetic_columns(column_count, type_mix or DEFAULT_TYPE_MIX, seed)
+        self.page_size = page_size
+        boards = {
+            board_id: {"columns": self.columns, "items": None, "groups": [{"id": "topics", "title": "topics"}]}
+            for board_id in board_ids
+        }
+        super().__init__(boards, latency=latency)
+
+    def _page(self, board_id, offset, limit, key=""):
+        if key:
+            raise ValueError("synthetic boards can't be filtered")
+        if self.page_size:
+            limit = min(limit, self.page_size)
+        end = min(offset + limit, self.item_count)
+        cursor = f"{board_id}::{end}" if end < self.item_count else None
+        items = [synthetic_item(board_id, self.columns, i) for i in range(offset, end)]
+        return {"cursor": cursor, "items": items}
@@ -0,0 +1,79 @@
+"""Micro-benchmark: per-cell linear column scan vs. ColumnarBuilder.
+
+    python benchmarks/flatten_benchmark.py [--items 50000] [--columns 100]
+
+The legacy flattening is O(items x values x columns), so by default it is
+timed on a subset of the items and extrapolated linearly to the full board.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from normalize import ColumnarBuilder  # noqa: E402
+
+
+def synthetic_board(item_count, column_count):
+    columns = [{"id": f"col_{c}", "title": f"Column {c}"} for c in range(column_count)]
+    items = [
+        {
+            "id": str(i),
+            "created_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z",
+            "name": f"Item {i}",
+            "board": {"id": "1"},
+            "column_values": [
+                {"id": column["id"], "text": str(i), "type": "text", "value": f'"{i}"'}
+                for column in columns
+            ],
+        }
+        for i in range(item_count)
+    ]
+    return columns, items
+
+
+def legacy_flatten(data_columns, items):
+    normalized_data = []
+    columns_lambda = lambda id : [column for column in data_columns if column['id'] == id][0]['title']
+    for item in items:
+        flattened_item = {
+            columns_lambda(i['id']):i['value'] for i in item['column_values']
+        }
+        flattened_item['id'] = item['id']
+        flattened_item['created_at'] = item['created_at']
+        flattened_item['name'] = item['name']
+        flattened_item['board'] = item['board']
+        normalized_data.append(flattened_item)
+    return normalized_data
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--columns", type=int, default=100)
+    parser.add_argument("--legacy-items", type=int, default=2_000,
+                        help="items to time the legacy path on before extrapolating")
+    args = parser.parse_args()
+
+    columns, items = synthetic_board(args.items, args.columns)
+    legacy_items = items[:min(args.legacy_items, args.items)]
+
+    legacy = timed(legacy_flatten, columns, legacy_items) * args.items / len(legacy_items)
+    columnar = timed(lambda: ColumnarBuilder(columns).extend(items).to_table())
+
+    print(f"board: {args.items} items x {args.columns} columns")
+    print(f"legacy linear scan : {legacy:8.2f}s (extrapolated from {len(legacy_items)} items)")
+    print(f"columnar builder   : {columnar:8.2f}s")
+    print(f"speedup            : {legacy / columnar:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Offline benchmark of the extract -> normalize -> write pipeline.
+
+Runs src/mondays.py's extraction against a local synthetic GraphQL server
+and writes to a moto-backed S3. Reports throughput, peak RSS and per-stage
+timings as JSON:
+
+    python benchmarks/pipeline_benchmark.py --boards 3 --items 20000 --columns 50 \\
+        --types text=40,numbers=20,status=15,date=10,people=10,timeline=5 \\
+        --page-size 500 --latency 0.02 --output bench.json
+
+    # fail if any stage got more than 20% slower than a previous run
+    python benchmarks/pipeline_benchmark.py ... --compare bench.json --max-regression 0.2
+
+The job's own code does the work: mondays.extract_boards fetches and
+decodes the boards and layout.write_partitioned streams the Parquet files
+to S3. Stage timings come from the job's metrics. Fetch and decode (which
+includes flattening) are summed across worker threads; write covers
+encoding and uploading, which overlap.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import boto3  # noqa: E402
+import pyarrow as pa  # noqa: E402
+from moto import mock_aws  # noqa: E402
+
+import mondays  # noqa: E402
+from fake_monday_server import DEFAULT_TYPE_MIX, SyntheticMondayServer, parse_type_mix  # noqa: E402
+from layout import ParquetOptions, write_partitioned  # noqa: E402
+from metrics import metrics, peak_rss_mb  # noqa: E402
+from monday_client import MondayClient  # noqa: E402
+from normalize import combine_tables, page_pool  # noqa: E402
+
+BUCKET = "benchmark-bucket"
+STAGES = ["fetch", "decode", "combine", "write"]
+
+
+def stage_seconds(stage):
+    return metrics.total("StageSeconds", Stage=stage)
+
+
+def run(args):
+    board_ids = [str(100 + b) for b in range(args.boards)]
+    type_mix = parse_type_mix(args.types) if args.types else DEFAULT_TYPE_MIX
+    options = ParquetOptions(compression=args.compression, row_group_size=args.row_group_size)
+    metrics.reset()
+
+    with SyntheticMondayServer(board_ids, args.items, args.columns, type_mix, args.latency,
+                               page_size=args.page_size) as server, \
+            MondayClient(server.url, "benchmark", pool_size=args.workers) as client, \
+            page_pool(args.encode_workers) as pool, \
+            mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET)
+
+        wall_start = time.perf_counter()
+        tables, failures = mondays.extract_boards(client, board_ids, args.workers, pool=pool)
+        if failures:
+            raise RuntimeError(f"Boards failed: {failures}")
+
+        now = datetime.now(timezone.utc)
+        with metrics.stage("combine", log=False):
+            table = combine_tables(list(tables.values()), now)
+        del tables
+
+        write_partitioned(table, f"s3://{BUCKET}/monday.com/items/", now.strftime("%Y-%m-%d"), "bench",
+                          options, s3_client)
+        wall = time.perf_counter() - wall_start
+
+    fetch = stage_seconds("fetch")
+    stages = {
+        "fetch": fetch,
+        # Whatever extraction time was not spent fetching was spent flattening and decoding.
+        "decode": max(0.0, stage_seconds("extract") - fetch),
+        "combine": stage_seconds("combine"),
+        "write": stage_seconds("write"),
+    }
+    items = table.num_rows
+    return {
+        "params": vars(args) | {"type_mix": type_mix},
+        "items": items,
+        "columns": table.num_columns,
+        "parquet_bytes": int(metrics.total("BytesWritten")),
+        "files": int(metrics.total("FilesWritten")),
+        "requests": len(server.requests),
+        "response_bytes": server.bytes_sent,
+        "wall_seconds": round(wall, 4),
+        "items_per_second": round(items / wall, 1) if wall else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": {stage: round(seconds, 4) for stage, seconds in stages.items()},
+        "environment": {
+            "python": platform.python_version(),
+            "pyarrow": pa.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+    }
+
+
+def compare(result, baseline, max_regression):
+    """Return human-readable regressions of ``result`` against ``baseline``."""
+    regressions = []
+    for stage in STAGES + ["wall_seconds"]:
+        old = baseline["stages"].get(stage) if stage in STAGES else baseline.get(stage)
+        new = result["stages"][stage] if stage in STAGES else result[stage]
+        if old and new > old * (1 + max_regression):
+            regressions.append(f"{stage}: {old:.3f}s -> {new:.3f}s")
+    if result["items_per_second"] < baseline["items_per_second"] * (1 - max_regression):
+        regressions.append(f"items/s: {baseline['items_per_second']} -> {result['items_per_second']}")
+    if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + max_regression):
+        regressions.append(f"peak RSS: {baseline['peak_rss_mb']}MB -> {result['peak_rss_mb']}MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, default=3)
+    parser.add_argument("--items", type=int, default=10_000, help="items per board")
+    parser.add_argument("--columns", type=int, default=50)
+    parser.add_argument("--types", default="", help="column type mix, e.g. text=40,numbers=20,date=10")
+    parser.add_argument("--page-size", type=int, default=mondays.PAGE_LIMIT, help="most items the server returns per page")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every API response")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--encode-workers", type=int, default=0, help="processes decoding pages (0: decode in-thread)")
+    parser.add_argument("--compression", default="snappy")
+    parser.add_argument("--row-group-size", type=int, default=100_000)
+    parser.add_argument("--output", help="write the JSON result here as well as to stdout")
+    parser.add_argument("--compare", help="baseline JSON result to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    result = run(args)
+    output = json.dumps(result, indent=2, default=str)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if baseline:
+        regressions = compare(result, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+from dataclasses import dataclass
+
 from aws_cdk import (
                      aws_ec2 as ec2, 
                      aws_batch as batch,
@@ -9,41 +11,159 @@ from aws_cdk import (
                      )
 from constructs import Construct
 
+DEFAULT_PROFILE = "default"
+
+# A retried attempt resumes from the job's checkpoint, so retrying is cheap
+# when Fargate reclaims a Spot task or an image pull fails. A task killed for
+# running out of memory would only run out again at the same size. Any other
+# failure is retried until the job's attempts are used up.
+RETRY_STRATEGIES = [
+    batch.RetryStrategy.of(batch.Action.RETRY, batch.Reason.custom(on_status_reason="Your Spot Task was interrupted*")),
+    batch.RetryStrategy.of(batch.Action.RETRY, batch.Reason.CANNOT_PULL_CONTAINER),
+    batch.RetryStrategy.of(batch.Action.EXIT, batch.Reason.custom(on_reason="OutOfMemoryError*")),
+]
+
+
+@dataclass(frozen=True)
+class JobProfile:
+    """Fargate resources for one child of the extraction job.
+
+    ``ephemeral_storage_gib`` (21 to 200) raises the task's local disk above
+    Fargate's default 20 GiB, for boards whose pages spill to disk.
+    """
+    cpu: float = 0.25
+    memory_mib: int = 512
+    ephemeral_storage_gib: int = None
+
+
 class BatchWithFargate(Construct):
-    def __init__(self, scope: Construct, id: str, ecrRepo, **kwargs) -> None:
+    """Runs the monday.com extraction on Fargate whenever a new image is pushed.
+
+    With ``board_ids`` the job is submitted as an array job with one child per
+    board, each sized by ``cpu``, ``memory_mib`` and ``ephemeral_storage_gib``,
+    and a finalize job publishes the run manifest once every child has
+    finished. ``shards`` maps a board id to ``(mode, count)`` to split that
+    board across ``count`` children (see src/sharding.py). With
+    ``schema_precheck`` the job adds partitions to the Glue catalog itself
+    whenever its output schema is unchanged, instead of writing where the
+    crawler is watching.
+
+    ``profiles`` names further ``JobProfile``s and ``board_profiles`` maps a
+    board id to one of them. An array child can't be sized apart from its
+    siblings, so each profile gets its own job definition, array job and
+    finalize job, with its own checkpoint, manifest and watermark paths.
+    Boards without a profile run in the default one. Given ``bucket_name``,
+    every job writes to that bucket.
+
+    The job queue places jobs on Fargate Spot first, up to ``spot_max_vcpus``,
+    and on on-demand Fargate, up to ``on_demand_max_vcpus``, beyond that.
+    Without ``spot`` only the on-demand environment is created.
+    """
+
+    def __init__(self, scope: Construct, id: str, ecrRepo, board_ids=None, shards=None,
+                 cpu=0.25, memory_mib=512, ephemeral_storage_gib=None, profiles=None, board_profiles=None,
+                 spot=True, spot_max_vcpus=16, on_demand_max_vcpus=16, retry_attempts=3,
+                 schema_precheck=False, bucket_name=None, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
+        self.board_ids = list(board_ids or [])
+        self.shards = dict(shards or {})
+        self.schema_precheck = schema_precheck
+        self.bucket_name = bucket_name
+        self.retry_attempts = retry_attempts
+        self.profiles = {DEFAULT_PROFILE: JobProfile(cpu, memory_mib, ephemeral_storage_gib), **(profiles or {})}
+        self.profile_boards = self.__group_boards__(dict(board_profiles or {}))
 
         # Create AWS Batch Job Queue
         self.batch_queue = batch.JobQueue(self, "JobQueue")
 
-        self.__create_batch_compute_environments__(3)
+        self.__create_batch_compute_environments__(spot, spot_max_vcpus, on_demand_max_vcpus)
+
+        self.__create_task_roles__()
 
-        # Create Job Definition to submit job in batch job queue.
-        self.batch_jobDef = self.__create_batch_job_definition_(ecrRepo)
+        # Create one Job Definition per profile to submit jobs in the batch job queue.
+        self.job_definitions = {
+            profile: self.__create_batch_job_definition_(ecrRepo, profile) for profile in self.profile_boards
+        }
+        self.batch_jobDef = self.job_definitions[next(iter(self.profile_boards))]
 
         self.__create_batch_job_on_push__(ecrRepo)
 
+        self.finalize_job_definitions = {}
+        for profile, board_ids in self.profile_boards.items():
+            if self.array_size(board_ids):
+                self.finalize_job_definitions[profile] = self.__create_finalize_job_definition__(ecrRepo, profile)
+                self.__create_finalize_on_array_completion__(profile)
+
         self.__output__()
 
-    def __create_batch_compute_environments__(self, count: int):
+    def __group_boards__(self, board_profiles):
+        unknown = set(board_profiles.values()) - set(self.profiles)
+        if unknown:
+            raise ValueError(f"board_profiles refers to unknown profiles {sorted(unknown)}")
+        groups = {}
+        for board_id in self.board_ids:
+            groups.setdefault(board_profiles.get(board_id, DEFAULT_PROFILE), []).append(board_id)
+        # The push rule takes at most five targets, one per profile.
+        if len(groups) > 5:
+            raise ValueError(f"At most 5 profiles can have boards, got {len(groups)}")
+        return groups or {DEFAULT_PROFILE: []}
+
+    def array_size(self, board_ids):
+        # One child per board slice; AWS Batch array jobs need at least two.
+        size = sum(self.shards.get(board_id, (None, 1))[1] for board_id in board_ids)
+        return size if size > 1 else None
+
+    def job_environment(self, profile=DEFAULT_PROFILE):
+        board_ids = self.profile_boards.get(profile, [])
+        environment = {}
+        if self.bucket_name:
+            environment["MONDAY_BUCKET"] = self.bucket_name
+        if board_ids:
+            environment["MONDAY_BOARD_IDS"] = ",".join(board_ids)
+        shards = {board_id: shard for board_id, shard in self.shards.items() if board_id in board_ids}
+        if shards:
+            environment["MONDAY_SHARDS"] = ",".join(
+                f"{board_id}={mode}:{count}" for board_id, (mode, count) in shards.items()
+            )
+        if self.schema_precheck:
+            environment["MONDAY_SCHEMA_PRECHECK"] = "1"
+        if profile != DEFAULT_PROFILE:
+            # Children of different array jobs share array indexes and run
+            # concurrently, so each profile keeps its job state apart.
+            environment["MONDAY_CHECKPOINT_PREFIX"] = f"_job_state/monday.com/{profile}/checkpoint/"
+            environment["MONDAY_MANIFEST_PREFIX"] = f"_job_state/monday.com/{profile}/manifests/"
+            environment["MONDAY_STATE_PREFIX"] = f"_job_state/monday.com/{profile}/"
+        return environment or None
+
+    def __create_batch_compute_environments__(self, spot, spot_max_vcpus, on_demand_max_vcpus):
 
         # This resource alone will create a private/public subnet in each AZ as well as nat/internet gateway(s)
         vpc = ec2.Vpc(self, "VPC")
+        vpc_subnets = ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)
 
-        # For loop to create Batch Compute Environments
-        for i in range(count):
-            name = "MyFargateEnv" + str(i)
-            fargate_spot_environment = batch.FargateComputeEnvironment(self, name,
-                vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
-                vpc=vpc
+        # The queue tries its environments in order, so Spot capacity is used first.
+        order = 1
+        if spot:
+            fargate_spot_environment = batch.FargateComputeEnvironment(self, "FargateSpotEnv",
+                vpc_subnets=vpc_subnets,
+                vpc=vpc,
+                spot=True,
+                maxv_cpus=spot_max_vcpus
             )
+            self.batch_queue.add_compute_environment(fargate_spot_environment, order)
+            order += 1
+
+        fargate_environment = batch.FargateComputeEnvironment(self, "FargateEnv",
+            vpc_subnets=vpc_subnets,
+            vpc=vpc,
+            maxv_cpus=on_demand_max_vcpus
+        )
+        self.batch_queue.add_compute_environment(fargate_environment, order)
+
+    def __create_task_roles__(self):
 
-            self.batch_queue.add_compute_environment(fargate_spot_environment, i)
-    
-    def __create_batch_job_definition_(self, ecrRepo) -> batch.EcsJobDefinition:
-        
         # Task execution IAM role for Fargate
-        task_execution_role = iam.Role(
+        self.task_execution_role = iam.Role(
             self, 
             "TaskExecutionRole",
             assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com"),
@@ -52,28 +172,69 @@ class BatchWithFargate(Construct):
             ]
         )
 
-        task_role = iam.Role(
+        self.task_role = iam.Role(
             self,
             "TaskRole",
             assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com"),
             managed_policies=[
                 iam.ManagedPolicy.from_aws_managed_policy_name("AmazonS3FullAccess"),
-                iam.ManagedPolicy.from_aws_managed_policy_name("SecretsManagerReadWrite")
+                iam.ManagedPolicy.from_aws_managed_policy_name("SecretsManagerReadWrite"),
+                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonSSMReadOnlyAccess")
             ]
         )
+        if self.schema_precheck:
+            self.task_role.add_to_policy(iam.PolicyStatement(
+                actions=["glue:GetTable", "glue:BatchCreatePartition", "glue:BatchUpdatePartition"],
+                resources=["*"]
+            ))
+
+    def __construct_id__(self, profile, default_id, profile_id):
+        # The default profile keeps the construct ids it had before profiles existed.
+        return default_id if profile == DEFAULT_PROFILE else profile_id
+
+    def __create_batch_job_definition_(self, ecrRepo, profile) -> batch.EcsJobDefinition:
+        resources = self.profiles[profile]
+        ephemeral_storage = resources.ephemeral_storage_gib
         
+        # The job checkpoints its progress, so a retried attempt (for example
+        # after a Spot interruption) resumes instead of starting over.
         return batch.EcsJobDefinition(
             self, 
-            "MyJobDef",
+            self.__construct_id__(profile, "MyJobDef", f"{profile}JobDef"),
+            retry_attempts=self.retry_attempts,
+            retry_strategies=RETRY_STRATEGIES,
             container=batch.EcsFargateContainerDefinition(
                 self,
-                "FargateCDKJobDef",
+                self.__construct_id__(profile, "FargateCDKJobDef", f"Fargate{profile}JobDef"),
                 image=ecs.ContainerImage.from_ecr_repository(ecrRepo),
                 command=["python", "mondays.py"],
+                memory=Size.mebibytes(resources.memory_mib),
+                cpu=resources.cpu,
+                ephemeral_storage_size=Size.gibibytes(ephemeral_storage) if ephemeral_storage else None,
+                environment=self.job_environment(profile),
+                execution_role=self.task_execution_role,
+                job_role=self.task_role,
+            )
+        )
+
+    def __create_finalize_job_definition__(self, ecrRepo, profile) -> batch.EcsJobDefinition:
+        # Ref::runId is replaced by the parent array job id passed in by the completion rule.
+        return batch.EcsJobDefinition(
+            self,
+            self.__construct_id__(profile, "FinalizeJobDef", f"{profile}FinalizeJobDef"),
+            retry_attempts=self.retry_attempts,
+            retry_strategies=RETRY_STRATEGIES,
+            parameters={"runId": "none"},
+            container=batch.EcsFargateContainerDefinition(
+                self,
+                self.__construct_id__(profile, "FargateFinalizeJobDef", f"Fargate{profile}FinalizeJobDef"),
+                image=ecs.ContainerImage.from_ecr_repository(ecrRepo),
+                command=["python", "mondays.py", "finalize", "Ref::runId"],
                 memory=Size.mebibytes(512),
                 cpu=0.25,
-                execution_role=task_execution_role,
-                job_role=task_role,
+                environment=self.job_environment(profile),
+                execution_role=self.task_execution_role,
+                job_role=self.task_role,
             )
         )
     
@@ -92,11 +253,45 @@ class BatchWithFargate(Construct):
             self, "ECR to Batch Rule",
             description="Trigger a Batch job on push to ECR",
             event_pattern=event_pattern,
+            targets=[
+                events_targets.BatchJob(
+                    job_queue_arn=self.batch_queue.job_queue_arn,
+                    job_queue_scope=self.batch_queue,
+                    job_definition_arn=job_definition.job_definition_arn,
+                    job_definition_scope=job_definition,
+                    size=self.array_size(self.profile_boards[profile])
+                )
+                for profile, job_definition in self.job_definitions.items()
+            ])
+
+    def __create_finalize_on_array_completion__(self, profile):
+        job_definition = self.job_definitions[profile]
+        finalize_job_definition = self.finalize_job_definitions[profile]
+        # Only the parent of an array job carries arrayProperties.size; its
+        # state changes once every child has succeeded or one has failed for good.
+        event_pattern = events.EventPattern(
+            source=["aws.batch"],
+            detail_type=["Batch Job State Change"],
+            detail={
+                "status": ["SUCCEEDED", "FAILED"],
+                "jobQueue": [self.batch_queue.job_queue_arn],
+                "jobDefinition": [job_definition.job_definition_arn],
+                "arrayProperties": {"size": [{"exists": True}]}
+            }
+        )
+
+        events.Rule(
+            self, self.__construct_id__(profile, "Array Job Finalize Rule", f"{profile} Array Job Finalize Rule"),
+            description="Publish the run manifest once every board of an array job has finished",
+            event_pattern=event_pattern,
             targets=[events_targets.BatchJob(
                 job_queue_arn=self.batch_queue.job_queue_arn,
                 job_queue_scope=self.batch_queue,
-                job_definition_arn=self.batch_jobDef.job_definition_arn,
-                job_definition_scope=self.batch_jobDef
+                job_definition_arn=finalize_job_definition.job_definition_arn,
+                job_definition_scope=finalize_job_definition,
+                event=events.RuleTargetInput.from_object({
+                    "Parameters": {"runId": events.EventField.from_path("$.detail.jobId")}
+                })
             )])
 
     def __output__(self):
@@ -6,12 +6,12 @@ from aws_cdk import (
                      aws_lambda as _lambda,
                      aws_events as events,
                      aws_events_targets as event_targets,
-                     App, Stack, RemovalPolicy
+                     App, Duration, Stack, RemovalPolicy
                      )
 from constructs import Construct
 
 from cdk_batch_s3_glue_test.pipeline import Pipeline
-from cdk_batch_s3_glue_test.batch_with_fargate import BatchWithFargate
+from cdk_batch_s3_glue_test.batch_with_fargate import BatchWithFargate, JobProfile
 from cdk_batch_s3_glue_test.glue_workflow import GlueWorkflow
 
 from utils.constants import (
@@ -19,7 +19,27 @@ from utils.constants import (
     S3_BUCKET_NAME,
     SNS_TOPIC,
     LAMBDA_NAME,
-    LAMBDA_IAM_ROLE
+    LAMBDA_IAM_ROLE,
+    MONDAY_BOARD_IDS,
+    MONDAY_SHARDS,
+    MONDAY_SCHEMA_PRECHECK,
+    MONDAY_BOARD_PROFILES,
+    BATCH_JOB_CPU,
+    BATCH_JOB_MEMORY_MIB,
+    BATCH_JOB_EPHEMERAL_STORAGE_GIB,
+    BATCH_JOB_PROFILES,
+    BATCH_USE_SPOT,
+    BATCH_SPOT_MAX_VCPUS,
+    BATCH_ON_DEMAND_MAX_VCPUS,
+    BATCH_RETRY_ATTEMPTS,
+    GLUE_CRAWL_PREFIXES,
+    GLUE_CRAWLER_EXCLUSIONS,
+    GLUE_CRAWLER_SAMPLE_SIZE,
+    GLUE_EVENT_BATCH_SIZE,
+    GLUE_EVENT_BATCH_WINDOW_SECONDS,
+    SCHEMA_DIGEST_MINUTES,
+    SCHEMA_REGISTRY_PREFIX,
+    SCHEMA_REPORT_PREFIX
 )
 
 class CdkBatchS3GlueTestStack(Stack):
@@ -57,10 +77,16 @@ class CdkBatchS3GlueTestStack(Stack):
             code=_lambda.Code.from_asset('lambda'),
             handler='schema_change.lambda_handler',
             environment={
-                'SNS_TOPIC': SNS_TOPIC
+                'SNS_TOPIC': sns_topic.topic_arn,
+                'REPORT_BUCKET': bucket.bucket_name,
+                'REPORT_PREFIX': SCHEMA_REPORT_PREFIX,
+                'DIGEST_SECONDS': str(SCHEMA_DIGEST_MINUTES * 60),
+                'SCHEMA_REGISTRY_PREFIX': SCHEMA_REGISTRY_PREFIX
             },
             role=lambda_role
         )
+        # Oversized reports, reports waiting for a digest and the schema registry are kept in the bucket.
+        bucket.grant_read_write(__lambda)
 
         # __lambda.add_to_role_policy(lambda_role)
         event_pattern = events.EventPattern(
@@ -79,6 +105,13 @@ class CdkBatchS3GlueTestStack(Stack):
         lambda_trigger_rule.add_target(
             event_targets.LambdaFunction(__lambda)
         )
+        if SCHEMA_DIGEST_MINUTES:
+            events.Rule(
+                self, "Schema change digest Rule",
+                description="Publish schema change digests even when no further crawl runs",
+                schedule=events.Schedule.rate(Duration.minutes(SCHEMA_DIGEST_MINUTES)),
+                targets=[event_targets.LambdaFunction(__lambda)]
+            )
 
         pipeline = Pipeline(
             self,
@@ -89,13 +122,31 @@ class CdkBatchS3GlueTestStack(Stack):
         batch = BatchWithFargate(
             self, 
             id="TestJob", 
-            ecrRepo=ecrRepo
+            ecrRepo=ecrRepo,
+            board_ids=MONDAY_BOARD_IDS,
+            shards=MONDAY_SHARDS,
+            cpu=BATCH_JOB_CPU,
+            memory_mib=BATCH_JOB_MEMORY_MIB,
+            ephemeral_storage_gib=BATCH_JOB_EPHEMERAL_STORAGE_GIB,
+            profiles={name: JobProfile(*profile) for name, profile in BATCH_JOB_PROFILES.items()},
+            board_profiles=MONDAY_BOARD_PROFILES,
+            spot=BATCH_USE_SPOT,
+            spot_max_vcpus=BATCH_SPOT_MAX_VCPUS,
+            on_demand_max_vcpus=BATCH_ON_DEMAND_MAX_VCPUS,
+            retry_attempts=BATCH_RETRY_ATTEMPTS,
+            schema_precheck=MONDAY_SCHEMA_PRECHECK,
+            bucket_name=S3_BUCKET_NAME
         )
 
         glue_workflow = GlueWorkflow(
             self,
             id="TestWorkflow",
-            s3_bucket=bucket
+            s3_bucket=bucket,
+            crawl_prefixes=GLUE_CRAWL_PREFIXES,
+            event_batch_size=GLUE_EVENT_BATCH_SIZE,
+            event_batch_window=GLUE_EVENT_BATCH_WINDOW_SECONDS,
+            sample_size=GLUE_CRAWLER_SAMPLE_SIZE,
+            exclusions=GLUE_CRAWLER_EXCLUSIONS
         )
 
 app = App()
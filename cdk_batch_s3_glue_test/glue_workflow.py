@@ -9,13 +9,48 @@ from aws_cdk import (
                      Aws, CfnOutput
                      )
 from constructs import Construct
+import json
 
 class GlueWorkflow(Construct):
-    def __init__(self, scope: Construct, id: str, s3_bucket, **kwargs) -> None:
+    """Crawls new objects under ``crawl_prefixes`` of the bucket.
+
+    Only objects created under those prefixes reach the crawler's event
+    queue and start the workflow. Anything else written to the bucket, such
+    as job state or output the batch job registered in the catalog itself,
+    never triggers a crawl. Without ``crawl_prefixes`` every new object does.
+    Each prefix is its own crawler target, so its tables are named after it.
+
+    The workflow trigger waits for ``event_batch_size`` objects or
+    ``event_batch_window`` seconds, whichever comes first. A batch run that
+    writes many files therefore starts one crawl rather than many.
+    The crawler's settings are:
+
+    * ``combine_compatible_schemas``: one table per target, even if
+      partitions have slightly different columns.
+    * ``table_level``: the depth of the folder the tables are created at.
+    * ``sample_size``: how many files per leaf folder are read.
+    * ``exclusions``: glob patterns left out of every target.
+    """
+
+    def __init__(self, scope: Construct, id: str, s3_bucket, crawl_prefixes=None,
+                 event_batch_size=100, event_batch_window=900, combine_compatible_schemas=True,
+                 table_level=None, sample_size=None, exclusions=None, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
+        self.crawl_prefixes = list(crawl_prefixes or [])
+        self.event_batch_size = event_batch_size
+        self.event_batch_window = event_batch_window
+        self.combine_compatible_schemas = combine_compatible_schemas
+        self.table_level = table_level
+        self.sample_size = sample_size
+        self.exclusions = list(exclusions or [])
 
         self.glue_queue = sqs.Queue(self, 'test_glue_queue')
-        s3_bucket.add_event_notification(s3.EventType.OBJECT_CREATED, s3_notifications.SqsDestination(self.glue_queue))
+        destination = s3_notifications.SqsDestination(self.glue_queue)
+        if self.crawl_prefixes:
+            for prefix in self.crawl_prefixes:
+                s3_bucket.add_event_notification(s3.EventType.OBJECT_CREATED, destination, s3.NotificationKeyFilter(prefix=prefix))
+        else:
+            s3_bucket.add_event_notification(s3.EventType.OBJECT_CREATED, destination)
 
         self.glue_crawler = self.__create_glue_architecture__(s3_bucket)
         self.__create_glue_workflow__(s3_bucket)
@@ -80,10 +115,14 @@ class GlueWorkflow(Construct):
             targets=glue.CfnCrawler.TargetsProperty(
                 s3_targets=[
                     glue.CfnCrawler.S3TargetProperty(
-                        path=f's3://{s3_bucket.bucket_name}/',
-                        event_queue_arn=self.glue_queue.queue_arn)
+                        path=f's3://{s3_bucket.bucket_name}/{prefix}',
+                        event_queue_arn=self.glue_queue.queue_arn,
+                        exclusions=self.exclusions or None,
+                        sample_size=self.sample_size)
+                    for prefix in self.crawl_prefixes or ['']
                     ]
                 ),
+            configuration=self.crawler_configuration,
             recrawl_policy=glue.CfnCrawler.RecrawlPolicyProperty(
                 recrawl_behavior='CRAWL_EVENT_MODE'
                 ),
@@ -96,6 +135,17 @@ class GlueWorkflow(Construct):
 
         return glue_crawler
     
+    @property
+    def crawler_configuration(self):
+        grouping = {}
+        if self.combine_compatible_schemas:
+            grouping['TableGroupingPolicy'] = 'CombineCompatibleSchemas'
+        if self.table_level:
+            grouping['TableLevelConfiguration'] = self.table_level
+        if not grouping:
+            return None
+        return json.dumps({'Version': 1.0, 'Grouping': grouping})
+
     def __create_glue_workflow__(self, s3_bucket):
         glue_workflow = glue.CfnWorkflow(
             self, 
@@ -116,6 +166,10 @@ class GlueWorkflow(Construct):
                     )
                 ],
             type='EVENT',
+            event_batching_condition=glue.CfnTrigger.EventBatchingConditionProperty(
+                batch_size=self.event_batch_size,
+                batch_window=self.event_batch_window
+                ),
             workflow_name=glue_workflow.name
         )
 
@@ -140,6 +194,10 @@ class GlueWorkflow(Construct):
                             resources=['*']
                             )])})
 
+        detail = {"bucket": {"name": [f"{s3_bucket.bucket_name}"]}}
+        if self.crawl_prefixes:
+            detail["object"] = {"key": [{"prefix": prefix} for prefix in self.crawl_prefixes]}
+
         events.CfnRule(
             self, 
             'rule_s3_glue',
@@ -154,11 +212,7 @@ class GlueWorkflow(Construct):
                 ],
             event_pattern={
                 "detail-type": ["Object Created"],
-                "detail": {
-                    "bucket": {
-                        "name": [f"{s3_bucket.bucket_name}"]
-                        }
-                    },
+                "detail": detail,
                 "source": ["aws.s3"]})
 
 
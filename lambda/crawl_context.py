@@ -0,0 +1,128 @@
+"""Identify the crawl behind a ``Glue Crawler State Change`` event.
+
+The resolver makes at most two Glue calls per event, and usually one:
+
+* ``list_crawls`` filtered to completed crawls that ended around the
+  event's ``completionDate``. The matching crawl already carries its
+  ``Summary``, so it is not looked up a second time.
+* ``get_crawler`` for the crawler's database. Its result is cached in the
+  resolver, which lives at module level and so survives warm invocations,
+  for ``ttl_seconds``.
+
+ListCrawls cannot sort, so the match whose end is closest to
+``completionDate`` is taken. When nothing matches, the resolver falls
+back to the completed crawls started within ``FALLBACK_WINDOW`` before
+it. Events that report no created, updated or deleted tables need no
+lookup at all, and ``resolve`` returns None for them.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import logging
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# Tolerance around the event's completionDate when matching the crawl's end time.
+COMPLETION_SLACK = timedelta(minutes=5)
+# How far back the fallback looks for crawls started before the event, or before now.
+FALLBACK_WINDOW = timedelta(days=1)
+TABLE_COUNT_FIELDS = ('tablesCreated', 'tablesUpdated', 'tablesDeleted')
+COMPLETED = {'FieldName': 'STATE', 'FilterOperator': 'EQ', 'FieldValue': 'COMPLETED'}
+
+
+class NoCrawlFoundError(Exception):
+    """ Exception thrown when no specific crawl is found"""
+    pass
+
+
+@dataclass(frozen=True)
+class CrawlContext:
+    crawler_name: str
+    crawl_id: str
+    database: str
+    crawl: dict
+
+
+def reports_no_table_changes(detail):
+    """Whether the event itself says that no table was created, updated or deleted.
+
+    Counts arrive as strings; an event without them is assumed to have changes.
+    """
+    try:
+        return all(int(detail[field]) == 0 for field in TABLE_COUNT_FIELDS)
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+class CrawlContextResolver:
+
+    def __init__(self, glue_client, ttl_seconds=300, clock=time.monotonic):
+        self.glue = glue_client
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, event):
+        """Return the event's ``CrawlContext``, or None when the crawl changed no tables."""
+        detail = event['detail']
+        crawler_name = detail['crawlerName']
+        if reports_no_table_changes(detail):
+            logger.info(f"Crawler {crawler_name} reports no table changes, nothing to compare")
+            return None
+        crawl = self.latest_crawl(crawler_name, detail.get('completionDate'))
+        return CrawlContext(crawler_name, crawl['CrawlId'], self.database(crawler_name), crawl)
+
+    def latest_crawl(self, crawler_name, completion_date=None):
+        """The completed crawl that ended closest to ``completion_date``, or the last started one without it."""
+        completed_at = _parse_date(completion_date) if completion_date else None
+        crawls = []
+        if completed_at:
+            ended = [_time_filter('END_TIME', 'GE', completed_at - COMPLETION_SLACK),
+                     _time_filter('END_TIME', 'LE', completed_at + COMPLETION_SLACK)]
+            try:
+                crawls = self._list_crawls(crawler_name, [COMPLETED, *ended])
+            except ClientError as error:
+                logger.warning(f"Falling back to the crawls started in the last {FALLBACK_WINDOW}: {error}")
+        if not crawls:
+            until = completed_at or datetime.now(timezone.utc)
+            started = [_time_filter('START_TIME', 'GE', until - FALLBACK_WINDOW),
+                       _time_filter('START_TIME', 'LE', until + COMPLETION_SLACK)]
+            crawls = self._list_crawls(crawler_name, [COMPLETED, *started])
+        if not crawls:
+            raise NoCrawlFoundError()
+        if completed_at:
+            return min(crawls, key=lambda crawl: abs(crawl.get('EndTime', crawl['StartTime']) - completed_at))
+        return max(crawls, key=lambda crawl: crawl['StartTime'])
+
+    def database(self, crawler_name):
+        now = self.clock()
+        with self._lock:
+            cached = self._databases.get(crawler_name)
+        if cached and cached[1] > now:
+            return cached[0]
+        database = self.glue.get_crawler(Name=crawler_name)['Crawler']['DatabaseName']
+        with self._lock:
+            self._databases[crawler_name] = (database, now + self.ttl_seconds)
+        return database
+
+    def _list_crawls(self, crawler_name, filters, page_size=100):
+        crawls = []
+        kwargs = {'CrawlerName': crawler_name, 'Filters': filters, 'MaxResults': page_size}
+        while True:
+            response = self.glue.list_crawls(**kwargs)
+            crawls.extend(response['Crawls'])
+            if not response.get('NextToken'):
+                return crawls
+            kwargs['NextToken'] = response['NextToken']
+
+
+def _time_filter(field, operator, value):
+    return {'FieldName': field, 'FilterOperator': operator, 'FieldValue': value.strftime('%Y-%m-%dT%H:%M:%SZ')}
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
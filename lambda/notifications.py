@@ -0,0 +1,282 @@
+"""Publish schema change reports to SNS.
+
+A report is sent as a JSON message whose ``Subject`` and message
+attributes (``event_type``, ``crawler``, ``database``, ``breaking``,
+``tables``) summarise it, so subscriptions can filter on them, for example
+to page someone only for breaking changes.
+
+SNS rejects messages over 256 KB, so a large report is split into parts
+that each carry ``report_id``, ``part`` and ``parts`` and list a share of
+the tables. The parts go out with ``publish_batch``, ten at a time and
+under the 256 KB limit that also applies to a whole batch. A report that
+would need more than ``max_parts`` parts is written to S3 instead, and a
+single message pointing at it is published.
+
+``Digest`` coalesces the reports of several crawls into one message. Each
+report is parked in S3 and they are all published together once the
+oldest has waited ``window_seconds``.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+MAX_MESSAGE_BYTES = 256 * 1024
+# Headroom for the message's envelope fields, subject and attributes.
+ENVELOPE_BYTES = 4 * 1024
+MAX_BATCH_ENTRIES = 10
+MAX_PARTS = 10
+MAX_SUBJECT_LENGTH = 100
+# Report fields that list tables and can be split across parts.
+TABLE_FIELDS = ('tables_deleted', 'tables_deprecated', 'tables_added', 'tables_updated')
+
+
+class NotificationError(Exception):
+    """ Exception thrown when SNS keeps rejecting part of a report"""
+    pass
+
+
+def build_report(crawler_name, crawl_id, database, compare_version_report, tables_deleted, tables_added, tables_deprecated):
+    return {
+        'event_type': 'schema_change',
+        'crawler': crawler_name,
+        'crawl_id': crawl_id,
+        'database': database,
+        'breaking': bool(tables_deleted or tables_deprecated) or any(t['breaking'] for t in compare_version_report),
+        'tables_deleted': list(tables_deleted),
+        'tables_deprecated': list(tables_deprecated),
+        'tables_added': list(tables_added),
+        'tables_updated': list(compare_version_report),
+    }
+
+
+def merge_reports(reports):
+    """Combine the reports of several crawls into one digest report.
+
+    Table names are qualified with their database, since a digest can span several.
+    """
+    digest = {
+        'event_type': 'schema_change_digest',
+        'crawler': ','.join(sorted({report['crawler'] for report in reports})),
+        'crawl_id': ','.join(report['crawl_id'] for report in reports),
+        'database': ','.join(sorted({report['database'] for report in reports})),
+        'breaking': any(report['breaking'] for report in reports),
+        **{field: [] for field in TABLE_FIELDS},
+    }
+    for report in reports:
+        database = report['database']
+        for field in TABLE_FIELDS[:-1]:
+            digest[field] += [f"{database}.{table}" for table in report[field]]
+        digest['tables_updated'] += [{**table, 'table_name': f"{database}.{table['table_name']}"} for table in report['tables_updated']]
+    return digest
+
+
+def split_report(report, max_bytes):
+    """Split ``report`` into parts whose JSON encodings stay under ``max_bytes``.
+
+    Every part repeats the report's header fields and lists a share of the
+    tables. A single updated table too large to fit on its own is cut down
+    to its name and ``breaking`` flag, with ``truncated`` set.
+    """
+    header = {key: value for key, value in report.items() if key not in TABLE_FIELDS}
+    budget = max_bytes - _size({**header, **{field: [] for field in TABLE_FIELDS}})
+    parts, current, used = [], {field: [] for field in TABLE_FIELDS}, 0
+    for field in TABLE_FIELDS:
+        for entry in report[field]:
+            size = _size(entry) + 1
+            if size > budget:
+                entry = {'table_name': entry['table_name'], 'breaking': entry['breaking'], 'truncated': True}
+                size = _size(entry) + 1
+            if used + size > budget and used:
+                parts.append(current)
+                current, used = {field: [] for field in TABLE_FIELDS}, 0
+            current[field].append(entry)
+            used += size
+    parts.append(current)
+    return [{**header, **part} for part in parts]
+
+
+class Notifier:
+    """Sends reports to one SNS topic, splitting or offloading them to S3 when too large."""
+
+    def __init__(self, sns_client, topic_arn, s3_client=None, report_bucket=None, report_prefix='',
+                 max_message_bytes=MAX_MESSAGE_BYTES, max_parts=MAX_PARTS):
+        self.sns = sns_client
+        self.topic_arn = topic_arn
+        self.s3 = s3_client
+        self.report_bucket = report_bucket
+        self.report_prefix = report_prefix
+        self.max_message_bytes = max_message_bytes
+        self.max_parts = max_parts
+
+    def publish(self, report):
+        """Publish ``report`` and return the ids of the messages sent."""
+        report_id = str(uuid.uuid4())
+        parts = split_report(report, self.max_message_bytes - ENVELOPE_BYTES)
+        if len(parts) > self.max_parts and self.report_bucket:
+            messages = [self._message(self._offload(report, report_id), report)]
+        else:
+            if len(parts) > 1:
+                parts = [{'report_id': report_id, 'part': i, 'parts': len(parts), **part} for i, part in enumerate(parts, 1)]
+            messages = [self._message(part, report) for part in parts]
+
+        if len(messages) == 1:
+            return [self.sns.publish(TopicArn=self.topic_arn, **messages[0])['MessageId']]
+        return self._publish_batches(messages)
+
+    def _offload(self, report, report_id):
+        key = f"{self.report_prefix}{report['event_type']}/{report_id}.json"
+        self.s3.put_object(Bucket=self.report_bucket, Key=key, Body=json.dumps(report, default=str).encode(),
+                           ContentType='application/json')
+        logger.info(f"Report too large for SNS, written to s3://{self.report_bucket}/{key}")
+        header = {key: value for key, value in report.items() if key not in TABLE_FIELDS}
+        return {
+            **header,
+            'report_id': report_id,
+            'report_location': f"s3://{self.report_bucket}/{key}",
+            **{f"{field}_count": len(report[field]) for field in TABLE_FIELDS},
+        }
+
+    def _message(self, body, report):
+        tables = sum(len(report[field]) for field in TABLE_FIELDS)
+        subject = f"Crawler {report['crawler']} detects {'breaking ' if report['breaking'] else ''}schema changes"
+        if 'part' in body:
+            subject = f"{subject} ({body['part']}/{body['parts']})"
+        return {
+            'Subject': _subject(subject),
+            'Message': json.dumps(body, default=str),
+            'MessageAttributes': {
+                'event_type': _string(report['event_type']),
+                'crawler': _string(report['crawler']),
+                'database': _string(report['database']),
+                'breaking': _string('true' if report['breaking'] else 'false'),
+                'tables': {'DataType': 'Number', 'StringValue': str(tables)},
+            },
+        }
+
+    def _publish_batches(self, messages, attempts=3):
+        entries = [{'Id': str(i), **message} for i, message in enumerate(messages)]
+        message_ids = {}
+        pending = entries
+        for _ in range(attempts):
+            failed = []
+            for batch in _batches(pending, self.max_message_bytes):
+                response = self.sns.publish_batch(TopicArn=self.topic_arn, PublishBatchRequestEntries=batch)
+                message_ids.update((entry['Id'], entry['MessageId']) for entry in response.get('Successful', []))
+                failed += response.get('Failed', [])
+            if not failed:
+                return [message_ids[entry['Id']] for entry in entries]
+            # Only errors on SNS's side are worth another attempt.
+            if any(failure.get('SenderFault') for failure in failed):
+                break
+            retry = {failure['Id'] for failure in failed}
+            pending = [entry for entry in pending if entry['Id'] in retry]
+            logger.warning(f"Retrying {len(pending)} SNS messages after: {failed}")
+        raise NotificationError(f"SNS rejected {len(failed)} messages: {failed}")
+
+
+class Digest:
+    """Holds reports in S3 until the oldest has waited ``window_seconds``.
+
+    Each report is its own object under ``<prefix>pending/``, so concurrent
+    invocations never overwrite each other's reports. A flush claims each
+    report with a conditional put under ``<prefix>claimed/`` before reading
+    it, so invocations that flush at the same time never send a report twice.
+    """
+
+    def __init__(self, s3_client, bucket, prefix, window_seconds, clock=time.time):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = f"{prefix}pending/"
+        self.claim_prefix = f"{prefix}claimed/"
+        self.window_seconds = window_seconds
+        self.clock = clock
+
+    def add(self, report):
+        stamp = datetime.fromtimestamp(self.clock(), timezone.utc).strftime('%Y%m%dT%H%M%S')
+        key = f"{self.prefix}{stamp}-{uuid.uuid4().hex[:8]}.json"
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(report, default=str).encode())
+
+    def flush(self, force=False):
+        """Return the merged reports this call claimed and drop them, or None if there are none yet.
+
+        Nothing is claimed while the oldest pending report is younger than the window.
+        """
+        pending = {}
+        for page in self.s3.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=self.prefix):
+            pending.update((obj['Key'], obj) for obj in page.get('Contents', []))
+        if not pending:
+            return None
+        oldest = min(obj['LastModified'] for obj in pending.values()).timestamp()
+        if not force and self.clock() - oldest < self.window_seconds:
+            return None
+
+        reports, claims = [], []
+        for key in sorted(pending):
+            claim = self._claim(key)
+            if not claim:
+                continue
+            claims.append(claim)
+            try:
+                body = self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+            except ClientError as error:
+                if error.response['Error']['Code'] != 'NoSuchKey':
+                    raise
+                # Another invocation flushed it between our listing and our claim.
+                continue
+            reports.append((key, json.loads(body)))
+        # Drop the reports before their claims, or a later flush could claim one again.
+        self._delete([key for key, _ in reports])
+        self._delete(claims)
+        if not reports:
+            return None
+        return merge_reports([report for _, report in reports])
+
+    def _claim(self, key):
+        """Put a claim on the report at ``key``; return the claim's key, or None if another flush holds it."""
+        claim = f"{self.claim_prefix}{key[len(self.prefix):]}"
+        try:
+            self.s3.put_object(Bucket=self.bucket, Key=claim, Body=b'', IfNoneMatch='*')
+        except ClientError as error:
+            if error.response['Error']['Code'] not in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                raise
+            logger.info(f"Report {key} is claimed by another flush")
+            return None
+        return claim
+
+    def _delete(self, keys):
+        for start in range(0, len(keys), 1000):
+            objects = [{'Key': key} for key in keys[start:start + 1000]]
+            self.s3.delete_objects(Bucket=self.bucket, Delete={'Objects': objects})
+
+
+def _batches(entries, max_bytes):
+    batch, size = [], 0
+    for entry in entries:
+        entry_size = _size(entry)
+        if batch and (len(batch) == MAX_BATCH_ENTRIES or size + entry_size > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(entry)
+        size += entry_size
+    if batch:
+        yield batch
+
+
+def _size(value):
+    return len(json.dumps(value, default=str).encode())
+
+
+def _string(value):
+    return {'DataType': 'String', 'StringValue': str(value) or '-'}
+
+
+def _subject(subject):
+    # SNS subjects are ASCII, without line breaks, at most 100 characters.
+    subject = subject.encode('ascii', 'replace').decode().replace('\n', ' ')
+    return subject if len(subject) <= MAX_SUBJECT_LENGTH else subject[:MAX_SUBJECT_LENGTH - 3] + '...'
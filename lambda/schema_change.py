@@ -1,65 +1,91 @@
 
+from concurrent.futures import ThreadPoolExecutor
 import json
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import logging
 import os
 
+from crawl_context import CrawlContextResolver, NoCrawlFoundError
+from notifications import Digest, Notifier, build_report
+from schema_diff import diff_table
+from schema_registry import S3SchemaStore, SchemaRegistry, as_table, schema_entry
+
 SNS_TOPIC = os.environ['SNS_TOPIC']
+# Reports too large for SNS, and reports waiting for a digest, are kept here.
+REPORT_BUCKET = os.environ.get('REPORT_BUCKET')
+REPORT_PREFIX = os.environ.get('REPORT_PREFIX', 'schema_reports/')
+# Coalesce reports across crawls for this long; 0 publishes each crawl's report right away.
+DIGEST_SECONDS = int(os.environ.get('DIGEST_SECONDS', '0'))
+# Catalog calls in flight at once; Glue throttles GetTableVersions per account.
+GLUE_MAX_CONCURRENCY = int(os.environ.get('GLUE_MAX_CONCURRENCY', '8'))
+# Where the last seen schema of each table is kept, in REPORT_BUCKET; empty turns the registry off.
+SCHEMA_REGISTRY_PREFIX = os.environ.get('SCHEMA_REGISTRY_PREFIX', '')
+# How long a warm container trusts a crawler's database without asking Glue again.
+CRAWLER_CACHE_SECONDS = int(os.environ.get('CRAWLER_CACHE_SECONDS', '300'))
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-glue = boto3.client('glue')
+glue = boto3.client('glue', config=Config(
+    max_pool_connections=GLUE_MAX_CONCURRENCY,
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+))
 sns = boto3.client('sns')
+s3 = boto3.client('s3')
+crawl_contexts = CrawlContextResolver(glue, ttl_seconds=CRAWLER_CACHE_SECONDS)
+schema_registry = None
+if REPORT_BUCKET and SCHEMA_REGISTRY_PREFIX:
+    schema_registry = SchemaRegistry(S3SchemaStore(s3, REPORT_BUCKET, SCHEMA_REGISTRY_PREFIX), max_workers=GLUE_MAX_CONCURRENCY)
 
 
 def lambda_handler(event, context):
     
     logger.info(event)
     
-    crawler_name=get_crawler_name(event)
-    crawl_id=get_crawl_id(crawler_name)
-    database=get_database(crawler_name)
+    if event.get('detail-type') == 'Scheduled Event':
+        flush_digest()
+        return
+    
+    try:
+        crawl_context=crawl_contexts.resolve(event)
+    except NoCrawlFoundError:
+        logger.warning(f"No completed crawl of {event['detail']['crawlerName']} matches the event, skipping it")
+        return
+    if crawl_context is None:
+        return
     
     try:
-        tables_deleted, tables_updated_or_deprecated, tables_added=get_crawler_report(crawler_name, crawl_id)
-        compare_version_report, tables_deprecated=get_compare_version_report(database,tables_updated_or_deprecated, tables_deleted)
-        send_compare_version_report(compare_version_report, tables_deleted, tables_added, tables_deprecated,crawler_name, crawl_id, database )
+        tables_deleted, tables_updated_or_deprecated, tables_added=get_crawler_report(crawl_context.crawl)
+        compare_version_report, tables_deprecated=get_compare_version_report(crawl_context.database,tables_updated_or_deprecated, tables_deleted)
+        send_compare_version_report(compare_version_report, tables_deleted, tables_added, tables_deprecated,
+                                    crawl_context.crawler_name, crawl_context.crawl_id, crawl_context.database)
         
     except NoChangeError as error:
         logger.warn("No change has been detected")
     
     
-def get_crawler_name(event):
-    return event['detail']['crawlerName']
-
-def get_crawl_id(crawler_name):
-    return glue.list_crawls(CrawlerName=crawler_name)['Crawls'][0]['CrawlId']
-
-def get_database(crawler_name):
-    return glue.get_crawler(Name=crawler_name)['Crawler']['DatabaseName']
-    
-def get_crawler_report(crawler_name, crawl_id):
-    crawl= _get_crawl_by_crawl_id(crawler_name, crawl_id )
+def get_crawler_report(crawl):
     
     try :
-        raw_report=json.loads(crawl['Summary'])
+        raw_report=json.loads(crawl['Summary'])['TABLE']
     
     except KeyError as error:
         raise NoChangeError
     
-    if raw_report['TABLE'].get('DELETE'):
-        tables_deleted=json.loads(raw_report['TABLE']['DELETE'])['Details']['names']
+    if raw_report.get('DELETE'):
+        tables_deleted=json.loads(raw_report['DELETE'])['Details']['names']
     else:
         tables_deleted=[]
     
-    if raw_report['TABLE'].get('UPDATE'):
-        tables_updated_or_deprecated=json.loads(raw_report['TABLE']['UPDATE'])['Details']['names']
+    if raw_report.get('UPDATE'):
+        tables_updated_or_deprecated=json.loads(raw_report['UPDATE'])['Details']['names']
     else:
-        tables_updated=[]
+        tables_updated_or_deprecated=[]
     
-    if raw_report['TABLE'].get('ADD'):
-        tables_added=json.loads(raw_report['TABLE']['ADD'])['Details']['names']
+    if raw_report.get('ADD'):
+        tables_added=json.loads(raw_report['ADD'])['Details']['names']
     else:
         tables_added=[]
     
@@ -67,84 +93,132 @@ def get_crawler_report(crawler_name, crawl_id):
         
        
 def get_compare_version_report(database,tables_updated_or_deprecated, tables_deleted):
+    """Diff every updated table against its previous schema.
+
+    Tables known to the schema registry are diffed against their registered
+    schema, and skipped when their fingerprint has not changed, so only their
+    current definitions are read from Glue. Tables the registry has not seen
+    yet fall back to comparing their two newest Glue versions.
+    """
     
     comparare_version_report=[]
     table_deprecated=[]
-    
-    for table in tables_updated_or_deprecated:
-        versions=glue.get_table_versions(DatabaseName=database, TableName=table)
-        try:
-            if versions['TableVersions'][0]['Table']['Parameters']['DEPRECATED_BY_CRAWLER']:
-                table_deprecated.append(table)
+    tables=list(tables_updated_or_deprecated)
+    
+    previous=schema_registry.lookup(database, tables) if schema_registry else dict.fromkeys(tables)
+    versions_by_table=get_latest_table_versions(database, [table for table in tables if previous[table] is None])
+    current_tables=get_current_tables(database, [table for table in tables if previous[table] is not None])
+    registered={}
+    for table in tables:
+        if previous[table] is None:
+            versions=versions_by_table[table]
+            new_table=versions[0]['Table'] if versions else None
+            old_table=versions[1]['Table'] if len(versions) > 1 else None
+        else:
+            new_table=current_tables.get(table)
+            old_table=as_table(previous[table])
         
-        except KeyError:
-    
-            new_table= versions['TableVersions'][0]['Table']['StorageDescriptor']['Columns']
-            old_table= versions['TableVersions'][1]['Table']['StorageDescriptor']['Columns']
-    
-            dropped_columns=_find_dropped_columns(old_table, new_table)
-            added_columns=_find_added_columns(old_table, new_table)
-            updated_columns=_find_updated_columns(old_table, new_table, table)
-            
-            comparare_version_report.append({'table_name':table, 'dropped_columns':dropped_columns, 'added_columns':added_columns, 'updated_columns':updated_columns})
+        if new_table is None:
+            logger.warning(f"Table {table} no longer exists in {database}")
+            continue
+        if new_table.get('Parameters', {}).get('DEPRECATED_BY_CRAWLER'):
+            table_deprecated.append(table)
+            continue
+        entry=schema_entry(new_table)
+        if previous[table] is not None and previous[table]['fingerprint'] == entry['fingerprint']:
+            logger.info(f"Schema of table {table} is unchanged")
+            continue
+        registered[table]=entry
+        if old_table is None:
+            logger.warning(f"Table {table} has no previous version to compare with")
+            continue
         
+        diff=diff_table(old_table, new_table)
+        columns=diff['columns']
+        comparare_version_report.append({'table_name':table, 'dropped_columns':columns['dropped'], 'added_columns':columns['added'],
+                                         'updated_columns':columns['updated'], 'partition_keys':diff['partition_keys'], 'breaking':diff['breaking']})
+    
+    if schema_registry:
+        schema_registry.register(database, registered)
+        schema_registry.forget(database, tables_deleted)
     return comparare_version_report, table_deprecated
+
+
+def get_current_tables(database, tables, max_expression_length=2048):
+    """Fetch the current definition of ``tables`` in as few GetTables calls as their names allow."""
+    wanted=set(tables)
+    found={}
+    for expression in _name_expressions(sorted(wanted), max_expression_length):
+        for page in glue.get_paginator('get_tables').paginate(DatabaseName=database, Expression=expression):
+            found.update((table['Name'], table) for table in page['TableList'] if table['Name'] in wanted)
+    return found
+
+
+def _name_expressions(names, max_length):
+    # GetTables filters names with a regular expression of limited length.
+    expression=''
+    for name in names:
+        if expression and len(expression) + len(name) + 1 > max_length:
+            yield expression
+            expression=''
+        expression=f"{expression}|{name}" if expression else name
+    if expression:
+        yield expression
+
+
+def get_latest_table_versions(database, tables, max_workers=None):
+    """Fetch the newest two versions of every table, at most ``max_workers`` calls at a time.
+
+    Returns ``{table: [newest, previous]}``; a table with a single version gets a one-item list,
+    and a table dropped since the crawl an empty one.
+    """
+    max_workers=max_workers or GLUE_MAX_CONCURRENCY
+    if not tables:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tables))) as executor:
+        versions=executor.map(lambda table: _get_latest_versions(database, table), tables)
+        return dict(zip(tables, versions))
+
+
+def _get_latest_versions(database, table, count=2):
+    # Versions come back newest first, so the first page of ``count`` is all we need.
+    paginator=glue.get_paginator('get_table_versions')
+    pages=paginator.paginate(DatabaseName=database, TableName=table,
+                             PaginationConfig={'MaxItems': count, 'PageSize': count})
+    try:
+        return [version for page in pages for version in page['TableVersions']][:count]
+    except ClientError as error:
+        if error.response['Error']['Code'] != 'EntityNotFoundException':
+            raise
+        return []
         
         
-def _find_dropped_columns(old_table, new_table):
-    new_table_columun_names= set(column['Name'] for column in new_table)
-    old_table_columun_names= set(column['Name'] for column in old_table)
-    return old_table_columun_names-new_table_columun_names
-    
-
-def _find_added_columns(old_table, new_table):
-    new_table_columun_names= set(column['Name'] for column in new_table)
-    old_table_columun_names= set(column['Name'] for column in old_table)
-    return new_table_columun_names-old_table_columun_names
-
-def _find_updated_columns(old_table, new_table, table):
-    updated_columns=[]
-    for old_column in old_table:
-        for new_column in new_table:
-            if (old_column["Name"]==new_column["Name"]) and (old_column["Type"]!=new_column["Type"]):
-                updated_columns.append({'column_name': old_column["Name"] , 'old_type':old_column["Type"], 'new_type':new_column["Type"]})
-    return updated_columns
-
-def _get_crawl_by_crawl_id(crawler_name, crawl_id ):
-    crawl=glue.list_crawls(CrawlerName=crawler_name, MaxResults=1,
-    Filters=[
-        {
-            'FieldName': 'CRAWL_ID',
-            'FilterOperator': 'EQ',
-            'FieldValue': crawl_id
-       }])['Crawls'][0]
-    if crawl is not None:
-        return crawl
+def send_compare_version_report(compare_version_report, tables_deleted, tables_added, tables_deprecated,crawler_name, crawl_id, database ):
+    report=build_report(crawler_name, crawl_id, database, compare_version_report, tables_deleted, tables_added, tables_deprecated)
+    if DIGEST_SECONDS and REPORT_BUCKET:
+        _digest().add(report)
+        flush_digest()
     else:
-        raise NoCrawlFoundError()
+        _notifier().publish(report)
 
-def send_compare_version_report(compare_version_report, tables_deleted, tables_added, tables_deprecated,crawler_name, crawl_id, database ):
-    nl="\n"
-    message=f"""Dear Operator,
-The Crawler '{crawler_name}' updated the database {database} (crawl id :{crawl_id})
-The following tables are deleted from the database:
-{nl.join(tables_deleted)}
-The following tables are deprecated from the database:
-{nl.join(tables_deprecated)}
-The following tables are added to the database:
-{nl.join(tables_added)}
-The following tables are updated:
-{nl.join([str(column_report) for column_report in compare_version_report])}"""
+def flush_digest():
+    """Publish the reports waiting in the digest once the oldest has waited DIGEST_SECONDS.
 
-    sns.publish(TopicArn=SNS_TOPIC, Message=message, Subject=f"Crawler {crawler_name} detects schema changes")
+    Runs after every crawl and on a schedule, so a digest goes out even when no further crawl comes.
+    """
+    if not (DIGEST_SECONDS and REPORT_BUCKET):
+        return
+    digest=_digest().flush()
+    if digest is not None:
+        _notifier().publish(digest)
+
+def _notifier():
+    return Notifier(sns, SNS_TOPIC, s3_client=s3, report_bucket=REPORT_BUCKET, report_prefix=REPORT_PREFIX)
+
+def _digest():
+    return Digest(s3, REPORT_BUCKET, f"{REPORT_PREFIX}digest/", DIGEST_SECONDS)
 
 
-    
 class NoChangeError(Exception):
     """ Exception thrown when no change is detected"""
     pass
-
-class NoCrawlFoundError(Exception):
-    """ Exception thrown when no specific crawl is found"""
-    pass
-                
\ No newline at end of file
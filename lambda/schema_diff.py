@@ -0,0 +1,221 @@
+"""Diff two versions of a Glue table schema.
+
+Columns and partition keys are indexed by name once, so a diff is linear in
+the number of columns. Column types are Hive type strings; nested
+``struct<...>``, ``array<...>`` and ``map<...>`` types are parsed so a change
+deep inside a struct is reported by its field path (``address.zip``,
+``tags[]``, ``attrs{value}``) rather than as one opaque type change.
+
+Every change is classified as ``widening`` when data written with the old
+schema still reads correctly with the new one (a new column or struct
+field, ``int`` -> ``bigint``, ``float`` -> ``double``, a wider decimal or
+varchar), and ``breaking`` otherwise. Any change to the partition keys is
+breaking, since it changes the table's layout on S3.
+"""
+import re
+
+WIDENING = 'widening'
+BREAKING = 'breaking'
+
+# Primitive types each type can be read as without loss.
+WIDER_TYPES = {
+    'tinyint': {'smallint', 'int', 'bigint', 'float', 'double'},
+    'smallint': {'int', 'bigint', 'float', 'double'},
+    'int': {'bigint', 'double'},
+    'float': {'double'},
+    'char': {'varchar', 'string'},
+    'varchar': {'string'},
+    'date': {'timestamp'},
+}
+# Hive's precision and scale for a bare ``decimal``.
+DEFAULT_DECIMAL = (10, 0)
+
+PARAMETERS = re.compile(r'^(\w+)\((\d+)(?:,(\d+))?\)$')
+
+
+class SchemaParseError(ValueError):
+    """ Exception thrown when a column type is not a valid Hive type"""
+    pass
+
+
+def diff_table(old_table, new_table):
+    """Diff the columns and partition keys of two Glue ``Table`` descriptions."""
+    columns = diff_columns(
+        old_table['StorageDescriptor']['Columns'],
+        new_table['StorageDescriptor']['Columns'],
+    )
+    partition_keys = diff_columns(
+        old_table.get('PartitionKeys', []),
+        new_table.get('PartitionKeys', []),
+        partition_keys=True,
+    )
+    return {
+        'columns': columns,
+        'partition_keys': partition_keys,
+        'breaking': columns['breaking'] or partition_keys['breaking'],
+    }
+
+
+def diff_columns(old_columns, new_columns, partition_keys=False):
+    """Diff two lists of Glue columns (``{'Name': ..., 'Type': ...}``).
+
+    Returns the added and dropped column names in schema order and one entry
+    per column whose type changed, with its field-level changes.
+    """
+    old_by_name = {column['Name'].lower(): column for column in old_columns}
+    new_names = set()
+    added, updated = [], []
+    for column in new_columns:
+        name = column['Name'].lower()
+        new_names.add(name)
+        old_column = old_by_name.get(name)
+        if old_column is None:
+            added.append(column['Name'])
+            continue
+        old_type, new_type = normalize_type(old_column['Type']), normalize_type(column['Type'])
+        if old_type == new_type:
+            continue
+        fields = diff_types(parse_type(old_type), parse_type(new_type), column['Name'])
+        change = BREAKING if partition_keys or any(f['change'] == BREAKING for f in fields) else WIDENING
+        updated.append({
+            'column_name': column['Name'],
+            'old_type': old_column['Type'],
+            'new_type': column['Type'],
+            'change': change,
+            'fields': fields,
+        })
+    dropped = [column['Name'] for column in old_columns if column['Name'].lower() not in new_names]
+
+    breaking = bool(dropped) or any(u['change'] == BREAKING for u in updated)
+    if partition_keys:
+        breaking = breaking or bool(added)
+    return {'added': added, 'dropped': dropped, 'updated': updated, 'breaking': breaking}
+
+
+def normalize_type(type_string):
+    return re.sub(r'[\s`]', '', type_string).lower()
+
+
+def parse_type(type_string):
+    """Parse a Hive type into nested tuples.
+
+    Primitives stay strings (``'decimal(10,2)'``); complex types become
+    ``('struct', {name: type})``, ``('array', element)`` or
+    ``('map', key, value)``.
+    """
+    text = normalize_type(type_string)
+    parsed, position = _parse(text, 0)
+    if position != len(text):
+        raise SchemaParseError(f"Unexpected {text[position:]!r} in type {type_string!r}")
+    return parsed
+
+
+def _parse(text, position):
+    start = position
+    while position < len(text) and (text[position].isalnum() or text[position] == '_'):
+        position += 1
+    name = text[start:position]
+    if not name:
+        raise SchemaParseError(f"Expected a type at offset {start} of {text!r}")
+
+    if name == 'struct':
+        position = _expect(text, position, '<')
+        fields = {}
+        while True:
+            colon = text.find(':', position)
+            if colon <= position:
+                raise SchemaParseError(f"Expected a struct field at offset {position} of {text!r}")
+            field_name = text[position:colon]
+            fields[field_name], position = _parse(text, colon + 1)
+            if text.startswith('>', position):
+                return ('struct', fields), position + 1
+            position = _expect(text, position, ',')
+    if name == 'array':
+        element, position = _parse(text, _expect(text, position, '<'))
+        return ('array', element), _expect(text, position, '>')
+    if name == 'map':
+        key, position = _parse(text, _expect(text, position, '<'))
+        value, position = _parse(text, _expect(text, position, ','))
+        return ('map', key, value), _expect(text, position, '>')
+
+    if text.startswith('(', position):
+        end = text.find(')', position)
+        if end < 0:
+            raise SchemaParseError(f"Unclosed parameters in {text!r}")
+        return text[start:end + 1], end + 1
+    return name, position
+
+
+def _expect(text, position, token):
+    if not text.startswith(token, position):
+        raise SchemaParseError(f"Expected {token!r} at offset {position} of {text!r}")
+    return position + 1
+
+
+def diff_types(old, new, path):
+    """Field-level changes between two parsed types, each classified as widening or breaking."""
+    if old == new:
+        return []
+    old_kind, new_kind = _kind(old), _kind(new)
+    if old_kind != new_kind:
+        return [_change(path, old, new, BREAKING)]
+
+    if old_kind == 'struct':
+        old_fields, new_fields = old[1], new[1]
+        changes = []
+        for name, new_type in new_fields.items():
+            if name in old_fields:
+                changes += diff_types(old_fields[name], new_type, f"{path}.{name}")
+            else:
+                changes.append(_change(f"{path}.{name}", None, new_type, WIDENING))
+        changes += [
+            _change(f"{path}.{name}", old_type, None, BREAKING)
+            for name, old_type in old_fields.items() if name not in new_fields
+        ]
+        return changes
+    if old_kind == 'array':
+        return diff_types(old[1], new[1], f"{path}[]")
+    if old_kind == 'map':
+        return diff_types(old[1], new[1], f"{path}{{key}}") + diff_types(old[2], new[2], f"{path}{{value}}")
+
+    return [_change(path, old, new, WIDENING if is_widening(old, new) else BREAKING)]
+
+
+def is_widening(old, new):
+    """Whether values of primitive type ``old`` can be read as ``new`` without loss."""
+    old_base, old_params = _primitive(old)
+    new_base, new_params = _primitive(new)
+    if old_base == new_base == 'decimal':
+        old_precision, old_scale = old_params or DEFAULT_DECIMAL
+        new_precision, new_scale = new_params or DEFAULT_DECIMAL
+        return new_scale >= old_scale and new_precision - new_scale >= old_precision - old_scale
+    if old_base == new_base and old_base in ('char', 'varchar'):
+        return bool(old_params and new_params) and new_params[0] >= old_params[0]
+    return new_base in WIDER_TYPES.get(old_base, ())
+
+
+def _primitive(type_string):
+    match = PARAMETERS.match(type_string)
+    if not match:
+        return type_string, ()
+    base, first, second = match.groups()
+    return base, (int(first), int(second or 0))
+
+
+def _kind(parsed):
+    return parsed[0] if isinstance(parsed, tuple) else 'primitive'
+
+
+def _change(path, old, new, change):
+    return {'path': path, 'old_type': _format(old), 'new_type': _format(new), 'change': change}
+
+
+def _format(parsed):
+    """Render a parsed type back to its Hive string."""
+    if parsed is None or isinstance(parsed, str):
+        return parsed
+    if parsed[0] == 'struct':
+        return 'struct<' + ','.join(f"{name}:{_format(t)}" for name, t in parsed[1].items()) + '>'
+    if parsed[0] == 'array':
+        return f"array<{_format(parsed[1])}>"
+    return f"map<{_format(parsed[1])},{_format(parsed[2])}>"
@@ -0,0 +1,129 @@
+"""Compact record of the last schema seen for each Glue table.
+
+An entry holds a table's columns, partition keys and a fingerprint of
+both. The fingerprint covers lower-cased names and normalised types, so it
+ignores formatting and the rest of the StorageDescriptor. Comparing it
+with the fingerprint of the table's current definition shows whether the
+schema moved without reading any table versions. When it did move, the
+entry is the previous schema to diff against.
+
+Entries are small JSON documents, one per table, kept in S3 under
+``<prefix><database>/<table>.json``. ``LocalSchemaStore`` keeps the same
+documents in a directory, for tests and local runs.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+
+from schema_diff import normalize_type
+
+
+def fingerprint(columns, partition_keys=()):
+    canonical = json.dumps(
+        [[[c['Name'].lower(), normalize_type(c['Type'])] for c in columns],
+         [[c['Name'].lower(), normalize_type(c['Type'])] for c in partition_keys]],
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def schema_entry(table, version_id=None):
+    """The registry entry for a Glue ``Table`` description."""
+    columns = [_column(c) for c in table['StorageDescriptor']['Columns']]
+    partition_keys = [_column(c) for c in table.get('PartitionKeys', [])]
+    return {
+        'fingerprint': fingerprint(columns, partition_keys),
+        'columns': columns,
+        'partition_keys': partition_keys,
+        'version_id': version_id or table.get('VersionId'),
+        'registered_at': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def as_table(entry):
+    """Shape an entry like a Glue ``Table`` so it can be passed to ``schema_diff.diff_table``."""
+    return {'StorageDescriptor': {'Columns': entry['columns']}, 'PartitionKeys': entry['partition_keys']}
+
+
+def _column(column):
+    return {'Name': column['Name'], 'Type': column['Type']}
+
+
+class S3SchemaStore:
+
+    def __init__(self, s3_client, bucket, prefix):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, database, table):
+        try:
+            body = self.s3.get_object(Bucket=self.bucket, Key=self._key(database, table))['Body'].read()
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(body)
+
+    def put(self, database, table, entry):
+        self.s3.put_object(Bucket=self.bucket, Key=self._key(database, table), Body=json.dumps(entry).encode(),
+                           ContentType='application/json')
+
+    def delete(self, database, table):
+        self.s3.delete_object(Bucket=self.bucket, Key=self._key(database, table))
+
+    def _key(self, database, table):
+        return f"{self.prefix}{database}/{table}.json"
+
+
+class LocalSchemaStore:
+
+    def __init__(self, root):
+        self.root = root
+
+    def get(self, database, table):
+        try:
+            with open(self._path(database, table)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, database, table, entry):
+        path = self._path(database, table)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(entry, f)
+
+    def delete(self, database, table):
+        try:
+            os.remove(self._path(database, table))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, database, table):
+        return os.path.join(self.root, database, f"{table}.json")
+
+
+class SchemaRegistry:
+    """Looks up and records table schemas in a store, several tables at a time."""
+
+    def __init__(self, store, max_workers=8):
+        self.store = store
+        self.max_workers = max_workers
+
+    def lookup(self, database, tables):
+        """Return ``{table: entry or None}`` for ``tables``."""
+        return dict(zip(tables, self._map(lambda table: self.store.get(database, table), tables)))
+
+    def register(self, database, entries):
+        """Record ``{table: entry}`` as the tables' latest schemas."""
+        self._map(lambda item: self.store.put(database, *item), list(entries.items()))
+
+    def forget(self, database, tables):
+        self._map(lambda table: self.store.delete(database, table), list(tables))
+
+    def _map(self, fn, items):
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(fn, items))
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+import io
+import threading
+
+import boto3
+import pyarrow.parquet as pq
+
+from incremental import read_parquet_keys
+from metrics import log_event, metrics
+from s3_writer import delete_keys, split_s3_path
+from state import JsonState
+
+
+class Checkpoint:
+    """Progress of one job run, kept in S3 so an interrupted task can resume.
+
+    Every time a board has buffered ``rows_per_part`` rows, at a page
+    boundary, they are written to ``<s3path><run_id>/board_id=<id>/`` as a
+    Parquet part and the cursor of the next page is saved alongside in
+    ``<s3path><run_id>/checkpoint.json``. A task restarted with the same
+    ``run_id`` (AWS Batch keeps the job id across retry attempts, including
+    Spot interruptions) reuses the original start time and watermarks, skips
+    finished boards, reloads the parts of unfinished ones and continues from
+    their saved cursor.
+
+    Each run only touches its own ``<run_id>/`` prefix, so jobs running at
+    the same time under one ``s3path`` leave each other alone. Checkpoints of
+    other runs are deleted once they are ``stale_after`` old.
+
+    Output files are named after the start time, so a resumed run rewrites
+    the same keys instead of adding duplicates. The job writes its run
+    manifest first and only then calls ``clear``.
+    """
+
+    def __init__(self, s3path, run_id, rows_per_part=10_000, s3_client=None, stale_after=timedelta(days=7)):
+        self.s3path = s3path if s3path.endswith("/") else f"{s3path}/"
+        self.run_id = run_id
+        self.rows_per_part = rows_per_part
+        self.stale_after = stale_after
+        self.bucket, self.prefix = split_s3_path(self.s3path)
+        self.run_prefix = f"{self.prefix}{run_id}/"
+        self._s3_client = s3_client
+        self.store = JsonState(f"{self.s3path}{run_id}/checkpoint.json", s3_client)
+        self.data = None
+        self._lock = threading.Lock()
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            self._s3_client = boto3.client("s3")
+        return self._s3_client
+
+    @property
+    def started_at(self):
+        return datetime.fromisoformat(self.data["started_at"])
+
+    @property
+    def base_state(self):
+        return self.data["base_state"]
+
+    def open(self, started_at, base_state):
+        """Load this run's checkpoint, or start a new one from ``started_at`` and ``base_state``."""
+        data = self.store.load()
+        if data:
+            self.data = data
+            done = sorted(board_id for board_id, board in data["boards"].items() if board["done"])
+            log_event("checkpoint_resume", run_id=self.run_id, started_at=data["started_at"], boards_done=done)
+            return self
+        self._discard_stale()
+        self.data = {
+            "run_id": self.run_id,
+            "started_at": started_at.isoformat(),
+            "base_state": base_state,
+            "boards": {},
+        }
+        self.store.save(self.data)
+        return self
+
+    def board(self, board_id):
+        with self._lock:
+            return dict(self.data["boards"].get(board_id) or {"cursor": None, "parts": [], "done": False})
+
+    def save_part(self, board_id, table, cursor):
+        """Persist ``table`` as the board's next part and record ``cursor`` as the place to resume.
+
+        ``cursor=None`` marks the board as finished.
+        """
+        board = self.board(board_id)
+        if table.num_rows or not board["parts"]:
+            key = f"{self.run_prefix}board_id={board_id}/part-{len(board['parts']) + 1:05d}.parquet"
+            buffer = io.BytesIO()
+            pq.write_table(table, buffer)
+            self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=buffer.getvalue())
+            board["parts"] = board["parts"] + [key]
+            metrics.incr("CheckpointBytes", buffer.tell(), unit="Bytes")
+        board.update(cursor=cursor, done=cursor is None, rows=board.get("rows", 0) + table.num_rows)
+        with self._lock:
+            self.data["boards"][board_id] = board
+            self.store.save(self.data)
+
+    def reset_board(self, board_id):
+        """Forget a board's progress, for example after its saved cursor expired."""
+        with self._lock:
+            self.data["boards"].pop(board_id, None)
+            self.store.save(self.data)
+        self._delete_prefix(f"{self.run_prefix}board_id={board_id}/")
+
+    def read_parts(self, board_id):
+        """Return the board's saved parts as one table, or None if it has none."""
+        parts = self.board(board_id)["parts"]
+        if not parts:
+            return None
+        return read_parquet_keys(self.bucket, parts, self.s3_client)
+
+    def clear(self):
+        """Delete the parts and the checkpoint once the run's output is committed."""
+        self._delete_prefix(self.run_prefix)
+
+    def _discard_stale(self):
+        """Delete the checkpoints of other runs that haven't been saved for ``stale_after``."""
+        cutoff = datetime.now(timezone.utc) - self.stale_after
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix, Delimiter="/"):
+            for common_prefix in page.get("CommonPrefixes", []):
+                run_prefix = common_prefix["Prefix"]
+                if run_prefix == self.run_prefix:
+                    continue
+                try:
+                    saved = self.s3_client.head_object(Bucket=self.bucket, Key=f"{run_prefix}checkpoint.json")
+                except self.s3_client.exceptions.ClientError:
+                    # Not a run's checkpoint, for example the shard=<i>/ prefixes of array children.
+                    continue
+                if saved["LastModified"] < cutoff:
+                    log_event("checkpoint_discarded", prefix=run_prefix)
+                    self._delete_prefix(run_prefix)
+
+    def _delete_prefix(self, prefix):
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            delete_keys(self.s3_client, self.bucket, [obj["Key"] for obj in page.get("Contents", [])])
+
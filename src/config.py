@@ -0,0 +1,264 @@
+from dataclasses import dataclass, field, fields
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+import boto3
+
+from sharding import parse_shards, plan_shards
+
+DEFAULT_BUCKET = "cdk-batch-s3-glue-test-bucket"
+
+# ids for  [monday_listings board, monday_dispositions PGY, monday_dispositions SLD]
+DEFAULT_BOARD_IDS = ["6255740472", "6058656936", "6125794481"]
+
+
+@dataclass
+class JobConfig:
+    """Settings for one run of the monday.com extraction job.
+
+    Values come from, in increasing order of precedence: the defaults below,
+    a JSON document in the SSM parameter named by ``MONDAY_CONFIG_PARAMETER``,
+    and ``MONDAY_*`` environment variables (see ``ENV_VARS``).
+    """
+
+    board_ids: list = field(default_factory=lambda: list(DEFAULT_BOARD_IDS))
+    api_url: str = "https://api.monday.com/v2"
+    bucket: str = DEFAULT_BUCKET
+    items_prefix: str = "monday.com/items/"
+    delta_prefix: str = "monday.com/items_delta/"
+    # Watermarks go to <state_prefix>watermarks.json in ``bucket``, unless state_path names another place.
+    state_prefix: str = "_job_state/monday.com/"
+    state_path: str = ""
+    checkpoint_prefix: str = "_job_state/monday.com/checkpoint/"
+    checkpoint_rows: int = 10_000
+    manifest_prefix: str = "_job_state/monday.com/manifests/"
+    # Outside AWS Batch every run is new; set MONDAY_RUN_ID to resume an interrupted one.
+    run_id: str = field(default_factory=lambda: f"local-{uuid.uuid4().hex[:12]}")
+    array_index: int = -1
+    shards: str = ""
+    secret_id: str = "/api_keys/MONDAYS_COM"
+    secret_key: str = "/api_keys/MONDAYS_COM"
+    secret_ttl: int = 300
+    secret_cache_dir: str = ""
+    extract_mode: str = "full"
+    compact_every: int = 7
+    max_workers: int = 4
+    encode_workers: int = 0
+    skip_unchanged: int = 1
+    schema_precheck: int = 0
+    glue_database: str = "mondaycom-database"
+    glue_table: str = "items"
+    registered_prefix: str = "monday.com/items_registered/"
+    schema_registry_prefix: str = "_job_state/schema_registry/"
+
+    ENV_VARS = {
+        "board_ids": "MONDAY_BOARD_IDS",
+        "api_url": "MONDAY_API_URL",
+        "bucket": "MONDAY_BUCKET",
+        "items_prefix": "MONDAY_ITEMS_PREFIX",
+        "delta_prefix": "MONDAY_DELTA_PREFIX",
+        "state_prefix": "MONDAY_STATE_PREFIX",
+        "state_path": "MONDAY_STATE_PATH",
+        "checkpoint_prefix": "MONDAY_CHECKPOINT_PREFIX",
+        "checkpoint_rows": "MONDAY_CHECKPOINT_ROWS",
+        "manifest_prefix": "MONDAY_MANIFEST_PREFIX",
+        "run_id": "MONDAY_RUN_ID",
+        "array_index": "AWS_BATCH_JOB_ARRAY_INDEX",
+        "shards": "MONDAY_SHARDS",
+        "secret_id": "MONDAY_SECRET_ID",
+        "secret_key": "MONDAY_SECRET_KEY",
+        "secret_ttl": "MONDAY_SECRET_TTL",
+        "secret_cache_dir": "MONDAY_SECRET_CACHE_DIR",
+        "extract_mode": "MONDAY_EXTRACT_MODE",
+        "compact_every": "MONDAY_COMPACT_EVERY",
+        "max_workers": "MONDAY_MAX_WORKERS",
+        "encode_workers": "MONDAY_ENCODE_WORKERS",
+        "skip_unchanged": "MONDAY_SKIP_UNCHANGED",
+        "schema_precheck": "MONDAY_SCHEMA_PRECHECK",
+        "glue_database": "MONDAY_GLUE_DATABASE",
+        "glue_table": "MONDAY_GLUE_TABLE",
+        "registered_prefix": "MONDAY_REGISTERED_PREFIX",
+        "schema_registry_prefix": "MONDAY_SCHEMA_REGISTRY_PREFIX",
+    }
+
+    @property
+    def warehouse_s3path(self):
+        return f"s3://{self.bucket}/{self.items_prefix}"
+
+    @property
+    def delta_s3path(self):
+        return f"s3://{self.bucket}/{self.delta_prefix}"
+
+    @property
+    def registered_s3path(self):
+        """Where output whose schema matches the catalog goes; no crawler watches it."""
+        return f"s3://{self.bucket}/{self.registered_prefix}"
+
+    @property
+    def state_location(self):
+        """The shared watermark state file, in S3 or on local disk."""
+        return self.state_path or f"s3://{self.bucket}/{self.state_prefix}watermarks.json"
+
+    @property
+    def checkpoint_s3path(self):
+        """Where an interrupted run keeps its progress; None when checkpointing is off."""
+        if not self.checkpoint_prefix:
+            return None
+        shard = f"shard={self.array_index}/" if self.is_array_child else ""
+        return f"s3://{self.bucket}/{self.checkpoint_prefix}{shard}"
+
+    @property
+    def is_array_child(self):
+        return self.array_index >= 0
+
+    @property
+    def shard_plan(self):
+        """Every slice of the run: whole boards, plus the slices of boards listed in ``shards``."""
+        return plan_shards(self.board_ids, parse_shards(self.shards))
+
+    @property
+    def task_shards(self):
+        """Slices this task extracts: one per AWS Batch array child, all of them otherwise."""
+        plan = self.shard_plan
+        return [plan[self.array_index]] if self.is_array_child else plan
+
+    @property
+    def task_board_ids(self):
+        return list(dict.fromkeys(shard.board_id for shard in self.task_shards))
+
+    @property
+    def parent_run_id(self):
+        # Array children have job ids of the form ``<parent job id>:<index>``.
+        return self.run_id.split(":")[0]
+
+    def board_state_path(self, board_id):
+        """Per-board state file, so array children never rewrite each other's watermarks."""
+        root, ext = os.path.splitext(self.state_location)
+        return f"{root}/board_id={board_id}{ext}"
+
+    @property
+    def manifest_s3path(self):
+        return f"s3://{self.bucket}/{self.manifest_prefix}"
+
+    @classmethod
+    def load(cls, environ=os.environ, ssm_client=None):
+        values = {}
+        parameter = environ.get("MONDAY_CONFIG_PARAMETER")
+        if parameter:
+            ssm_client = ssm_client or boto3.client("ssm")
+            response = ssm_client.get_parameter(Name=parameter, WithDecryption=True)
+            values.update(json.loads(response["Parameter"]["Value"]))
+
+        # AWS Batch keeps the job id across retry attempts, so a retried task resumes its checkpoint.
+        if "AWS_BATCH_JOB_ID" in environ:
+            values["run_id"] = environ["AWS_BATCH_JOB_ID"]
+        for name, env_var in cls.ENV_VARS.items():
+            if env_var in environ:
+                values[name] = environ[env_var]
+
+        kwargs = {}
+        for f in fields(cls):
+            if f.name not in values:
+                continue
+            value = values[f.name]
+            if f.name == "board_ids" and isinstance(value, str):
+                value = [board_id.strip() for board_id in value.split(",") if board_id.strip()]
+            elif f.type is int:
+                value = int(value)
+            kwargs[f.name] = value
+        return cls(**kwargs)
+
+
+class SecretCache:
+    """Caches Secrets Manager values for ``ttl`` seconds.
+
+    The in-memory cache is shared by every thread in the process. A fetch
+    holds the lock, so concurrent workers asking for the same secret cause a
+    single ``get_secret_value`` call. With ``cache_dir`` set, values are also
+    kept in owner-only files, so processes started by the same job (such as a
+    process pool) reuse them too.
+    """
+
+    def __init__(self, ttl=300, cache_dir=None, client=None, clock=time.time):
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.clock = clock
+        self._client = client
+        self._values = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = boto3.client("secretsmanager")
+        return self._client
+
+    def get(self, secret_id):
+        """Return the ``SecretString`` of ``secret_id``."""
+        with self._lock:
+            now = self.clock()
+            cached = self._values.get(secret_id) or self._read_file(secret_id)
+            if cached and cached["expires_at"] > now:
+                self._values[secret_id] = cached
+                return cached["value"]
+
+            value = self.client.get_secret_value(SecretId=secret_id)["SecretString"]
+            cached = {"value": value, "expires_at": now + self.ttl}
+            self._values[secret_id] = cached
+            self._write_file(secret_id, cached)
+            return value
+
+    def get_json_field(self, secret_id, key):
+        return json.loads(self.get(secret_id))[key]
+
+    def invalidate(self, secret_id):
+        with self._lock:
+            self._values.pop(secret_id, None)
+            if self.cache_dir:
+                try:
+                    os.remove(self._path(secret_id))
+                except FileNotFoundError:
+                    pass
+
+    def _path(self, secret_id):
+        return os.path.join(self.cache_dir, hashlib.sha256(secret_id.encode()).hexdigest() + ".json")
+
+    def _read_file(self, secret_id):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(secret_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_file(self, secret_id, cached):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        path = self._path(secret_id)
+        fd = os.open(f"{path}.tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(cached, f)
+        os.replace(f"{path}.tmp", path)
+
+
+_secret_caches = {}
+_secret_caches_lock = threading.Lock()
+
+
+def secret_cache(config):
+    """Process-wide SecretCache for ``config``'s TTL and cache directory."""
+    key = (config.secret_ttl, config.secret_cache_dir)
+    with _secret_caches_lock:
+        if key not in _secret_caches:
+            _secret_caches[key] = SecretCache(config.secret_ttl, config.secret_cache_dir or None)
+        return _secret_caches[key]
+
+
+def get_api_key(config):
+    return secret_cache(config).get_json_field(config.secret_id, config.secret_key)
@@ -0,0 +1,286 @@
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+
+TIMESTAMP_TYPE = pa.timestamp("us", tz="UTC")
+
+DECODERS = {}
+
+
+def register_decoder(*column_types):
+    """Class decorator registering a decoder for one or more monday column types."""
+    def wrap(cls):
+        for column_type in column_types:
+            DECODERS[column_type] = cls()
+        return cls
+    return wrap
+
+
+def decoder_for(column_type):
+    return DECODERS.get(column_type, DEFAULT_DECODER)
+
+
+def _nullify_empty(array):
+    return pc.if_else(pc.equal(array, ""), pa.scalar(None, array.type), array)
+
+
+def _or_none(convert, value):
+    try:
+        return None if value is None or value == "" else convert(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Decoder:
+    """Turns one column's worth of monday.com cells into a typed Arrow array.
+
+    ``source`` picks which part of each cell the builder keeps: the raw JSON
+    ``value`` or the display ``text``. ``decode`` gets that list for a whole
+    column at once and must return an array of ``arrow_type``, so a board's
+    schema depends only on its column types, not on the data.
+
+    ``decode_checked`` also says whether the column had to be decoded cell by
+    cell and how many non-empty cells could not be read and became null.
+    """
+
+    source = "value"
+    arrow_type = pa.string()
+
+    def decode(self, values):
+        return pa.array(values, type=pa.string())
+
+    def decode_checked(self, values):
+        """Return ``(array, fell_back, nulled)`` for a column of cells."""
+        return self.decode(values), False, 0
+
+
+class TextDecoder(Decoder):
+    source = "text"
+
+    def decode(self, values):
+        return _nullify_empty(pa.array(values, type=pa.string()))
+
+
+class NumberDecoder(Decoder):
+    source = "text"
+    arrow_type = pa.float64()
+
+    def decode(self, values):
+        return self.decode_checked(values)[0]
+
+    def decode_checked(self, values):
+        strings = _nullify_empty(pa.array(values, type=pa.string()))
+        try:
+            return pc.cast(strings, self.arrow_type), False, 0
+        except pa.ArrowInvalid:
+            numbers = [_or_none(float, value) for value in strings.to_pylist()]
+            nulled = sum(1 for value, number in zip(values, numbers) if value and number is None)
+            return pa.array(numbers, type=self.arrow_type), True, nulled
+
+
+class JsonDecoder(Decoder, ABC):
+    """Parses a column of JSON ``value`` objects in one pass with Arrow's JSON reader.
+
+    Cells in a shape the one-pass read can't take, such as a number where
+    ``json_schema`` expects a string or a time without seconds, make it fail
+    for the whole column. The column is then decoded cell by cell with
+    ``parse``, and a cell that still can't be read becomes null. Such a cell
+    counts as nulled if it held any of the ``json_schema`` fields.
+    """
+
+    json_schema = pa.schema([])
+
+    def decode(self, values):
+        return self.decode_checked(values)[0]
+
+    def decode_checked(self, values):
+        if not values:
+            return pa.array([], type=self.arrow_type), False, 0
+        try:
+            return self._decode_column(values), False, 0
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            parsed = [self._parse_value(value) for value in values]
+            nulled = sum(1 for value, cell in zip(values, parsed) if cell is None and self._has_data(value))
+            return pa.array(parsed, type=self.arrow_type), True, nulled
+
+    def _decode_column(self, values):
+        lines = "\n".join(value or "{}" for value in values).encode()
+        table = pa_json.read_json(
+            io.BytesIO(lines),
+            parse_options=pa_json.ParseOptions(
+                explicit_schema=self.json_schema,
+                unexpected_field_behavior="ignore",
+            ),
+        )
+        return self.transform({name: table[name].combine_chunks() for name in table.column_names})
+
+    def _parse_value(self, value):
+        try:
+            cell = json.loads(value) if value else {}
+            return self.parse(cell if isinstance(cell, dict) else {})
+        except (TypeError, ValueError, KeyError, AttributeError):
+            return None
+
+    def _has_data(self, value):
+        try:
+            cell = json.loads(value) if value else None
+        except ValueError:
+            return True
+        if not isinstance(cell, dict):
+            return cell is not None
+        return any(cell.get(name) not in (None, "", []) for name in self.json_schema.names)
+
+    @abstractmethod
+    def transform(self, fields):
+        """Build the column from the parsed ``json_schema`` fields, as Arrow arrays."""
+
+    @abstractmethod
+    def parse(self, cell):
+        """Decode one parsed cell into a Python value of ``arrow_type``."""
+
+
+def _parse_ids(entries, field):
+    if entries is None:
+        return None
+    return [_or_none(int, entry.get(field)) for entry in entries]
+
+
+def _ids(lists, field):
+    """Reduce a list<struct<field: int64>> array to list<int64>."""
+    return pa.ListArray.from_arrays(
+        lists.offsets, pc.struct_field(lists.values, field), mask=lists.is_null()
+    )
+
+
+@register_decoder("date")
+class DateDecoder(JsonDecoder):
+    arrow_type = TIMESTAMP_TYPE
+    json_schema = pa.schema([("date", pa.string()), ("time", pa.string())])
+
+    def transform(self, fields):
+        date = _nullify_empty(fields["date"])
+        time = pc.fill_null(_nullify_empty(fields["time"]), "00:00:00")
+        timestamp = pc.strptime(
+            pc.binary_join_element_wise(date, time, "T"),
+            format="%Y-%m-%dT%H:%M:%S",
+            unit="us",
+        )
+        return timestamp.cast(self.arrow_type)
+
+    def parse(self, cell):
+        day = _or_none(date.fromisoformat, cell.get("date"))
+        if day is None:
+            return None
+        time = _or_none(_parse_time, cell.get("time")) or datetime.min.time()
+        return datetime.combine(day, time, tzinfo=timezone.utc)
+
+
+def _parse_time(value):
+    # monday.com sends HH:MM:SS, but HH:MM turns up too.
+    for time_format in ("%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.strptime(value, time_format).time()
+        except ValueError:
+            pass
+    raise ValueError(f"Not a time: {value!r}")
+
+
+@register_decoder("timeline")
+class TimelineDecoder(JsonDecoder):
+    arrow_type = pa.struct([("from", pa.date32()), ("to", pa.date32())])
+    json_schema = pa.schema([("from", pa.string()), ("to", pa.string())])
+
+    def transform(self, fields):
+        start = pc.cast(_nullify_empty(fields["from"]), pa.date32())
+        end = pc.cast(_nullify_empty(fields["to"]), pa.date32())
+        return pa.StructArray.from_arrays(
+            [start, end], fields=list(self.arrow_type), mask=pc.and_(start.is_null(), end.is_null())
+        )
+
+    def parse(self, cell):
+        start = _or_none(date.fromisoformat, cell.get("from"))
+        end = _or_none(date.fromisoformat, cell.get("to"))
+        return None if start is None and end is None else {"from": start, "to": end}
+
+
+@register_decoder("people", "multiple-person")
+class PeopleDecoder(JsonDecoder):
+    arrow_type = pa.list_(pa.int64())
+    json_schema = pa.schema([("personsAndTeams", pa.list_(pa.struct([("id", pa.int64())])))])
+
+    def transform(self, fields):
+        return _ids(fields["personsAndTeams"], "id")
+
+    def parse(self, cell):
+        return _parse_ids(cell.get("personsAndTeams"), "id")
+
+
+@register_decoder("board_relation", "board-relation")
+class BoardRelationDecoder(JsonDecoder):
+    arrow_type = pa.list_(pa.int64())
+    json_schema = pa.schema([("linkedPulseIds", pa.list_(pa.struct([("linkedPulseId", pa.int64())])))])
+
+    def transform(self, fields):
+        return _ids(fields["linkedPulseIds"], "linkedPulseId")
+
+    def parse(self, cell):
+        return _parse_ids(cell.get("linkedPulseIds"), "linkedPulseId")
+
+
+@register_decoder("checkbox", "boolean")
+class CheckboxDecoder(JsonDecoder):
+    arrow_type = pa.bool_()
+    json_schema = pa.schema([("checked", pa.string())])
+
+    def transform(self, fields):
+        return pc.equal(fields["checked"], "true")
+
+    def parse(self, cell):
+        # ``checked`` usually arrives as the string "true"/"false", sometimes as a JSON bool.
+        checked = cell.get("checked")
+        return None if checked is None else str(checked).lower() == "true"
+
+
+@register_decoder("rating")
+class RatingDecoder(JsonDecoder):
+    arrow_type = pa.int64()
+    json_schema = pa.schema([("rating", pa.int64())])
+
+    def transform(self, fields):
+        return fields["rating"]
+
+    def parse(self, cell):
+        return _or_none(int, cell.get("rating"))
+
+
+@register_decoder("location")
+class LocationDecoder(JsonDecoder):
+    arrow_type = pa.struct([("lat", pa.float64()), ("lng", pa.float64()), ("address", pa.string())])
+    json_schema = pa.schema([("lat", pa.string()), ("lng", pa.string()), ("address", pa.string())])
+
+    def transform(self, fields):
+        lat = pc.cast(_nullify_empty(fields["lat"]), pa.float64())
+        lng = pc.cast(_nullify_empty(fields["lng"]), pa.float64())
+        return pa.StructArray.from_arrays(
+            [lat, lng, fields["address"]], fields=list(self.arrow_type), mask=pc.and_(lat.is_null(), lng.is_null())
+        )
+
+    def parse(self, cell):
+        lat, lng = _or_none(float, cell.get("lat")), _or_none(float, cell.get("lng"))
+        if lat is None and lng is None:
+            return None
+        return {"lat": lat, "lng": lng, "address": _or_none(str, cell.get("address"))}
+
+
+register_decoder("numbers", "numeric")(NumberDecoder)
+register_decoder(
+    "text", "long_text", "long-text", "status", "color", "dropdown", "email", "link", "phone", "country"
+)(TextDecoder)
+
+# Unregistered column types keep their raw JSON value, as before.
+DEFAULT_DECODER = Decoder()
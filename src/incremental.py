@@ -0,0 +1,85 @@
+import io
+
+import boto3
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from layout import write_parquet_to_s3, partition_path
+from s3_writer import delete_keys, split_s3_path
+
+WATERMARK_COLUMN = "updated_at"
+
+
+def updated_since_query_params(since):
+    """``items_page`` filter for items updated on or after the watermark's day.
+
+    The API compares dates at day granularity, so the result overlaps the
+    previous run; ``filter_updated_since`` drops what was already seen.
+    """
+    return {
+        "rules": [{
+            "column_id": "__last_updated__",
+            "compare_value": ["EXACT", since[:10]],
+            "compare_attribute": "UPDATED_AT",
+            "operator": "greater_than_or_equals",
+        }]
+    }
+
+
+def filter_updated_since(items, since):
+    # Timestamps are ISO-8601 UTC strings, so they order lexicographically.
+    for item in items:
+        if item[WATERMARK_COLUMN] > since:
+            yield item
+
+
+def advance_watermark(table, since):
+    """Return the newest ``updated_at`` seen on a board, or ``since`` if none was."""
+    if table.num_rows == 0:
+        return since
+    latest = pc.max(table[WATERMARK_COLUMN]).as_py()
+    return max(latest, since) if since else latest
+
+
+def dedupe_latest(table, key="id"):
+    """Keep only the last row for each ``key``; later rows are newer."""
+    last_index = {value: index for index, value in enumerate(table[key].to_pylist())}
+    return table.take(pa.array(sorted(last_index.values()), type=pa.int64()))
+
+
+def read_parquet_keys(bucket, keys, s3_client=None):
+    s3_client = s3_client or boto3.client("s3")
+    tables = [
+        pq.read_table(io.BytesIO(s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()))
+        for key in keys
+    ]
+    return pa.concat_tables(tables, promote_options="default")
+
+
+def compact_board(board_id, board_state, base_s3path, ds, file_name_str, options=None, s3_client=None):
+    """Merge a board's delta files into a fresh snapshot partition.
+
+    The previous snapshot and the deltas are replayed in order, so the newest
+    version of each item wins. The merged table is written to
+    ``board_id=<id>/ds=<ds>/`` under ``base_s3path``, and the compacted
+    deltas, plus any older snapshot files in that same partition, are
+    deleted. Returns the updated board state.
+
+    Items deleted on the board are not removed here, because a delta never
+    reports deletions. A periodic full run refreshes the snapshot.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    bucket, _ = split_s3_path(base_s3path)
+    keys = board_state["snapshot"] + board_state["deltas"]
+    table = dedupe_latest(read_parquet_keys(bucket, keys, s3_client))
+
+    dest = partition_path(base_s3path, board_id, ds)
+    written = write_parquet_to_s3(f"{file_name_str}-compacted", table, dest, options, s3_client)
+
+    _, dest_prefix = split_s3_path(dest)
+    stale = [key for key in keys if key not in written and (
+        key in board_state["deltas"] or key.startswith(dest_prefix)
+    )]
+    delete_keys(s3_client, bucket, stale)
+    return {**board_state, "snapshot": written, "deltas": []}
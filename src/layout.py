@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+import io
+import logging
+import os
+
+import boto3
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from metrics import log_event, metrics
+from s3_writer import DEFAULT_MAX_CONCURRENCY, DEFAULT_PART_SIZE, MiB, S3MultipartWriter, split_s3_path
+
+PARTITION_COLUMN = "board_id"
+
+
+@dataclass
+class ParquetOptions:
+    """How Parquet files are encoded and when a new file is started."""
+
+    compression: str = "snappy"
+    row_group_size: int = 100_000
+    max_rows_per_file: int = 5_000_000
+    target_file_size: int = 256 * MiB
+    part_size: int = DEFAULT_PART_SIZE
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        defaults = cls()
+        return cls(
+            compression=environ.get("PARQUET_COMPRESSION", defaults.compression),
+            row_group_size=int(environ.get("PARQUET_ROW_GROUP_SIZE", defaults.row_group_size)),
+            max_rows_per_file=int(environ.get("PARQUET_MAX_ROWS_PER_FILE", defaults.max_rows_per_file)),
+            target_file_size=int(environ.get("PARQUET_TARGET_FILE_SIZE_MB", defaults.target_file_size // MiB)) * MiB,
+            part_size=int(environ.get("S3_PART_SIZE_MB", defaults.part_size // MiB)) * MiB,
+            max_concurrency=int(environ.get("S3_UPLOAD_CONCURRENCY", defaults.max_concurrency)),
+        )
+
+
+def partition_path(base_s3path, board_id, ds):
+    return f"{base_s3path.rstrip('/')}/board_id={board_id}/ds={ds}/"
+
+
+def read_parquet_schema(bucket, key, s3_client=None):
+    """Read a Parquet file's schema from its footer, without downloading the data."""
+    s3_client = s3_client or boto3.client("s3")
+    tail = s3_client.get_object(Bucket=bucket, Key=key, Range="bytes=-8")["Body"].read()
+    footer_length = int.from_bytes(tail[:4], "little")
+    footer = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes=-{footer_length + 8}")["Body"].read()
+    # The footer is self-describing; the leading magic makes it parse as a (data-less) file.
+    return pq.read_schema(io.BytesIO(b"PAR1" + footer))
+
+
+def write_parquet_to_s3(file_name_str, table, dest_s3path_str, options=None, s3_client=None):
+    """Stream ``table`` to S3 as one or more Parquet files, row group by row group.
+
+    Row groups are encoded straight into a multipart upload, so the file is
+    never buffered in memory. A new file (``{file_name_str}-00001.parquet``,
+    ``-00002``, ...) is started once the current one reaches
+    ``max_rows_per_file`` rows or ``target_file_size`` bytes. On failure the
+    in-progress upload is aborted and the error is re-raised. Returns the keys
+    written.
+    """
+    options = options or ParquetOptions()
+    bucket_name, file_path = split_s3_path(dest_s3path_str)
+    keys = []
+    try:
+        offset = 0
+        while offset < table.num_rows or not keys:
+            key = f"{file_path}{file_name_str}-{len(keys) + 1:05d}.parquet"
+            offset = _write_file(table, offset, bucket_name, key, options, s3_client)
+            keys.append(key)
+        log_event("parquet_written", path=dest_s3path_str, files=len(keys), rows=table.num_rows)
+        return keys
+    except Exception as e:
+        log_event("parquet_write_failed", level=logging.ERROR, path=dest_s3path_str, error=str(e))
+        raise
+
+
+def _write_file(table, offset, bucket_name, key, options, s3_client):
+    """Write row groups from ``offset`` until the file is full; return the next offset."""
+    rows_in_file = 0
+    with S3MultipartWriter(
+        bucket_name,
+        key,
+        part_size=options.part_size,
+        max_concurrency=options.max_concurrency,
+        s3_client=s3_client,
+    ) as sink:
+        with pq.ParquetWriter(sink, table.schema, compression=options.compression) as writer:
+            while True:
+                length = min(options.row_group_size, options.max_rows_per_file - rows_in_file)
+                row_group = table.slice(offset, length)
+                writer.write_table(row_group, row_group_size=options.row_group_size)
+                offset += row_group.num_rows
+                rows_in_file += row_group.num_rows
+                if (
+                    offset >= table.num_rows
+                    or rows_in_file >= options.max_rows_per_file
+                    or sink.tell() >= options.target_file_size
+                ):
+                    break
+    metrics.incr("BytesWritten", sink.tell(), unit="Bytes")
+    metrics.incr("FilesWritten")
+    return offset
+
+
+def write_partitioned(table, base_s3path, ds, file_name_str, options=None, s3_client=None):
+    """Write one Hive partition per board: ``{base}/board_id=<id>/ds=<ds>/``.
+
+    The partition column is dropped from the files themselves, as Glue and
+    Athena expect, so queries filtering on ``board_id`` or ``ds`` only read
+    the matching prefixes. Returns ``{board_id: [keys]}``.
+    """
+    written = {}
+    for board_id in pc.unique(table[PARTITION_COLUMN]).to_pylist():
+        board_table = table.filter(pc.equal(table[PARTITION_COLUMN], board_id))
+        with metrics.stage("write", BoardId=board_id):
+            written[board_id] = write_parquet_to_s3(
+                file_name_str,
+                board_table.drop_columns([PARTITION_COLUMN]),
+                partition_path(base_s3path, board_id, ds),
+                options,
+                s3_client,
+            )
+    return written
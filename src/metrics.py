@@ -0,0 +1,144 @@
+from collections import defaultdict
+from contextlib import contextmanager
+import json
+import logging
+import resource
+import sys
+import threading
+import time
+
+NAMESPACE = "MondayExtract"
+
+logger = logging.getLogger("mondays")
+
+
+def configure_logging(level=logging.INFO):
+    """Send the job's JSON log lines to stdout as-is, one per line."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Write one structured JSON log line."""
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({"event": event, **fields}, default=str))
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Metrics:
+    """Thread-safe counters, stage timings and memory samples for one job run.
+
+    Values are keyed by metric name plus dimensions (for example
+    ``BoardId``). ``emit()`` writes one CloudWatch Embedded Metric Format line
+    per dimension set, so CloudWatch can turn the job's log stream into
+    metrics without any API calls.
+    """
+
+    def __init__(self, namespace=NAMESPACE, clock=time.time):
+        self.namespace = namespace
+        self.clock = clock
+        self._values = defaultdict(float)
+        self._units = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1, unit="Count", **dimensions):
+        key = (name, tuple(sorted(dimensions.items())))
+        with self._lock:
+            self._values[key] += value
+            self._units[name] = unit
+
+    def gauge(self, name, value, unit="None", **dimensions):
+        key = (name, tuple(sorted(dimensions.items())))
+        with self._lock:
+            self._values[key] = max(self._values.get(key, value), value)
+            self._units[name] = unit
+
+    def get(self, name, **dimensions):
+        with self._lock:
+            return self._values.get((name, tuple(sorted(dimensions.items()))), 0)
+
+    def total(self, name, **dimensions):
+        """Sum of ``name`` over every dimension set that includes ``dimensions``."""
+        wanted = set(dimensions.items())
+        with self._lock:
+            return sum(
+                value for (key, key_dimensions), value in self._values.items()
+                if key == name and wanted <= set(key_dimensions)
+            )
+
+    def sample_memory(self, **dimensions):
+        peak = round(peak_rss_mb(), 1)
+        self.gauge("PeakRssMB", peak, unit="Megabytes", **dimensions)
+        return peak
+
+    @contextmanager
+    def stage(self, stage, log=True, **dimensions):
+        """Time a stage, record its duration and peak memory, and log the outcome.
+
+        Pass ``log=False`` for stages that run once per page or batch, where a
+        log line each time would be noise; their time is still recorded.
+        """
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.incr("StageSeconds", seconds, unit="Seconds", Stage=stage, **dimensions)
+            if log:
+                log_event(
+                    "stage",
+                    stage=stage,
+                    status=status,
+                    seconds=round(seconds, 3),
+                    peak_rss_mb=self.sample_memory(),
+                    **dimensions,
+                )
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+            self._units.clear()
+
+    def emf_documents(self):
+        by_dimensions = defaultdict(dict)
+        with self._lock:
+            for (name, dimensions), value in self._values.items():
+                by_dimensions[dimensions][name] = value
+            units = dict(self._units)
+
+        timestamp = int(self.clock() * 1000)
+        for dimensions, values in by_dimensions.items():
+            yield {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [[name for name, _ in dimensions]],
+                        "Metrics": [{"Name": name, "Unit": units[name]} for name in values],
+                    }],
+                },
+                **dict(dimensions),
+                **values,
+            }
+
+    def emit(self, stream=None):
+        stream = stream or sys.stdout
+        for document in self.emf_documents():
+            stream.write(json.dumps(document, default=str) + "\n")
+        stream.flush()
+
+
+# Shared by every module of the job, like a module-level logger.
+metrics = Metrics()
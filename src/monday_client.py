@@ -0,0 +1,197 @@
+import logging
+import random
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import log_event, metrics
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# monday.com reports budget/rate problems either as a legacy top-level
+# ``error_code`` or as a GraphQL error ``extensions.code`` depending on API version.
+THROTTLE_ERROR_CODES = {
+    "ComplexityException",
+    "COMPLEXITY_BUDGET_EXHAUSTED",
+    "RateLimitExceeded",
+    "RATE_LIMIT_EXCEEDED",
+    "maxConcurrencyExceeded",
+    "IP_RATE_LIMIT_EXCEEDED",
+}
+
+RESET_IN_SECONDS = re.compile(r"reset in (\d+) seconds?")
+
+# Pagination cursors expire after an hour; monday.com reports that, or a
+# cursor it doesn't recognise, as an error code or only in the message.
+CURSOR_ERROR_CODES = {"CursorException", "CURSOR_EXPIRED", "INVALID_CURSOR"}
+CURSOR_ERROR = re.compile(r"cursor.*(expired|invalid)|invalid.*cursor", re.IGNORECASE)
+
+
+class MondayApiError(Exception):
+    """ Exception thrown when the monday.com API returns an error that is not worth retrying"""
+    pass
+
+
+class MondayThrottledError(MondayApiError):
+    """ Exception thrown when the API keeps throttling us after every retry"""
+    pass
+
+
+class MondayCursorError(MondayApiError):
+    """ Exception thrown when a pagination cursor has expired or is not valid"""
+    pass
+
+
+class MondayClient:
+    """Reusable monday.com GraphQL client.
+
+    Keeps a pooled keep-alive session, retries 429/5xx and throttling errors
+    with exponential backoff and full jitter, and reads the ``complexity``
+    block of each response so it can wait for the budget to reset before the
+    API starts rejecting queries. Safe to share between worker threads.
+    """
+
+    def __init__(
+        self,
+        api_url,
+        api_key,
+        timeout=(10, 120),
+        max_retries=5,
+        backoff_base=1.0,
+        backoff_max=60.0,
+        pool_size=10,
+        min_complexity_budget=100_000,
+        sleep=time.sleep,
+    ):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.min_complexity_budget = min_complexity_budget
+        self.sleep = sleep
+
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": api_key})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._budget_resets_at = 0.0
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, query, variables=None):
+        """Run a GraphQL query and return its ``data`` block."""
+        payload = {"query": query, "variables": variables or {}}
+        attempt = 0
+        while True:
+            self._wait_for_budget()
+            delay = None
+            metrics.incr("ApiRequests")
+            try:
+                r = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                error, delay = self._check_response(r)
+                if error is None:
+                    data = r.json()["data"]
+                    self._record_complexity(data.get("complexity"))
+                    return data
+
+            if attempt >= self.max_retries:
+                raise MondayThrottledError(f"Giving up after {attempt + 1} attempts: {error}")
+            delay = delay if delay is not None else self._backoff(attempt)
+            metrics.incr("Retries")
+            log_event("api_retry", level=logging.WARNING, attempt=attempt + 1, delay=round(delay, 2), error=str(error))
+            self.sleep(delay)
+            attempt += 1
+
+    def _check_response(self, r):
+        """Return ``(retryable_error, delay)``; raise for errors that won't go away."""
+        retry_after = r.headers.get("Retry-After")
+        delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+
+        if r.status_code in RETRYABLE_STATUS_CODES and not self._is_json(r):
+            return f"HTTP {r.status_code}", delay
+
+        try:
+            body = r.json()
+        except ValueError:
+            r.raise_for_status()
+            raise MondayApiError(f"Unexpected non-JSON response (HTTP {r.status_code})")
+
+        errors = body.get("errors") or []
+        if body.get("error_code"):
+            errors.append({
+                "message": body.get("error_message", ""),
+                "extensions": {"code": body["error_code"]},
+            })
+
+        for error in errors:
+            extensions = error.get("extensions") or {}
+            if extensions.get("code") in THROTTLE_ERROR_CODES:
+                return error.get("message"), self._throttle_delay(error, delay)
+
+        if r.status_code in RETRYABLE_STATUS_CODES:
+            return f"HTTP {r.status_code}", delay
+        if any(self._is_cursor_error(error) for error in errors):
+            raise MondayCursorError(f"HTTP {r.status_code}: {errors}")
+        if errors or r.status_code >= 400:
+            raise MondayApiError(f"HTTP {r.status_code}: {errors or body}")
+        if body.get("data") is None:
+            raise MondayApiError(f"Response has no data: {body}")
+        return None, None
+
+    @staticmethod
+    def _is_cursor_error(error):
+        code = (error.get("extensions") or {}).get("code")
+        return code in CURSOR_ERROR_CODES or bool(CURSOR_ERROR.search(error.get("message") or ""))
+
+    def _throttle_delay(self, error, default):
+        extensions = error.get("extensions") or {}
+        if extensions.get("retry_in_seconds") is not None:
+            return float(extensions["retry_in_seconds"])
+        match = RESET_IN_SECONDS.search(error.get("message") or "")
+        if match:
+            return float(match.group(1))
+        return default
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record_complexity(self, complexity):
+        if not complexity or complexity.get("after") is None:
+            return
+        # Keep enough headroom for another query as expensive as this one.
+        floor = max(self.min_complexity_budget, 2 * (complexity.get("query") or 0))
+        if complexity["after"] < floor:
+            with self._lock:
+                self._budget_resets_at = max(
+                    self._budget_resets_at,
+                    time.monotonic() + complexity.get("reset_in_x_seconds", 0),
+                )
+
+    def _wait_for_budget(self):
+        with self._lock:
+            wait = self._budget_resets_at - time.monotonic()
+        if wait > 0:
+            metrics.incr("ThrottleWaitSeconds", wait, unit="Seconds")
+            log_event("complexity_budget_wait", seconds=round(wait, 1))
+            self.sleep(wait)
+
+    @staticmethod
+    def _is_json(r):
+        return "json" in r.headers.get("Content-Type", "")
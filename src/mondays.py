@@ -1,135 +1,684 @@
-from datetime import datetime
-import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
 import json
-import requests
+import logging
+import sys
 
 import boto3
-import pandas as pd
-
-def get_first_items_page(apiUrl, headers, board_id):
-
-    query_item = f"""
-    query {{
-        boards (ids: [{board_id}]){{
-            columns {{
-                    id,
-                    title
-                }}
-            items_page (limit:500){{
-                cursor
-                    items {{
-                        id 
-                        created_at 
-                        name 
-                        board {{
-                            id
-                        }}
-                    column_values {{
-                        id,
-                        text, 
-                        type, 
-                        value
-                    }}
-                }}
-            }}
+from botocore.exceptions import ClientError
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from checkpoint import Checkpoint
+from config import JobConfig, get_api_key
+from incremental import (
+    WATERMARK_COLUMN,
+    advance_watermark,
+    compact_board,
+    filter_updated_since,
+    read_parquet_keys,
+    updated_since_query_params,
+)
+from layout import ParquetOptions, read_parquet_schema, write_partitioned
+from metrics import configure_logging, log_event, metrics
+from monday_client import MondayClient, MondayCursorError
+from normalize import combine_tables, content_hash, new_builder, page_pool, type_conflicts
+from s3_writer import S3MultipartWriter, delete_keys, split_s3_path
+from schema_check import CatalogTable
+from sharding import Shard, ShardLayouts, created_at_rules, group_rules, merge_shards, plan_shards
+from state import JsonState
+
+ITEM_FIELDS = """
+    id
+    created_at
+    updated_at
+    name
+    board {
+        id
+    }
+    column_values {
+        id
+        text
+        type
+        value
+    }
+"""
+
+COMPLEXITY_FIELDS = """
+    complexity {
+        query
+        after
+        reset_in_x_seconds
+    }
+"""
+
+BOARD_COLUMNS_QUERY = f"""
+query ($board_id: [ID!]) {{
+    {COMPLEXITY_FIELDS}
+    boards (ids: $board_id) {{
+        columns {{
+            id
+            title
+            type
+        }}
+    }}
+}}
+"""
+
+FIRST_ITEMS_PAGE_QUERY = f"""
+query ($board_id: [ID!], $limit: Int!, $query_params: ItemsQuery) {{
+    {COMPLEXITY_FIELDS}
+    boards (ids: $board_id) {{
+        items_page (limit: $limit, query_params: $query_params) {{
+            cursor
+            items {{ {ITEM_FIELDS} }}
+        }}
+    }}
+}}
+"""
+
+NEXT_ITEMS_PAGE_QUERY = f"""
+query ($cursor: String!, $limit: Int!) {{
+    {COMPLEXITY_FIELDS}
+    next_items_page (cursor: $cursor, limit: $limit) {{
+        cursor
+        items {{ {ITEM_FIELDS} }}
+    }}
+}}
+"""
+
+BOARD_GROUPS_QUERY = f"""
+query ($board_id: [ID!]) {{
+    {COMPLEXITY_FIELDS}
+    boards (ids: $board_id) {{
+        groups {{
+            id
+            title
         }}
     }}
+}}
+"""
+
+PAGE_LIMIT = 500
+
+OLDEST_FIRST = {"order_by": [{"column_id": "__creation_log__", "direction": "asc"}]}
+
+
+def get_board_columns(client, board_id):
+    data = client.execute(BOARD_COLUMNS_QUERY, {"board_id": [board_id]})
+    return data["boards"][0]["columns"]
+
+def get_board_groups(client, board_id):
+    data = client.execute(BOARD_GROUPS_QUERY, {"board_id": [board_id]})
+    return data["boards"][0]["groups"]
+
+def get_first_items_page(client, board_id, limit=PAGE_LIMIT, query_params=None):
+    data = client.execute(
+        FIRST_ITEMS_PAGE_QUERY,
+        {"board_id": [board_id], "limit": limit, "query_params": query_params},
+    )
+    return data["boards"][0]["items_page"]
+
+def get_next_items_page(client, cursor, limit=PAGE_LIMIT):
+    data = client.execute(NEXT_ITEMS_PAGE_QUERY, {"cursor": cursor, "limit": limit})
+    return data["next_items_page"]
+
+def iter_board_pages(client, board_id, limit=PAGE_LIMIT, query_params=None, cursor=None):
+    """Yield ``(items, next_cursor)`` for each page of a board.
+
+    ``query_params`` is passed to the first ``items_page`` call and the cursor
+    carries the filter forward. With ``cursor`` the walk resumes from that
+    page instead. ``next_cursor`` is None on the last page.
+    """
+    with metrics.stage("fetch", log=False, BoardId=board_id):
+        if cursor:
+            page = get_next_items_page(client, cursor, limit)
+        else:
+            page = get_first_items_page(client, board_id, limit, query_params)
+    while True:
+        metrics.incr("Pages", BoardId=board_id)
+        metrics.incr("Items", len(page["items"]), BoardId=board_id)
+        cursor = page.get("cursor")
+        yield page["items"], cursor
+        if not cursor:
+            return
+        with metrics.stage("fetch", log=False, BoardId=board_id):
+            page = get_next_items_page(client, cursor, limit)
+
+def iter_board_items(client, board_id, limit=PAGE_LIMIT, query_params=None):
+    """Yield every item on a board, following the items_page cursor until it runs out.
+
+    Only one page is held in memory at a time.
+    """
+    for items, _ in iter_board_pages(client, board_id, limit, query_params):
+        yield from items
+
+def shard_layout(client, shard):
+    """What ``shard``'s board is cut by: its groups, or the days from its oldest item to today."""
+    if shard.mode == "group":
+        return {"groups": [{"id": group["id"]} for group in get_board_groups(client, shard.board_id)]}
+    oldest = get_first_items_page(client, shard.board_id, 1, OLDEST_FIRST)["items"]
+    return {
+        "first_day": oldest[0]["created_at"][:10] if oldest else None,
+        "last_day": datetime.now(timezone.utc).date().isoformat(),
+    }
+
+def shard_rules(client, shard, layouts=None):
+    """``items_page`` rules restricting a board to ``shard``; None if the slice is empty.
+
+    The board's layout comes from ``layouts``, so every slice of it is cut
+    the same way (see ShardLayouts).
+    """
+    if shard.mode not in ("group", "created_at"):
+        return []
+    layouts = layouts or ShardLayouts()
+    layout = layouts.get(shard.board_id, lambda: shard_layout(client, shard))
+    if shard.mode == "group":
+        return group_rules(shard, layout["groups"])
+    if not layout["first_day"]:
+        return [] if shard.index == 0 else None
+    return created_at_rules(shard, date.fromisoformat(layout["first_day"]), date.fromisoformat(layout["last_day"]))
+
+def iter_shard_pages(client, shard, updated_since=None, cursor=None, layouts=None):
+    """Yield ``(items, next_cursor)`` for one slice of a board, changed after ``updated_since``.
+
+    With ``cursor`` the walk resumes from that page, which already carries
+    the slice's filter.
+    """
+    query_params = None
+    if not cursor:
+        rules = shard_rules(client, shard, layouts)
+        if rules is None:
+            return
+        if updated_since:
+            rules = rules + updated_since_query_params(updated_since)["rules"]
+        query_params = {"rules": rules} if rules else None
+    for items, next_cursor in iter_board_pages(client, shard.board_id, query_params=query_params, cursor=cursor):
+        if updated_since:
+            items = list(filter_updated_since(items, updated_since))
+        yield items, next_cursor
+
+def extract_board(client, board_id, updated_since=None, checkpoint=None, shard=None, pool=None, layouts=None):
+    """Fetch a board's items, or one ``shard`` of them, and normalize them into an Arrow table.
+
+    With ``updated_since`` only items changed after that timestamp are fetched.
+    With a ``checkpoint`` the rows are saved as they are fetched, and a slice
+    the checkpoint has seen before is resumed instead of fetched again. With a
+    process ``pool`` pages are flattened and decoded in other processes while
+    the next page is fetched (see PooledBuilder). ``layouts`` holds how
+    sharded boards are cut in this run.
+    """
+    shard = shard or Shard(board_id)
+    with metrics.stage("extract", BoardId=board_id, **({"Shard": shard.key} if shard.count > 1 else {})):
+        if checkpoint is not None:
+            return _extract_board_checkpointed(client, shard, updated_since, checkpoint, pool, layouts)
+        builder = new_builder(get_board_columns(client, board_id), pool)
+        for items, _ in iter_shard_pages(client, shard, updated_since, layouts=layouts):
+            builder.extend(items)
+        return builder.to_table()
+
+def _extract_board_checkpointed(client, shard, updated_since, checkpoint, pool, layouts):
+    progress = checkpoint.board(shard.key)
+    tables = [checkpoint.read_parts(shard.key)]
+    if not progress["done"]:
+        try:
+            tables += _fetch_checkpointed_parts(
+                client, shard, updated_since, checkpoint, progress["cursor"], pool, layouts
+            )
+        except MondayCursorError as e:
+            if not progress["cursor"]:
+                raise
+            # Cursors expire after an hour, so a long-interrupted board starts over.
+            # Any other error leaves the saved parts for the next attempt.
+            log_event("checkpoint_restart_board", level=logging.WARNING, board_id=shard.key, error=str(e))
+            checkpoint.reset_board(shard.key)
+            tables = _fetch_checkpointed_parts(client, shard, updated_since, checkpoint, None, pool, layouts)
+    return pa.concat_tables([table for table in tables if table is not None], promote_options="default")
+
+def _fetch_checkpointed_parts(client, shard, updated_since, checkpoint, cursor, pool, layouts):
+    columns = get_board_columns(client, shard.board_id)
+    tables = []
+    builder = new_builder(columns, pool)
+    for items, next_cursor in iter_shard_pages(client, shard, updated_since, cursor, layouts):
+        builder.extend(items)
+        if builder.num_rows >= checkpoint.rows_per_part or next_cursor is None:
+            table = builder.to_table()
+            checkpoint.save_part(shard.key, table, next_cursor)
+            tables.append(table)
+            builder = new_builder(columns, pool)
+    if not tables and not cursor:
+        # An empty slice has no pages, but is still finished.
+        table = builder.to_table()
+        checkpoint.save_part(shard.key, table, None)
+        tables.append(table)
+    return tables
+
+def extract_boards(client, board_ids, max_workers=4, watermarks=None, checkpoint=None, shards=None, pool=None,
+                   layouts=None):
+    """Extract several boards concurrently on a bounded thread pool.
+
+    Returns ``(tables, failures)``: a dict of ``board_id -> table`` for the
+    boards that succeeded, in ``board_ids`` order regardless of completion
+    order, and a dict of ``board_id -> exception`` for the boards that failed.
+    ``watermarks`` maps board ids to the ``updated_since`` to extract from.
+
+    ``shards`` lists the slices to extract (see sharding.py) and defaults to
+    one whole-board slice per board. Slices of the same board run in
+    parallel and are merged, without duplicates, into that board's table; a
+    board fails if any of its slices does. ``pool`` is a process pool shared
+    by every board for page decoding. ``layouts`` defaults to a run-local
+    ShardLayouts; array children pass one shared through S3.
+    """
+    watermarks = watermarks or {}
+    shards = shards or plan_shards(board_ids, {})
+    layouts = layouts or ShardLayouts()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            (shard, executor.submit(
+                extract_board, client, shard.board_id, watermarks.get(shard.board_id), checkpoint, shard, pool, layouts
+            ))
+            for shard in shards
+        ]
+
+    slices = {board_id: [] for board_id in board_ids}
+    failures = {}
+    for shard, future in futures:
+        try:
+            slices[shard.board_id].append(future.result())
+        except Exception as e:
+            log_event("board_failed", level=logging.ERROR, board_id=shard.board_id, shard=shard.key, error=str(e))
+            if shard.board_id not in failures:
+                metrics.incr("BoardsFailed")
+                failures[shard.board_id] = e
+    tables = {
+        board_id: merge_shards(board_tables)
+        for board_id, board_tables in slices.items()
+        if board_tables and board_id not in failures
+    }
+    return tables, failures
+
+def write_incremental(tables, state, warehouse_s3path_dest, delta_s3path_dest, now, options, compact_every):
+    """Write first-seen boards as snapshots and the rest as deltas, then advance watermarks.
+
+    A board is compacted back into a single snapshot once it has accumulated
+    ``compact_every`` delta writes.
     """
+    ds = now.strftime("%Y-%m-%d")
+    dt = now.strftime("%Y_%m_%d_%H_%M_%S")
+    snapshots = [table for board_id, table in tables.items() if board_id not in state]
+    # A board with no changed items writes no delta file.
+    deltas = [table for board_id, table in tables.items() if board_id in state and table.num_rows]
+
+    written = {}
+    if snapshots:
+        written.update(write_partitioned(combine_tables(snapshots, now), warehouse_s3path_dest, ds, dt, options))
+    if deltas:
+        written.update(write_partitioned(combine_tables(deltas, now), delta_s3path_dest, ds, dt, options))
+
+    for board_id, table in tables.items():
+        board_state = state.get(board_id)
+        if board_state is None:
+            board_state = {"watermark": None, "snapshot": written.get(board_id, []), "deltas": []}
+        else:
+            board_state = {**board_state, "deltas": board_state["deltas"] + written.get(board_id, [])}
+        board_state["watermark"] = advance_watermark(table, board_state["watermark"])
+
+        if len(board_state["deltas"]) >= compact_every:
+            log_event("compact", board_id=board_id, deltas=len(board_state["deltas"]))
+            with metrics.stage("compact", BoardId=board_id):
+                board_state = compact_board(board_id, board_state, warehouse_s3path_dest, ds, dt, options)
+        state[board_id] = board_state
+    return state
 
-    data = {"query": query_item}
-    r = requests.post(url=apiUrl, json=data, headers=headers)
-    # print(r.json())
-    return r.json()
-
-def write_parquet_to_s3(file_name_str, df, dest_s3path_str):
-    
-    new_file_name = f"{file_name_str}.parquet"
-    bucket_name = dest_s3path_str.split("/")[2]
-    path_after_bucket = dest_s3path_str.replace("s3://", "")
-    index = path_after_bucket.find("/")
-    file_path = path_after_bucket[index + 1 :]
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    configure_logging()
+    config = JobConfig.load()
     try:
-        # Convert DataFrame to Parquet bytes
-        parquet_buffer = io.BytesIO()
-        df.to_parquet(parquet_buffer, index=False)
-
-        # Write Parquet data to S3
-        s3_client = boto3.client("s3")
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=file_path + new_file_name,
-            Body=parquet_buffer.getvalue(),
+        if argv[:1] == ["finalize"]:
+            finalize(config, argv[1] if len(argv) > 1 else config.parent_run_id)
+        else:
+            run(config)
+    finally:
+        metrics.sample_memory()
+        metrics.emit()
+
+def run(config):
+    """Extract the task's boards and write them.
+
+    As an AWS Batch array child the task only extracts the slice at
+    ``AWS_BATCH_JOB_ARRAY_INDEX`` of ``config.shard_plan`` (a whole board
+    unless the board is sharded), keeps that board's watermark in its own
+    state file, and leaves a shard manifest for ``finalize``.
+
+    With ``schema_precheck`` on, a full run whose output fits the table's
+    registered schema writes under ``registered_prefix`` and adds its
+    partitions to the catalog itself, so no crawl is triggered.
+    """
+    incremental = config.extract_mode == "incremental"
+    options = ParquetOptions.from_env()
+    shards = config.task_shards
+    board_ids = config.task_board_ids
+    file_suffix = ""
+    if config.is_array_child and shards[0].count > 1:
+        if incremental:
+            sys.exit("Sharded boards can't be split across array children in incremental mode")
+        # Slices of one board share its partition, so each child needs its own file names.
+        file_suffix = f"-{shards[0].index:03d}"
+
+    API_KEY = get_api_key(config)
+
+    now = datetime.now(timezone.utc)
+    state = load_state(config, board_ids) if incremental else {}
+    checkpoint = None
+    if config.checkpoint_s3path:
+        # A resumed run keeps its original start time and watermarks, so it writes the same keys.
+        checkpoint = Checkpoint(config.checkpoint_s3path, config.run_id, config.checkpoint_rows).open(now, state)
+        now, state = checkpoint.started_at, checkpoint.base_state
+    ds = now.strftime("%Y-%m-%d")
+    dt = now.strftime("%Y_%m_%d_%H_%M_%S")
+    watermarks = {board_id: board_state["watermark"] for board_id, board_state in state.items()}
+
+    with MondayClient(config.api_url, API_KEY, pool_size=config.max_workers) as client, \
+            page_pool(config.encode_workers) as pool:
+        tables, failures = extract_boards(
+            client, board_ids, config.max_workers, watermarks, checkpoint, shards, pool, shard_layouts(config)
         )
+    if not tables:
+        sys.exit(f"All boards failed: {sorted(failures)}")
+    rows = {board_id: table.num_rows for board_id, table in tables.items()}
+
+    if incremental:
+        previous = {board_id: set(board_state["snapshot"] + board_state["deltas"]) for board_id, board_state in state.items()}
+        state = write_incremental(
+            tables, dict(state), config.warehouse_s3path, config.delta_s3path, now, options, config.compact_every
+        )
+        written = {
+            board_id: [key for key in state[board_id]["snapshot"] + state[board_id]["deltas"]
+                       if key not in previous.get(board_id, ())]
+            for board_id in tables
+        }
+        log_event("changed_items", rows=sum(rows.values()))
+        hashes, unchanged = {}, {}
+    else:
+        hashes, unchanged = {}, {}
+        # Slices of a board can't be compared with a whole board's hash.
+        if config.skip_unchanged and not file_suffix:
+            with metrics.stage("hash"):
+                hashes = {board_id: content_hash(table) for board_id, table in tables.items()}
+            unchanged = unchanged_boards(latest_manifest(config), hashes)
+            for board_id in unchanged:
+                del tables[board_id]
+            if unchanged:
+                metrics.incr("BoardsUnchanged", len(unchanged))
+                log_event("unchanged_boards", boards=sorted(unchanged))
+        written = dict(unchanged)
+        if tables:
+            with metrics.stage("combine"):
+                table = combine_tables(list(tables.values()), now)
+            del tables
+            log_event("combined", rows=table.num_rows, columns=table.num_columns)
+            catalog = schema_precheck(config, table.schema) if config.schema_precheck else None
+            base_s3path = config.registered_s3path if catalog else config.warehouse_s3path
+            new_files = write_partitioned(table, base_s3path, ds, f"{dt}{file_suffix}", options)
+            if catalog:
+                catalog.add_partitions(base_s3path, new_files, ds)
+            written.update(new_files)
+
+    write_manifest(config, now, written, rows, failures, hashes, sorted(unchanged))
+    if incremental:
+        save_state(config, state, board_ids)
+    if checkpoint:
+        checkpoint.clear()
 
-        print(f"Parquet files written to {dest_s3path_str}")
+    if failures:
+        sys.exit(f"Processing complete with failed boards: {sorted(failures)}")
+    log_event("complete", boards=len(board_ids))
+
+def schema_precheck(config, schema):
+    """The catalog table to add this run's partitions to, or None if the output needs a crawl.
+
+    Any failure to read the catalog counts as drift, so the crawler still picks the output up.
+    """
+    catalog = CatalogTable(config.glue_database, config.glue_table, config.bucket, config.schema_registry_prefix)
+    try:
+        with metrics.stage("schema_precheck"):
+            return catalog if catalog.precheck(schema) else None
+    except ClientError as e:
+        log_event("schema_precheck_failed", level=logging.WARNING, error=str(e))
         return None
-    except Exception as e:
-        print(f"Error writing files to {dest_s3path_str}: {e}")
+
+def load_state(config, board_ids):
+    state = JsonState(config.state_location).load(default={})
+    if config.is_array_child:
+        # A board's own state file is newer than the shared one until finalize merges it.
+        for board_id in board_ids:
+            state.update(JsonState(config.board_state_path(board_id)).load(default={}))
+    return state
+
+def save_state(config, state, board_ids):
+    if config.is_array_child:
+        for board_id in board_ids:
+            if board_id in state:
+                JsonState(config.board_state_path(board_id)).save({board_id: state[board_id]})
+    else:
+        JsonState(config.state_location).save(state)
+
+def latest_manifest(config, s3_client=None):
+    """The newest run manifest, or None before the first run."""
+    s3_client = s3_client or boto3.client("s3")
+    bucket, prefix = split_s3_path(config.manifest_s3path)
+    pending = f"{prefix}pending/"
+    # Run manifests are keyed <ds>/<timestamp>.json, so the newest sorts last.
+    keys = [
+        obj["Key"]
+        for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix)
+        for obj in page.get("Contents", [])
+        if not obj["Key"].startswith(pending)
+    ]
+    if not keys:
         return None
-    
-if __name__ == '__main__':
-    
-    ds = datetime.now().strftime("%Y-%m-%d")
-    dt = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
-    warehouse_s3path_dest = f"s3://cdk-batch-s3-glue-test-bucket/monday.com/items/{ds}/"
-
-    secrets_client = boto3.client('secretsmanager')
-    secret = secrets_client.get_secret_value(SecretId='/api_keys/MONDAYS_COM')
-    API_KEY = json.loads(secret['SecretString'])['/api_keys/MONDAYS_COM']
-
-    api_url = "https://api.monday.com/v2"
-    headers = {"Authorization": API_KEY}
-
-    board_ids = ["6255740472", "6058656936", "6125794481"]
-    # ids for  [monday_listings board, monday_dispositions PGY, monday_dispositions SLD]
-
-    for board_id in board_ids:
-        print(f"Processing board: {board_id}...")
-        response = get_first_items_page(api_url, headers, board_id)
-        data = (
-            response.get("data", None)
-            .get("boards", None)[0]
-            .get("items_page", None)
-            .get("items", None)
-        )
+    return json.loads(s3_client.get_object(Bucket=bucket, Key=max(keys))["Body"].read())
 
-        data_columns = (
-            response.get("data", None)
-            .get("boards", None)[0]
-            .get("columns", None)
-        )
+def unchanged_boards(previous_manifest, hashes):
+    """Map boards whose content hash matches the last run to the files that still hold them."""
+    if not previous_manifest:
+        return {}
+    previous_hashes = previous_manifest.get("hashes") or {}
+    return {
+        board_id: previous_manifest["files"][board_id]
+        for board_id, content in hashes.items()
+        if previous_hashes.get(board_id) == content and previous_manifest["files"].get(board_id)
+    }
 
-        normalized_data = []
+def manifest_path(config, started_at):
+    return f"{config.manifest_s3path}{started_at.strftime('%Y-%m-%d')}/{started_at.strftime('%Y_%m_%d_%H_%M_%S')}.json"
 
-        columns_lambda = lambda id : [column for column in data_columns if column['id'] == id][0]['title']
+def pending_manifests_path(config, run_id):
+    return f"{config.manifest_s3path}pending/{run_id}/"
 
-        for item in data:
-            flattened_item = {
-                columns_lambda(i['id']):i['value'] for i in item['column_values']
-            }
-            flattened_item['id'] = item['id']
-            flattened_item['created_at'] = item['created_at']
-            flattened_item['name'] = item['name']
-            flattened_item['board'] = item['board']
-            normalized_data.append(flattened_item)
+def shard_layouts(config):
+    """Layouts of the sharded boards, shared by all children of an array job through S3."""
+    if not config.is_array_child:
+        return ShardLayouts()
+    return ShardLayouts(f"{pending_manifests_path(config, config.parent_run_id)}layouts/")
 
-        if board_id == board_ids[0]:
-            df = pd.json_normalize(normalized_data)
-        else:
-            tmp_df = pd.json_normalize(normalized_data)
-            df = pd.concat([df, tmp_df])
+def write_manifest(config, now, written, rows, failures, hashes=None, unchanged=()):
+    """Record every file the run wrote in one JSON document, the run's commit point.
 
-    normalized_columns = {}
-    for column_name in df:
-        if '.' in column_name:
-            normalized_columns[column_name] = column_name.replace('.','_')
-    df.rename(columns=normalized_columns, inplace=True)
-    df['loaded_at'] = datetime.now()
-    df['loaded_at'] = df['loaded_at'].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
-    print(df)
+    The manifest lands in a single PUT after all data files are in place, so
+    a consumer that reads files through manifests never sees a partial run.
+    Array children write a shard manifest under ``pending/`` instead, which
+    ``finalize`` folds into the run manifest.
 
-    print(f"The table shape: {df.shape}")
+    ``hashes`` are the boards' content hashes, which the next run compares
+    against. ``unchanged`` boards were skipped; their ``files`` are the ones
+    an earlier run wrote.
+    """
+    manifest = {
+        "run_id": config.parent_run_id,
+        "started_at": now.isoformat(),
+        "extract_mode": config.extract_mode,
+        "files": written,
+        "rows": rows,
+        "failed_boards": sorted(failures),
+        "hashes": hashes or {},
+        "unchanged_boards": list(unchanged),
+    }
+    if config.is_array_child:
+        manifest["array_index"] = config.array_index
+        location = f"{pending_manifests_path(config, config.parent_run_id)}{config.array_index:05d}.json"
+    else:
+        location = manifest_path(config, now)
+    JsonState(location).save(manifest)
+    log_event("manifest_written", path=location, files=sum(len(keys) for keys in written.values()))
+    return location
+
+def finalize(config, run_id, s3_client=None):
+    """Publish the run manifest of an array job after all of its children have finished.
+
+    Merges the children's shard manifests into one manifest, dated by the
+    earliest child start, and folds their per-board state files back into the
+    shared state file. Boards without a shard manifest are listed as
+    ``missing_boards``. Returns the manifest's location, or None when no
+    child left a shard manifest.
 
-    write_parquet_to_s3(dt, df, warehouse_s3path_dest)
+    Slices of a sharded board extracted by different children can hold the
+    same item, for example one that moved between groups mid-run. Only the
+    newest copy is kept (see ``dedupe_board_files``).
 
-    print(f"Processing complete.")
+    Each child combines only its own board, so a column name that decodes to
+    different types on different boards is not renamed as in a single-task
+    run. Such columns are listed under ``type_conflicts`` instead.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    bucket, prefix = split_s3_path(pending_manifests_path(config, run_id))
+    keys = [
+        obj["Key"]
+        for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix)
+        for obj in page.get("Contents", [])
+    ]
+    # Shard manifests sit directly under the prefix; layouts/ holds the sharded boards' layouts.
+    shard_keys = sorted(key for key in keys if "/" not in key[len(prefix):])
+    shards = [json.loads(s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()) for key in shard_keys]
+    if not shards:
+        log_event("finalize_no_shards", level=logging.WARNING, run_id=run_id)
+        return None
+
+    started_at = min(datetime.fromisoformat(shard["started_at"]) for shard in shards)
+    manifest = {
+        "run_id": run_id,
+        "started_at": started_at.isoformat(),
+        "extract_mode": shards[0]["extract_mode"],
+        "files": {},
+        "rows": {},
+        "failed_boards": [],
+        "hashes": {},
+        "unchanged_boards": [],
+    }
+    for shard in shards:
+        # Slices of a sharded board each contribute files and rows to it.
+        for board_id, board_keys in shard["files"].items():
+            manifest["files"].setdefault(board_id, []).extend(board_keys)
+        for board_id, rows in shard["rows"].items():
+            manifest["rows"][board_id] = manifest["rows"].get(board_id, 0) + rows
+        manifest["failed_boards"] += shard["failed_boards"]
+        manifest["hashes"].update(shard.get("hashes") or {})
+        manifest["unchanged_boards"] += shard.get("unchanged_boards") or []
+    manifest["failed_boards"] = sorted(set(manifest["failed_boards"]))
+    manifest["unchanged_boards"].sort()
+    finished = {shard.get("array_index") for shard in shards}
+    missing = {
+        slice_.board_id for index, slice_ in enumerate(config.shard_plan)
+        if index not in finished and slice_.board_id not in manifest["failed_boards"]
+    }
+    manifest["missing_boards"] = [board_id for board_id in config.board_ids if board_id in missing]
+    sharded = {slice_.board_id for slice_ in config.shard_plan if slice_.count > 1}
+    for board_id in sorted(sharded & set(manifest["files"]) - set(manifest["unchanged_boards"])):
+        dropped = dedupe_board_files(config.bucket, manifest["files"][board_id], s3_client)
+        if dropped:
+            manifest["rows"][board_id] -= dropped
+            metrics.incr("DuplicateItemsDropped", dropped, BoardId=board_id)
+            log_event("duplicate_items_dropped", board_id=board_id, rows=dropped)
+    manifest["type_conflicts"] = board_type_conflicts(config, manifest["files"], s3_client)
+
+    location = manifest_path(config, started_at)
+    JsonState(location, s3_client).save(manifest)
+
+    board_states = [JsonState(config.board_state_path(board_id)) for board_id in config.board_ids]
+    updates = [(board_state, board_state.load()) for board_state in board_states]
+    updates = [(board_state, data) for board_state, data in updates if data]
+    if updates:
+        shared_state = JsonState(config.state_location)
+        state = shared_state.load(default={})
+        for _, data in updates:
+            state.update(data)
+        shared_state.save(state)
+        for board_state, _ in updates:
+            board_state.delete()
+
+    delete_keys(s3_client, bucket, keys)
+    log_event(
+        "run_finalized",
+        run_id=run_id,
+        manifest=location,
+        boards=len(manifest["rows"]),
+        failed_boards=manifest["failed_boards"],
+        missing_boards=manifest["missing_boards"],
+    )
+    return location
+
+def dedupe_board_files(bucket, keys, s3_client):
+    """Drop items that several of a board's files hold, keeping the newest copy; return how many went.
+
+    Only ``id`` and ``updated_at`` are compared across files. Ties go to the
+    earlier file. A file is read in full and rewritten in place only when it
+    holds a copy that loses.
+    """
+    rows = []
+    for number, key in enumerate(keys):
+        table = read_parquet_keys(bucket, [key], s3_client).select(["id", WATERMARK_COLUMN])
+        table = table.append_column("file", pa.array([number] * table.num_rows, pa.int32()))
+        rows.append(table.append_column("row", pa.array(range(table.num_rows), pa.int64())))
+    rows = pa.concat_tables(rows).sort_by(
+        [("id", "ascending"), (WATERMARK_COLUMN, "descending"), ("file", "ascending"), ("row", "ascending")]
+    )
+    if rows.num_rows < 2:
+        return 0
+    ids = rows["id"].combine_chunks()
+    # After sorting, every row but the first of its id is an older copy.
+    older = pc.equal(ids.slice(1), ids.slice(0, len(ids) - 1))
+    losers = rows.slice(1).filter(older)
+    options = ParquetOptions.from_env()
+    for number in pc.unique(losers["file"]).to_pylist():
+        drop = losers.filter(pc.equal(losers["file"], number))["row"].combine_chunks()
+        table = read_parquet_keys(bucket, [keys[number]], s3_client)
+        keep = pc.invert(pc.is_in(pa.array(range(table.num_rows), pa.int64()), value_set=drop))
+        with S3MultipartWriter(
+            bucket,
+            keys[number],
+            part_size=options.part_size,
+            max_concurrency=options.max_concurrency,
+            s3_client=s3_client,
+        ) as sink:
+            pq.write_table(
+                table.filter(keep), sink, compression=options.compression, row_group_size=options.row_group_size
+            )
+    return losers.num_rows
+
+def board_type_conflicts(config, files, s3_client):
+    """Columns typed differently across the boards' files, read from one file footer per board."""
+    schemas = {
+        board_id: read_parquet_schema(config.bucket, files[board_id][0], s3_client)
+        for board_id in config.board_ids
+        if files.get(board_id)
+    }
+    conflicts = type_conflicts(schemas)
+    if conflicts:
+        metrics.incr("TypeConflicts", len(conflicts))
+        log_event("type_conflicts", level=logging.WARNING, columns=conflicts)
+    return conflicts
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import hashlib
+import logging
+import multiprocessing
+
+import pyarrow as pa
+
+from decoders import decoder_for
+from metrics import log_event, metrics
+
+ITEM_FIELDS = ["id", "created_at", "updated_at", "name", "board_id"]
+
+LOADED_AT_TYPE = pa.timestamp("us", tz="UTC")
+
+BATCH_SIZE = 10_000
+
+
+def normalize_column_name(name):
+    return name.replace('.', '_')
+
+
+def build_column_index(columns):
+    """Map each column id to its output column name, once per board."""
+    return {column['id']: normalize_column_name(column['title']) for column in columns}
+
+
+def column_field(name, column_type):
+    decoder = decoder_for(column_type)
+    return pa.field(name, decoder.arrow_type, metadata={"monday_type": column_type or ""})
+
+
+class ColumnarBuilder:
+    """Flattens monday.com items straight into per-column arrays.
+
+    Column values are routed through a precomputed id -> title index, so each
+    value costs one dict lookup instead of a scan over every board column.
+    When two columns share a title the later one wins, and the item fields
+    (``id``, ``created_at``, ``updated_at``, ``name``, ``board_id``) win over
+    board columns, matching the old dict-per-item flattening.
+
+    Every ``batch_size`` rows the Python lists are converted into an Arrow
+    record batch and released, so a board is only ever held as compact Arrow
+    buffers plus one batch worth of Python objects. Each column is decoded by
+    the decoder registered for its monday column type (see decoders.py), in
+    one pass per column and batch. Columns that had to be decoded cell by
+    cell, and cells that became null because they couldn't be read, are
+    counted in ``decode_errors`` and reported by ``to_table``.
+    """
+
+    def __init__(self, columns, batch_size=BATCH_SIZE):
+        self.column_index = build_column_index(columns)
+        self.column_types = {column['id']: column.get('type') or "" for column in columns}
+        self.decoders = {column['id']: decoder_for(column.get('type')) for column in columns}
+        self.batch_size = batch_size
+        self.num_rows = 0
+        self.schema = self._schema(columns)
+        self.decode_errors = {}
+        self._batches = []
+        self._reset()
+
+    def _schema(self, columns):
+        fields = {}
+        for column in columns:
+            title = self.column_index[column['id']]
+            if title not in ITEM_FIELDS:
+                fields[title] = column_field(title, column.get('type'))
+        fields.update((field, pa.field(field, pa.string())) for field in ITEM_FIELDS)
+        return pa.schema(list(fields.values()))
+
+    def _reset(self):
+        self._buffered = 0
+        self._values = {
+            column_id: ([], decoder.source) for column_id, decoder in self.decoders.items()
+        }
+        self._fields = {field: [] for field in ITEM_FIELDS}
+
+    def append(self, item):
+        # A value is only taken while its column has none for this row, so
+        # the first of duplicate ids wins and unknown ids are ignored.
+        row = self._buffered + 1
+        values = self._values
+        for column_value in item['column_values']:
+            entry = values.get(column_value['id'])
+            if entry is not None and len(entry[0]) < row:
+                entry[0].append(column_value[entry[1]])
+        # Columns the item has no value for get None, so every array stays row-aligned.
+        for column, _ in values.values():
+            if len(column) < row:
+                column.append(None)
+
+        fields = self._fields
+        fields['id'].append(item['id'])
+        fields['created_at'].append(item['created_at'])
+        fields['updated_at'].append(item['updated_at'])
+        fields['name'].append(item['name'])
+        fields['board_id'].append(item['board']['id'])
+
+        self.num_rows += 1
+        self._buffered = row
+        if self._buffered >= self.batch_size:
+            self.flush()
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+        return self
+
+    def _decoded_columns(self):
+        columns = {}
+        for column_id, title in self.column_index.items():
+            if title not in self._fields:
+                columns[title] = (column_id, self._values[column_id][0])
+        decoded = {}
+        for title, (column_id, values) in columns.items():
+            decoded[title], fell_back, nulled = self.decoders[column_id].decode_checked(values)
+            if fell_back:
+                errors = self.decode_errors.setdefault(
+                    title, {"column_type": self.column_types[column_id], "fallbacks": 0, "nulled_cells": 0}
+                )
+                errors["fallbacks"] += 1
+                errors["nulled_cells"] += nulled
+        decoded.update(
+            (field, pa.array(values, type=pa.string())) for field, values in self._fields.items()
+        )
+        return decoded
+
+    def flush(self):
+        """Decode the buffered rows into a record batch and release them."""
+        if self._buffered:
+            columns = self._decoded_columns()
+            self._batches.append(pa.record_batch(
+                [columns[field.name] for field in self.schema], schema=self.schema
+            ))
+            self._reset()
+
+    def to_table(self):
+        table = self._table()
+        report_decode_errors(self.decode_errors)
+        return table
+
+    def _table(self):
+        self.flush()
+        return pa.Table.from_batches(self._batches, schema=self.schema)
+
+
+def report_decode_errors(decode_errors):
+    """Log and count the columns a builder decoded cell by cell, and the cells it nulled."""
+    for column, errors in decode_errors.items():
+        metrics.incr("DecodeFallbacks", errors["fallbacks"], ColumnType=errors["column_type"])
+        if errors["nulled_cells"]:
+            metrics.incr("DecodeErrors", errors["nulled_cells"], ColumnType=errors["column_type"])
+        log_event("decode_errors", level=logging.WARNING, column=column, **errors)
+
+
+def merge_decode_errors(total, decode_errors):
+    for column, errors in decode_errors.items():
+        merged = total.setdefault(column, {**errors, "fallbacks": 0, "nulled_cells": 0})
+        merged["fallbacks"] += errors["fallbacks"]
+        merged["nulled_cells"] += errors["nulled_cells"]
+    return total
+
+
+def build_page(columns, items):
+    """Flatten and decode one page of items; runs in a pool worker.
+
+    Returns the table and its ``decode_errors``, which the parent reports,
+    since metrics recorded in a worker process would be lost.
+    """
+    builder = ColumnarBuilder(columns, batch_size=max(len(items), 1)).extend(items)
+    return builder._table(), builder.decode_errors
+
+
+class PooledBuilder:
+    """ColumnarBuilder counterpart that decodes pages on a process pool.
+
+    Each ``extend`` call hands one page to ``pool`` and returns at once, so the
+    caller can fetch the next page while earlier ones are flattened and
+    decoded in other processes. At most ``max_pending`` pages are in flight;
+    past that, ``extend`` waits for the oldest. Results are kept in page order.
+    Workers return Arrow tables; Parquet encoding happens later, in the parent.
+    """
+
+    def __init__(self, columns, pool, max_pending=8):
+        self.columns = columns
+        self.pool = pool
+        self.max_pending = max_pending
+        self.schema = ColumnarBuilder(columns).schema
+        self.num_rows = 0
+        self.decode_errors = {}
+        self._pending = deque()
+        self._tables = []
+
+    def extend(self, items):
+        items = list(items)
+        if not items:
+            return self
+        while len(self._pending) >= self.max_pending:
+            self._collect()
+        self._pending.append(self.pool.submit(build_page, self.columns, items))
+        self.num_rows += len(items)
+        return self
+
+    def to_table(self):
+        while self._pending:
+            self._collect()
+        report_decode_errors(self.decode_errors)
+        return pa.concat_tables(self._tables) if self._tables else self.schema.empty_table()
+
+    def _collect(self):
+        table, decode_errors = self._pending.popleft().result()
+        self._tables.append(table)
+        merge_decode_errors(self.decode_errors, decode_errors)
+
+
+def new_builder(columns, pool=None):
+    return PooledBuilder(columns, pool) if pool else ColumnarBuilder(columns)
+
+
+def page_pool(workers):
+    """A process pool for PooledBuilder, or a no-op context when ``workers`` is 0."""
+    if not workers:
+        return nullcontext()
+    # spawn, not fork: the job forks from a process that already runs fetch threads.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _resolve_type_conflicts(tables):
+    """Rename columns whose type clashes with an earlier board's column of the same name.
+
+    The first board to introduce a name keeps it. A later board whose column
+    decodes to a different type gets ``<name>_<monday type>`` instead, so the
+    combined schema stays stable from run to run.
+    """
+    types = {}
+    resolved = []
+    for table in tables:
+        names = []
+        for field in table.schema:
+            name = field.name
+            if types.setdefault(name, field.type) != field.type:
+                monday_type = (field.metadata or {}).get(b"monday_type", b"").decode() or str(field.type)
+                name = f"{name}_{normalize_column_name(monday_type)}"
+                types.setdefault(name, field.type)
+            names.append(name)
+        resolved.append(table.rename_columns(names))
+    return resolved
+
+
+def type_conflicts(schemas):
+    """Columns with different types on different boards, as ``{name: {type: [board ids]}}``.
+
+    ``schemas`` maps board ids to schemas, in the order ``combine_tables``
+    would see the boards. ``combine_tables`` renames such columns itself; this
+    finds them across files written separately, such as by array children.
+    """
+    types = {}
+    for board_id, schema in schemas.items():
+        for field in schema:
+            types.setdefault(field.name, {}).setdefault(str(field.type), []).append(board_id)
+    return {name: by_type for name, by_type in types.items() if len(by_type) > 1}
+
+
+def combine_tables(tables, loaded_at):
+    """Concatenate per-board tables under one schema and stamp ``loaded_at``.
+
+    Columns a board does not have are filled with nulls, and column order
+    follows the first board that introduces each column.
+    """
+    table = pa.concat_tables(_resolve_type_conflicts(tables), promote_options="default")
+    return table.append_column(
+        pa.field("loaded_at", LOADED_AT_TYPE),
+        pa.repeat(pa.scalar(loaded_at, type=LOADED_AT_TYPE), table.num_rows),
+    )
+
+
+def content_hash(table):
+    """SHA-256 of a board table's schema and rows, independent of row order and chunking.
+
+    Two extractions of an unchanged board hash the same, so a run can tell it
+    has nothing new to write. ``loaded_at`` must not be part of ``table``.
+    """
+    if "id" in table.column_names:
+        table = table.sort_by("id")
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table.combine_chunks())
+    return hashlib.sha256(sink.getvalue()).hexdigest()
@@ -0,0 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import threading
+
+import boto3
+
+MiB = 1024 * 1024
+
+# S3 rejects multipart parts smaller than 5 MiB, except for the last one.
+MIN_PART_SIZE = 5 * MiB
+DEFAULT_PART_SIZE = 8 * MiB
+DEFAULT_MAX_CONCURRENCY = 4
+# DeleteObjects takes at most this many keys per call.
+MAX_DELETE_KEYS = 1000
+
+
+def split_s3_path(s3_path):
+    """Split ``s3://bucket/some/key`` into ``("bucket", "some/key")``."""
+    path_after_bucket = s3_path.replace("s3://", "")
+    index = path_after_bucket.find("/")
+    if index == -1:
+        return path_after_bucket, ""
+    return path_after_bucket[:index], path_after_bucket[index + 1 :]
+
+
+def delete_keys(s3_client, bucket, keys):
+    """Delete ``keys`` from ``bucket``, in as many DeleteObjects calls as needed."""
+    keys = list(keys)
+    for start in range(0, len(keys), MAX_DELETE_KEYS):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in keys[start:start + MAX_DELETE_KEYS]]},
+        )
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """Write-only file object that streams into an S3 multipart upload.
+
+    Bytes are buffered until ``part_size`` is reached, and each full part is
+    uploaded on a small thread pool. At most ``max_concurrency`` parts are in
+    flight, so memory stays around ``(max_concurrency + 1) * part_size`` no
+    matter how large the object is. ``close()`` completes the upload.
+    ``abort()``, or leaving a ``with`` block on an exception, aborts it, so no
+    orphaned parts are left behind.
+    """
+
+    def __init__(
+        self,
+        bucket,
+        key,
+        part_size=DEFAULT_PART_SIZE,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        s3_client=None,
+        **create_kwargs,
+    ):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.s3_client = s3_client or boto3.client("s3")
+        self.upload_id = self.s3_client.create_multipart_upload(
+            Bucket=bucket, Key=key, **create_kwargs
+        )["UploadId"]
+
+        self._buffer = bytearray()
+        self._position = 0
+        self._futures = []
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._finished = False
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, b):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        self._buffer += b
+        self._position += len(b)
+        while len(self._buffer) >= self.part_size:
+            self._submit_part(bytes(self._buffer[: self.part_size]))
+            del self._buffer[: self.part_size]
+        return len(b)
+
+    def _submit_part(self, body):
+        self._raise_failed_parts()
+        self._slots.acquire()
+        part_number = len(self._futures) + 1
+        future = self._executor.submit(self._upload_part, part_number, body)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _upload_part(self, part_number, body):
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def _raise_failed_parts(self):
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if not self._finished:
+                if self._buffer or not self._futures:
+                    self._submit_part(bytes(self._buffer))
+                    self._buffer = bytearray()
+                parts = [future.result() for future in self._futures]
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self.upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+                self._finished = True
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._executor.shutdown(wait=True)
+            super().close()
+
+    def abort(self):
+        if self._finished:
+            return
+        self._finished = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.s3_client.abort_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+        )
+        self._buffer = bytearray()
+        super().close()
+
+    def __del__(self):
+        # io.IOBase.__del__ would call close() and publish a partial object.
+        if not self.closed:
+            try:
+                self.abort()
+            except Exception:
+                pass
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
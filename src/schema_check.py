@@ -0,0 +1,190 @@
+import json
+import logging
+import re
+
+import boto3
+import pyarrow as pa
+
+from layout import PARTITION_COLUMN, partition_path
+from metrics import log_event, metrics
+
+PARTITION_KEYS = [PARTITION_COLUMN, "ds"]
+# BatchCreatePartition takes at most this many partitions per call.
+MAX_PARTITIONS_PER_CALL = 100
+
+
+def hive_type(arrow_type):
+    """The Hive type a Glue crawler records for a Parquet column of ``arrow_type``.
+
+    Returns None for all-null columns, whose type the crawler can't infer either.
+    """
+    if pa.types.is_dictionary(arrow_type):
+        return hive_type(arrow_type.value_type)
+    if pa.types.is_null(arrow_type):
+        return None
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return "string"
+    if pa.types.is_boolean(arrow_type):
+        return "boolean"
+    if pa.types.is_integer(arrow_type):
+        return {8: "tinyint", 16: "smallint", 32: "int", 64: "bigint"}[arrow_type.bit_width]
+    if pa.types.is_float32(arrow_type):
+        return "float"
+    if pa.types.is_floating(arrow_type):
+        return "double"
+    if pa.types.is_decimal(arrow_type):
+        return f"decimal({arrow_type.precision},{arrow_type.scale})"
+    if pa.types.is_timestamp(arrow_type):
+        return "timestamp"
+    if pa.types.is_date(arrow_type):
+        return "date"
+    if pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+        return "binary"
+    if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type):
+        element = hive_type(arrow_type.value_type)
+        return element and f"array<{element}>"
+    if pa.types.is_map(arrow_type):
+        key, value = hive_type(arrow_type.key_type), hive_type(arrow_type.item_type)
+        return key and value and f"map<{key},{value}>"
+    if pa.types.is_struct(arrow_type):
+        fields = [(field.name, hive_type(field.type)) for field in arrow_type]
+        if any(field_type is None for _, field_type in fields):
+            return None
+        return "struct<" + ",".join(f"{name}:{field_type}" for name, field_type in fields) + ">"
+    raise ValueError(f"No Hive type for Arrow type {arrow_type}")
+
+
+def output_columns(schema):
+    """Glue columns for the files ``write_partitioned`` writes from a table with ``schema``."""
+    return [
+        {"Name": field.name, "Type": hive_type(field.type)}
+        for field in schema
+        if field.name != PARTITION_COLUMN
+    ]
+
+
+def normalize_type(type_string):
+    # Same normalisation as lambda/schema_diff.py, so both sides compare types alike.
+    return re.sub(r"[\s`]", "", type_string).lower()
+
+
+def schema_drift(columns, registered_columns, registered_partition_keys):
+    """Reasons the output can't be added to the registered table as-is; empty when it can.
+
+    Files may leave out registered columns, which read as nulls, but every
+    column they do have must be registered with the same type. An all-null
+    column matches any registered type.
+    """
+    keys = [key["Name"].lower() for key in registered_partition_keys]
+    if keys != PARTITION_KEYS:
+        return [f"partition keys {keys} are not {PARTITION_KEYS}"]
+    registered = {column["Name"].lower(): normalize_type(column["Type"]) for column in registered_columns}
+    drift = []
+    for column in columns:
+        name = column["Name"].lower()
+        if name not in registered:
+            drift.append(f"new column {column['Name']}")
+        elif column["Type"] is not None and normalize_type(column["Type"]) != registered[name]:
+            drift.append(f"column {column['Name']} is {column['Type']}, registered as {registered[name]}")
+    return drift
+
+
+class CatalogTable:
+    """The Glue table the job's output is added to without a crawl.
+
+    ``precheck`` compares the output schema with the schema last recorded
+    by the schema_change Lambda's registry (or, before the Lambda has seen
+    the table, the catalog's own definition). When they agree the job
+    writes to ``registered_prefix``, which no crawler watches, and
+    ``add_partitions`` adds the new partitions itself. When they don't,
+    the job writes to the crawled prefix and the crawler updates the table.
+    """
+
+    def __init__(self, database, table, bucket, registry_prefix="", glue_client=None, s3_client=None):
+        self.database = database
+        self.table = table
+        self.bucket = bucket
+        self.registry_prefix = registry_prefix
+        self.glue = glue_client or boto3.client("glue")
+        self.s3 = s3_client or boto3.client("s3")
+        self._definition = None
+
+    @property
+    def definition(self):
+        if self._definition is None:
+            self._definition = self.glue.get_table(DatabaseName=self.database, Name=self.table)["Table"]
+        return self._definition
+
+    def registered_schema(self):
+        """``(columns, partition_keys)`` last registered for the table, or None if it doesn't exist yet."""
+        if self.registry_prefix:
+            key = f"{self.registry_prefix}{self.database}/{self.table}.json"
+            try:
+                entry = json.loads(self.s3.get_object(Bucket=self.bucket, Key=key)["Body"].read())
+                return entry["columns"], entry["partition_keys"]
+            except self.s3.exceptions.NoSuchKey:
+                pass
+        try:
+            definition = self.definition
+        except self.glue.exceptions.EntityNotFoundException:
+            return None
+        return definition["StorageDescriptor"]["Columns"], definition.get("PartitionKeys", [])
+
+    def precheck(self, schema):
+        """Whether a table with ``schema`` can be written without a crawl."""
+        registered = self.registered_schema()
+        if registered is None:
+            log_event("schema_precheck", result="unregistered", table=f"{self.database}.{self.table}")
+            return False
+        drift = schema_drift(output_columns(schema), *registered)
+        log_event(
+            "schema_precheck",
+            level=logging.WARNING if drift else logging.INFO,
+            result="drifted" if drift else "matched",
+            table=f"{self.database}.{self.table}",
+            drift=drift[:20],
+        )
+        metrics.incr("SchemaDrift" if drift else "SchemaMatched")
+        return not drift
+
+    def add_partitions(self, base_s3path, board_ids, ds):
+        """Register ``board_id=<id>/ds=<ds>`` partitions under ``base_s3path``.
+
+        A partition that already exists, say from an earlier run the same day
+        that went to the crawled prefix, is pointed at the new location.
+        """
+        storage = self.definition["StorageDescriptor"]
+        inputs = {
+            (str(board_id), ds): {
+                "Values": [str(board_id), ds],
+                "StorageDescriptor": {**storage, "Location": partition_path(base_s3path, board_id, ds)},
+            }
+            for board_id in board_ids
+        }
+        existing, errors = [], []
+        batch = list(inputs.values())
+        for start in range(0, len(batch), MAX_PARTITIONS_PER_CALL):
+            response = self.glue.batch_create_partition(
+                DatabaseName=self.database,
+                TableName=self.table,
+                PartitionInputList=batch[start:start + MAX_PARTITIONS_PER_CALL],
+            )
+            for error in response.get("Errors", []):
+                if error["ErrorDetail"]["ErrorCode"] == "AlreadyExistsException":
+                    existing.append(inputs[tuple(error["PartitionValues"])])
+                else:
+                    errors.append(error)
+        for start in range(0, len(existing), MAX_PARTITIONS_PER_CALL):
+            response = self.glue.batch_update_partition(
+                DatabaseName=self.database,
+                TableName=self.table,
+                Entries=[
+                    {"PartitionValueList": partition["Values"], "PartitionInput": partition}
+                    for partition in existing[start:start + MAX_PARTITIONS_PER_CALL]
+                ],
+            )
+            errors += response.get("Errors", [])
+        if errors:
+            raise RuntimeError(f"Could not register partitions of {self.database}.{self.table}: {errors}")
+        metrics.incr("PartitionsRegistered", len(inputs))
+        log_event("partitions_registered", table=f"{self.database}.{self.table}", partitions=len(inputs), ds=ds)
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+import threading
+
+import pyarrow as pa
+
+from incremental import WATERMARK_COLUMN, dedupe_latest
+from state import JsonState
+
+SHARD_MODES = ("group", "created_at")
+
+
+@dataclass(frozen=True)
+class Shard:
+    """One independently extractable slice of a board.
+
+    ``index`` of ``count`` slices cut by ``mode``: ``group`` deals the board's
+    groups out round-robin, ``created_at`` splits the span between the oldest
+    item and the run's first day into day ranges. A whole, unsharded board is
+    slice 0 of 1. Every slice of a board is cut from the same ``ShardLayouts``
+    entry, so together they cover the board exactly.
+    """
+
+    board_id: str
+    mode: str = None
+    index: int = 0
+    count: int = 1
+
+    @property
+    def key(self):
+        return self.board_id if self.count == 1 else f"{self.board_id}.{self.index}"
+
+
+def parse_shards(spec):
+    """Parse ``"<board id>=<mode>:<count>,..."`` into ``{board_id: (mode, count)}``."""
+    shards = {}
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        board_id, _, slicing = part.partition("=")
+        mode, _, count = slicing.partition(":")
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Unknown shard mode {mode!r} for board {board_id}; expected one of {SHARD_MODES}")
+        shards[board_id.strip()] = (mode, int(count or 2))
+    return shards
+
+
+def plan_shards(board_ids, shards):
+    """Expand ``board_ids`` into the slices to extract, in a stable order."""
+    plan = []
+    for board_id in board_ids:
+        mode, count = shards.get(board_id, (None, 1))
+        plan.extend(Shard(board_id, mode, index, count) for index in range(count))
+    return plan
+
+
+class ShardLayouts:
+    """What each sharded board is cut by in one run, worked out once and shared by its slices.
+
+    A layout is a board's group list or its span of creation days. Slices cut
+    from different layouts (say, one computed just before midnight and one
+    just after) would leave items in neither slice. ``get`` computes a
+    board's layout only for the first slice that asks. With ``location``, a
+    prefix for ``JsonState`` documents, the first slice of any task to get
+    there saves the layout and the other tasks load it, so array children
+    that start hours apart still agree.
+    """
+
+    def __init__(self, location=None, s3_client=None):
+        self.location = location
+        self.s3_client = s3_client
+        self._layouts = {}
+        self._locks = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+
+    def get(self, board_id, compute):
+        with self._lock:
+            board_lock = self._locks[board_id]
+        with board_lock:
+            if board_id not in self._layouts:
+                self._layouts[board_id] = self._load_or_compute(board_id, compute)
+            return self._layouts[board_id]
+
+    def _load_or_compute(self, board_id, compute):
+        if not self.location:
+            return compute()
+        store = JsonState(f"{self.location}{board_id}.json", self.s3_client)
+        layout = store.load()
+        return layout if layout is not None else store.save_if_absent(compute())
+
+
+def group_rules(shard, groups):
+    """Rules selecting the shard's share of ``groups``, or None if it got none."""
+    group_ids = [group["id"] for group in groups][shard.index::shard.count]
+    if not group_ids:
+        return None
+    return [{"column_id": "group", "compare_value": group_ids, "operator": "any_of"}]
+
+
+def created_at_rules(shard, first_day, last_day):
+    """Rules selecting the shard's range of creation days.
+
+    The first slice has no lower bound and the last no upper bound, so items
+    created outside ``[first_day, last_day]`` still land in exactly one slice.
+    """
+    days = (last_day - first_day).days + 1
+    bounds = [first_day + timedelta(days=days * k // shard.count) for k in range(shard.count + 1)]
+    rules = []
+    if shard.index > 0:
+        rules.append(_creation_rule("greater_than_or_equals", bounds[shard.index]))
+    if shard.index < shard.count - 1:
+        rules.append(_creation_rule("lower_than", bounds[shard.index + 1]))
+    return rules
+
+
+def _creation_rule(operator, day):
+    return {
+        "column_id": "__creation_log__",
+        "compare_value": ["EXACT", day.isoformat()],
+        "compare_attribute": "CREATED_AT",
+        "operator": operator,
+    }
+
+
+def merge_shards(tables):
+    """Concatenate a board's slices, keeping the newest copy of any item seen twice.
+
+    An item moved between groups, or picked up on both sides of a slice
+    boundary, is returned by more than one slice.
+    """
+    table = pa.concat_tables(tables, promote_options="default")
+    if len(tables) == 1 or table.num_rows == 0:
+        return table
+    return dedupe_latest(table.sort_by(WATERMARK_COLUMN))
@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+
+import boto3
+from botocore.exceptions import ClientError
+
+from s3_writer import split_s3_path
+
+
+class JsonState:
+    """A small JSON document kept at an ``s3://`` URL or a local file path.
+
+    Used for job state that has to survive between runs, such as per-board
+    watermarks. Local writes go through a temporary file and a rename, and S3
+    PUTs are atomic, so readers never see a half-written document.
+    """
+
+    def __init__(self, location, s3_client=None):
+        self.location = location
+        self._s3_client = s3_client
+
+    @property
+    def is_s3(self):
+        return self.location.startswith("s3://")
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            self._s3_client = boto3.client("s3")
+        return self._s3_client
+
+    def load(self, default=None):
+        if self.is_s3:
+            bucket, key = split_s3_path(self.location)
+            try:
+                body = self.s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+            except self.s3_client.exceptions.NoSuchKey:
+                return default
+        else:
+            try:
+                with open(self.location, "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                return default
+        return json.loads(body)
+
+    def save(self, data):
+        body = json.dumps(data, indent=2, sort_keys=True).encode()
+        if self.is_s3:
+            bucket, key = split_s3_path(self.location)
+            self.s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType="application/json")
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.location)), exist_ok=True)
+            tmp_path = f"{self.location}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, self.location)
+
+    def save_if_absent(self, data):
+        """Save ``data`` unless a document is already there; return whichever document is kept.
+
+        When several writers race, exactly one of them wins and all of them
+        return its document.
+        """
+        body = json.dumps(data, indent=2, sort_keys=True).encode()
+        if self.is_s3:
+            bucket, key = split_s3_path(self.location)
+            try:
+                self.s3_client.put_object(
+                    Bucket=bucket, Key=key, Body=body, ContentType="application/json", IfNoneMatch="*"
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                    raise
+                return self.load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.location)), exist_ok=True)
+            tmp_path = f"{self.location}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            try:
+                # A hard link fails if the target exists, so only one writer gets through.
+                os.link(tmp_path, self.location)
+            except FileExistsError:
+                return self.load()
+            finally:
+                os.remove(tmp_path)
+        return json.loads(body)
+
+    def delete(self):
+        if self.is_s3:
+            bucket, key = split_s3_path(self.location)
+            self.s3_client.delete_object(Bucket=bucket, Key=key)
+        else:
+            try:
+                os.remove(self.location)
+            except FileNotFoundError:
+                pass
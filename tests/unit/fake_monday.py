@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_board(board_id, item_count, column_count=3, groups=("topics",)):
+    columns = [{"id": f"col_{c}", "title": f"Column {c}"} for c in range(column_count)]
+    items = [
+        {
+            "id": f"{board_id}{i:06d}",
+            "created_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z",
+            "name": f"Item {i}",
+            "board": {"id": board_id},
+            "group": {"id": groups[i % len(groups)]},
+            "column_values": [
+                {"id": column["id"], "text": f"v{i}", "type": "text", "value": f'"v{i}"'}
+                for column in columns
+            ],
+        }
+        for i in range(item_count)
+    ]
+    return {"columns": columns, "items": items, "groups": [{"id": group, "title": group} for group in groups]}
+
+
+def matches(item, rule):
+    """Evaluate one items_page query rule the way the API does, comparing dates by day."""
+    column, operator, value = rule["column_id"], rule["operator"], rule["compare_value"]
+    if column == "group":
+        return item["group"]["id"] in value
+    day = (item["updated_at"] if column == "__last_updated__" else item["created_at"])[:10]
+    if operator == "greater_than_or_equals":
+        return day >= value[1]
+    if operator == "lower_than":
+        return day < value[1]
+    raise ValueError(f"unsupported rule {rule}")
+
+
+class FakeMondayServer:
+    """A local stand-in for the monday.com GraphQL API.
+
+    Serves the board/columns, items_page and next_items_page queries issued by
+    src/mondays.py from in-memory boards, slicing items into cursor pages.
+    """
+
+    def __init__(self, boards, latency=0.0, complexity_after=10_000_000):
+        self.boards = boards
+        self.latency = latency
+        self.complexity_after = complexity_after
+        # Canned (status, body) responses returned, in order, before real ones.
+        self.failures = []
+        self.requests = []
+        self.bytes_sent = 0
+        self._queries = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v2"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, body):
+        with self._lock:
+            self.requests.append(body)
+            if self.failures:
+                return self.failures.pop(0)
+        time.sleep(self.latency)
+        data = self._data(body["query"], body.get("variables") or {})
+        if "complexity" in body["query"]:
+            data["complexity"] = {"query": 1000, "after": self.complexity_after, "reset_in_x_seconds": 30}
+        return 200, {"data": data}
+
+    def _data(self, query, variables):
+        if "next_items_page" in query:
+            board_id, key, offset = variables["cursor"].split(":", 2)
+            return {"next_items_page": self._page(board_id, int(offset), variables["limit"], key)}
+
+        board_id = variables["board_id"][0]
+        if board_id not in self.boards:
+            return {"boards": []}
+        if "items_page" in query:
+            key = self._query_key(variables.get("query_params"))
+            board = {"items_page": self._page(board_id, 0, variables["limit"], key)}
+        elif "groups" in query:
+            board = {"groups": self.boards[board_id]["groups"]}
+        else:
+            board = {"columns": self.boards[board_id]["columns"]}
+        return {"boards": [board]}
+
+    def _query_key(self, query_params):
+        # Cursors carry the filter. A lone updated-since rule is spelled out
+        # as its date; any other filter is kept server-side and referenced by index.
+        if not query_params:
+            return ""
+        rules = query_params.get("rules") or []
+        if len(rules) == 1 and rules[0]["column_id"] == "__last_updated__" and not query_params.get("order_by"):
+            return rules[0]["compare_value"][1]
+        with self._lock:
+            self._queries.append(query_params)
+            return f"q{len(self._queries) - 1}"
+
+    def _page(self, board_id, offset, limit, key=""):
+        items = self.boards[board_id]["items"]
+        if key.startswith("q"):
+            query_params = self._queries[int(key[1:])]
+            items = [item for item in items if all(matches(item, rule) for rule in query_params.get("rules") or [])]
+            if query_params.get("order_by"):
+                items = sorted(items, key=lambda item: item["created_at"])
+        elif key:
+            # Like the real API, the updated-since filter only compares days.
+            items = [item for item in items if item["updated_at"][:10] >= key]
+        end = offset + limit
+        cursor = f"{board_id}:{key}:{end}" if end < len(items) else None
+        return {"cursor": cursor, "items": items[offset:end]}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so pooled client connections are reused as with the real API.
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                status, body = fake.respond(json.loads(self.rfile.read(length)))
+                payload = json.dumps(body).encode()
+                with fake._lock:
+                    fake.bytes_sent += len(payload)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,143 @@
+import io
+import json
+
+import pyarrow.parquet as pq
+import pytest
+
+import mondays
+from config import JobConfig
+
+from tests.unit.fake_monday import FakeMondayServer, make_board
+
+BUCKET = "test-bucket"
+BOARD_IDS = ["111", "222", "333"]
+
+
+def list_keys(s3, prefix):
+    return [obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET, Prefix=prefix).get("Contents", [])]
+
+
+def read_json(s3, key):
+    return json.loads(s3.get_object(Bucket=BUCKET, Key=key)["Body"].read())
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(mondays, "get_api_key", lambda config: "api-key")
+    boards = {board_id: make_board(board_id, 50) for board_id in BOARD_IDS}
+    with FakeMondayServer(boards) as fake:
+        yield fake
+
+
+def child_config(server, index, **kwargs):
+    return JobConfig(
+        board_ids=BOARD_IDS,
+        api_url=server.url,
+        bucket=BUCKET,
+        state_path=f"s3://{BUCKET}/_job_state/monday.com/watermarks.json",
+        run_id=f"parent-1:{index}",
+        array_index=index,
+        **kwargs,
+    )
+
+
+def test_job_config_reads_array_index():
+    config = JobConfig.load({
+        "MONDAY_BOARD_IDS": "1,2,3",
+        "AWS_BATCH_JOB_ID": "parent-1:2",
+        "AWS_BATCH_JOB_ARRAY_INDEX": "2",
+    })
+
+    assert config.task_board_ids == ["3"]
+    assert config.parent_run_id == "parent-1"
+    assert config.checkpoint_s3path.endswith("/checkpoint/shard=2/")
+    assert JobConfig.load({"MONDAY_BOARD_IDS": "1,2,3"}).task_board_ids == ["1", "2", "3"]
+
+
+def test_array_child_extracts_only_its_board(s3, server):
+    mondays.run(child_config(server, 1, extract_mode="incremental"))
+
+    assert list_keys(s3, "monday.com/items/board_id=111/") == []
+    assert list_keys(s3, "monday.com/items/board_id=222/")
+    [shard] = list_keys(s3, "_job_state/monday.com/manifests/pending/parent-1/")
+    assert read_json(s3, shard)["rows"] == {"222": 50}
+    assert list_keys(s3, "_job_state/monday.com/watermarks/board_id=222.json")
+    assert list_keys(s3, "_job_state/monday.com/watermarks.json") == []
+
+
+def test_finalize_publishes_run_manifest_and_merges_state(s3, server):
+    for index in (0, 2):
+        mondays.run(child_config(server, index, extract_mode="incremental"))
+
+    location = mondays.finalize(child_config(server, -1), "parent-1", s3_client=s3)
+
+    manifest = read_json(s3, location.split(f"s3://{BUCKET}/", 1)[1])
+    assert manifest["run_id"] == "parent-1"
+    assert manifest["rows"] == {"111": 50, "333": 50}
+    assert manifest["missing_boards"] == ["222"]
+    assert set(manifest["files"]) == {"111", "333"}
+    assert set(read_json(s3, "_job_state/monday.com/watermarks.json")) == {"111", "333"}
+    assert list_keys(s3, "_job_state/monday.com/watermarks/") == []
+    assert list_keys(s3, "_job_state/monday.com/manifests/pending/") == []
+
+
+def test_finalize_without_shards_does_nothing(s3, server):
+    assert mondays.finalize(child_config(server, -1), "parent-2", s3_client=s3) is None
+
+
+def test_finalize_reports_columns_typed_differently_across_boards(s3, monkeypatch):
+    monkeypatch.setattr(mondays, "get_api_key", lambda config: "api-key")
+    boards = {board_id: make_board(board_id, 5) for board_id in BOARD_IDS}
+    boards["333"]["columns"][0]["type"] = "numbers"
+    with FakeMondayServer(boards) as fake:
+        for index in range(3):
+            mondays.run(child_config(fake, index))
+        location = mondays.finalize(child_config(fake, -1), "parent-1", s3_client=s3)
+
+    manifest = read_json(s3, location.split(f"s3://{BUCKET}/", 1)[1])
+    assert manifest["type_conflicts"] == {"Column 0": {"string": ["111", "222"], "double": ["333"]}}
+
+
+
+def read_ids(s3, keys):
+    return [
+        item_id
+        for key in keys
+        for item_id in pq.read_table(io.BytesIO(s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()))["id"].to_pylist()
+    ]
+
+
+def test_array_children_cut_a_board_from_one_layout(s3, server):
+    server.boards["111"] = make_board("111", 90, groups=("a", "b", "c", "d"))
+    mondays.run(child_config(server, 0, shards="111=group:2"))
+    # The board's groups come back in another order by the time the second child starts.
+    server.boards["111"]["groups"].reverse()
+    mondays.run(child_config(server, 1, shards="111=group:2"))
+
+    location = mondays.finalize(child_config(server, -1, shards="111=group:2"), "parent-1", s3_client=s3)
+
+    manifest = read_json(s3, location.split(f"s3://{BUCKET}/", 1)[1])
+    assert sorted(read_ids(s3, manifest["files"]["111"])) == sorted(item["id"] for item in server.boards["111"]["items"])
+    assert list_keys(s3, "_job_state/monday.com/manifests/pending/") == []
+
+
+def test_finalize_drops_items_extracted_by_two_slices(s3, server, monkeypatch):
+    server.boards["111"] = make_board("111", 90, groups=("a", "b", "c"))
+    first = server.boards["111"]["items"][0]
+    # Every slice also sees the first item, as if it moved between groups mid-run.
+    iter_board_pages = mondays.iter_board_pages
+
+    def with_duplicate(client, board_id, *args, **kwargs):
+        for n, (items, cursor) in enumerate(iter_board_pages(client, board_id, *args, **kwargs)):
+            yield ([first] + [item for item in items if item["id"] != first["id"]] if n == 0 else items), cursor
+
+    monkeypatch.setattr(mondays, "iter_board_pages", with_duplicate)
+    for index in (0, 1):
+        mondays.run(child_config(server, index, shards="111=group:2"))
+
+    location = mondays.finalize(child_config(server, -1, shards="111=group:2"), "parent-1", s3_client=s3)
+
+    manifest = read_json(s3, location.split(f"s3://{BUCKET}/", 1)[1])
+    ids = read_ids(s3, manifest["files"]["111"])
+    assert manifest["rows"]["111"] == len(ids) == 90
+    assert sorted(ids) == sorted(item["id"] for item in server.boards["111"]["items"])
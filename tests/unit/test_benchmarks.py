@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks"))
+
+import pipeline_benchmark  # noqa: E402
+
+
+def test_pipeline_benchmark_smoke(tmp_path, aws_credentials):
+    output = tmp_path / "bench.json"
+
+    status = pipeline_benchmark.main([
+        "--boards", "2", "--items", "120", "--columns", "6", "--page-size", "50",
+        "--types", "text=1,numbers=1,date=1", "--output", str(output),
+    ])
+
+    result = json.loads(output.read_text())
+    assert status == 0
+    assert result["items"] == 240
+    assert result["requests"] == 2 * (1 + 3)
+    assert result["files"] == 2 and result["parquet_bytes"] > 0
+    assert set(result["stages"]) == set(pipeline_benchmark.STAGES)
+    assert result["peak_rss_mb"] > 0
+
+
+def test_compare_flags_regressions():
+    baseline = {"stages": {"fetch": 1.0}, "wall_seconds": 2.0, "items_per_second": 100, "peak_rss_mb": 100}
+    result = {"stages": {stage: 0.0 for stage in pipeline_benchmark.STAGES} | {"fetch": 1.5},
+              "wall_seconds": 2.1, "items_per_second": 95, "peak_rss_mb": 300}
+
+    regressions = pipeline_benchmark.compare(result, baseline, max_regression=0.2)
+
+    assert regressions == ["fetch: 1.000s -> 1.500s", "peak RSS: 100MB -> 300MB"]
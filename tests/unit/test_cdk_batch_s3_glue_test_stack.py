@@ -1,3 +1,5 @@
+import json
+
 import aws_cdk as core
 import aws_cdk.assertions as assertions
 
@@ -13,3 +15,263 @@ def test_sqs_queue_created():
 #     template.has_resource_properties("AWS::SQS::Queue", {
 #         "VisibilityTimeout": 300
 #     })
+
+
+def batch_template(**kwargs):
+    from aws_cdk import aws_ecr as ecr
+    from cdk_batch_s3_glue_test.batch_with_fargate import BatchWithFargate
+
+    stack = core.Stack(core.App(), "BatchTest")
+    BatchWithFargate(stack, "Job", ecrRepo=ecr.Repository(stack, "Repo"), **kwargs)
+    return assertions.Template.from_stack(stack)
+
+
+def test_push_submits_one_array_child_per_board():
+    template = batch_template(board_ids=["1", "2", "3"], cpu=1, memory_mib=2048)
+
+    template.has_resource_properties("AWS::Events::Rule", {
+        "EventPattern": {"detail-type": ["ECR Image Action"]},
+        "Targets": [assertions.Match.object_like({"BatchParameters": assertions.Match.object_like({
+            "ArrayProperties": {"Size": 3},
+        })})],
+    })
+    template.has_resource_properties("AWS::Batch::JobDefinition", {
+        "ContainerProperties": assertions.Match.object_like({
+            "Command": ["python", "mondays.py"],
+            "Environment": [{"Name": "MONDAY_BOARD_IDS", "Value": "1,2,3"}],
+            "ResourceRequirements": assertions.Match.array_with([{"Type": "MEMORY", "Value": "2048"}]),
+        }),
+    })
+
+
+def test_array_completion_triggers_finalize_job():
+    template = batch_template(board_ids=["1", "2", "3"])
+
+    template.has_resource_properties("AWS::Batch::JobDefinition", {
+        "Parameters": {"runId": "none"},
+        "ContainerProperties": assertions.Match.object_like({
+            "Command": ["python", "mondays.py", "finalize", "Ref::runId"],
+        }),
+    })
+    template.has_resource_properties("AWS::Events::Rule", {
+        "EventPattern": assertions.Match.object_like({
+            "detail-type": ["Batch Job State Change"],
+            "detail": assertions.Match.object_like({"arrayProperties": {"size": [{"exists": True}]}}),
+        }),
+        "Targets": [assertions.Match.object_like({
+            "InputTransformer": {
+                "InputPathsMap": {"detail-jobId": "$.detail.jobId"},
+                "InputTemplate": '{"Parameters":{"runId":<detail-jobId>}}',
+            },
+        })],
+    })
+
+
+def test_single_board_is_not_an_array_job():
+    template = batch_template(board_ids=["1"])
+
+    template.resource_count_is("AWS::Batch::JobDefinition", 1)
+    template.resource_count_is("AWS::Events::Rule", 1)
+
+
+def test_sharded_board_adds_array_children():
+    template = batch_template(board_ids=["1", "2"], shards={"1": ("created_at", 4)})
+
+    template.has_resource_properties("AWS::Events::Rule", {
+        "Targets": [assertions.Match.object_like({"BatchParameters": assertions.Match.object_like({
+            "ArrayProperties": {"Size": 5},
+        })})],
+    })
+    template.has_resource_properties("AWS::Batch::JobDefinition", {
+        "ContainerProperties": assertions.Match.object_like({
+            "Environment": assertions.Match.array_with([{"Name": "MONDAY_SHARDS", "Value": "1=created_at:4"}]),
+        }),
+    })
+
+
+def test_schema_change_lambda_publishes_to_the_topic_arn():
+    stack = CdkBatchS3GlueTestStack(core.App(), "cdk-batch-s3-glue-test")
+    template = assertions.Template.from_stack(stack)
+    topic = stack.resolve(stack.node.find_child("MondaySchemaChange").topic_arn)
+
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "schema_change.lambda_handler",
+        "Environment": {"Variables": assertions.Match.object_like({
+            "SNS_TOPIC": topic,
+            "REPORT_PREFIX": "_job_state/schema_reports/",
+            "DIGEST_SECONDS": "0",
+            "SCHEMA_REGISTRY_PREFIX": "_job_state/schema_registry/",
+        })},
+    })
+
+
+def workflow_template(**kwargs):
+    from aws_cdk import aws_s3 as s3
+    from cdk_batch_s3_glue_test.glue_workflow import GlueWorkflow
+
+    stack = core.Stack(core.App(), "WorkflowTest")
+    GlueWorkflow(stack, "Workflow", s3_bucket=s3.Bucket(stack, "Bucket", event_bridge_enabled=True), **kwargs)
+    return assertions.Template.from_stack(stack)
+
+
+def test_only_crawled_prefixes_trigger_the_workflow():
+    template = workflow_template(crawl_prefixes=["monday.com/items/", "monday.com/items_delta/"])
+
+    template.has_resource_properties("AWS::Events::Rule", {
+        "EventPattern": assertions.Match.object_like({
+            "detail": assertions.Match.object_like({
+                "object": {"key": [{"prefix": "monday.com/items/"}, {"prefix": "monday.com/items_delta/"}]},
+            }),
+        }),
+    })
+    queue_configurations = template.find_resources("Custom::S3BucketNotifications")
+    (notifications,) = queue_configurations.values()
+    filters = [
+        rule["Filter"]["Key"]["FilterRules"]
+        for rule in notifications["Properties"]["NotificationConfiguration"]["QueueConfigurations"]
+    ]
+    assert filters == [[{"Name": "prefix", "Value": "monday.com/items/"}],
+                       [{"Name": "prefix", "Value": "monday.com/items_delta/"}]]
+
+
+def test_schema_precheck_lets_the_job_add_partitions():
+    template = batch_template(board_ids=["1"], schema_precheck=True)
+
+    template.has_resource_properties("AWS::Batch::JobDefinition", {
+        "ContainerProperties": assertions.Match.object_like({
+            "Environment": assertions.Match.array_with([{"Name": "MONDAY_SCHEMA_PRECHECK", "Value": "1"}]),
+        }),
+    })
+    template.has_resource_properties("AWS::IAM::Policy", {
+        "PolicyDocument": {"Statement": assertions.Match.array_with([assertions.Match.object_like({
+            "Action": ["glue:GetTable", "glue:BatchCreatePartition", "glue:BatchUpdatePartition"],
+        })])},
+    })
+
+
+def test_workflow_trigger_batches_events():
+    template = workflow_template(event_batch_size=50, event_batch_window=600)
+
+    template.has_resource_properties("AWS::Glue::Trigger", {
+        "Type": "EVENT",
+        "EventBatchingCondition": {"BatchSize": 50, "BatchWindow": 600},
+    })
+
+
+def test_crawler_has_one_target_per_prefix_with_sampling_and_grouping():
+    template = workflow_template(
+        crawl_prefixes=["monday.com/items/", "monday.com/items_delta/"],
+        sample_size=10,
+        exclusions=["**/_SUCCESS"],
+        table_level=3,
+    )
+
+    (crawler,) = template.find_resources("AWS::Glue::Crawler").values()
+    properties = crawler["Properties"]
+    targets = properties["Targets"]["S3Targets"]
+    assert [target["Path"]["Fn::Join"][1][-1] for target in targets] == ["/monday.com/items/", "/monday.com/items_delta/"]
+    assert all(target["SampleSize"] == 10 and target["Exclusions"] == ["**/_SUCCESS"] for target in targets)
+    assert json.loads(properties["Configuration"]) == {
+        "Version": 1.0,
+        "Grouping": {"TableGroupingPolicy": "CombineCompatibleSchemas", "TableLevelConfiguration": 3},
+    }
+
+
+def test_crawler_defaults_to_the_whole_bucket():
+    (crawler,) = workflow_template(combine_compatible_schemas=False).find_resources("AWS::Glue::Crawler").values()
+
+    (target,) = crawler["Properties"]["Targets"]["S3Targets"]
+    assert "SampleSize" not in target and "Exclusions" not in target
+    assert "Configuration" not in crawler["Properties"]
+
+
+def test_queue_falls_back_from_spot_to_on_demand():
+    template = batch_template(spot_max_vcpus=32, on_demand_max_vcpus=4)
+
+    environments = template.find_resources("AWS::Batch::ComputeEnvironment")
+    types = {logical_id: env["Properties"]["ComputeResources"]["Type"] for logical_id, env in environments.items()}
+    assert sorted(types.values()) == ["FARGATE", "FARGATE_SPOT"]
+    assert {env["Properties"]["ComputeResources"]["Type"]: env["Properties"]["ComputeResources"]["MaxvCpus"]
+            for env in environments.values()} == {"FARGATE_SPOT": 32, "FARGATE": 4}
+
+    (queue,) = template.find_resources("AWS::Batch::JobQueue").values()
+    order = sorted(queue["Properties"]["ComputeEnvironmentOrder"], key=lambda entry: entry["Order"])
+    assert [types[entry["ComputeEnvironment"]["Fn::GetAtt"][0]] for entry in order] == ["FARGATE_SPOT", "FARGATE"]
+
+
+def test_without_spot_only_on_demand_is_used():
+    template = batch_template(spot=False)
+
+    template.resource_count_is("AWS::Batch::ComputeEnvironment", 1)
+    template.has_resource_properties("AWS::Batch::ComputeEnvironment", {
+        "ComputeResources": assertions.Match.object_like({"Type": "FARGATE"}),
+    })
+
+
+def test_job_retries_spot_interruptions_but_not_out_of_memory():
+    template = batch_template(board_ids=["1"], retry_attempts=5, ephemeral_storage_gib=40)
+
+    template.has_resource_properties("AWS::Batch::JobDefinition", {
+        "RetryStrategy": {
+            "Attempts": 5,
+            "EvaluateOnExit": assertions.Match.array_with([
+                {"Action": "RETRY", "OnStatusReason": "Your Spot Task was interrupted*"},
+                {"Action": "EXIT", "OnReason": "OutOfMemoryError*"},
+            ]),
+        },
+        "ContainerProperties": assertions.Match.object_like({"EphemeralStorage": {"SizeInGiB": 40}}),
+    })
+
+
+def test_heavy_boards_get_their_own_profile():
+    from cdk_batch_s3_glue_test.batch_with_fargate import JobProfile
+
+    template = batch_template(
+        board_ids=["1", "2", "3", "4"],
+        shards={"3": ("created_at", 2)},
+        profiles={"large": JobProfile(cpu=2, memory_mib=8192, ephemeral_storage_gib=50)},
+        board_profiles={"3": "large", "4": "large"},
+        bucket_name="bucket",
+    )
+
+    template.resource_count_is("AWS::Batch::JobDefinition", 4)
+    template.resource_count_is("AWS::Events::Rule", 3)
+    template.has_resource_properties("AWS::Batch::JobDefinition", {
+        "ContainerProperties": assertions.Match.object_like({
+            "Command": ["python", "mondays.py"],
+            "Environment": [{"Name": "MONDAY_BUCKET", "Value": "bucket"}, {"Name": "MONDAY_BOARD_IDS", "Value": "1,2"}],
+            "ResourceRequirements": assertions.Match.array_with([{"Type": "VCPU", "Value": "0.25"}]),
+        }),
+    })
+    template.has_resource_properties("AWS::Batch::JobDefinition", {
+        "ContainerProperties": assertions.Match.object_like({
+            "Command": ["python", "mondays.py"],
+            "Environment": assertions.Match.array_with([
+                {"Name": "MONDAY_BUCKET", "Value": "bucket"},
+                {"Name": "MONDAY_BOARD_IDS", "Value": "3,4"},
+                {"Name": "MONDAY_SHARDS", "Value": "3=created_at:2"},
+                {"Name": "MONDAY_CHECKPOINT_PREFIX", "Value": "_job_state/monday.com/large/checkpoint/"},
+                {"Name": "MONDAY_MANIFEST_PREFIX", "Value": "_job_state/monday.com/large/manifests/"},
+                {"Name": "MONDAY_STATE_PREFIX", "Value": "_job_state/monday.com/large/"},
+            ]),
+            "ResourceRequirements": assertions.Match.array_with([
+                {"Type": "MEMORY", "Value": "8192"},
+                {"Type": "VCPU", "Value": "2"},
+            ]),
+            "EphemeralStorage": {"SizeInGiB": 50},
+        }),
+    })
+
+    (push_rule,) = [
+        rule["Properties"] for rule in template.find_resources("AWS::Events::Rule").values()
+        if rule["Properties"]["EventPattern"].get("detail-type") == ["ECR Image Action"]
+    ]
+    sizes = sorted(target["BatchParameters"]["ArrayProperties"]["Size"] for target in push_rule["Targets"])
+    assert sizes == [2, 3]
+
+
+def test_board_profiles_must_name_a_profile():
+    import pytest
+
+    with pytest.raises(ValueError, match="unknown profiles"):
+        batch_template(board_ids=["1", "2"], board_profiles={"2": "huge"})
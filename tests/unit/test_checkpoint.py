@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+import json
+
+import pytest
+
+import mondays
+from checkpoint import Checkpoint
+from config import JobConfig
+from monday_client import MondayClient, MondayThrottledError
+
+from tests.unit.fake_monday import FakeMondayServer, make_board
+
+BUCKET = "test-bucket"
+CHECKPOINTS = f"s3://{BUCKET}/_job_state/monday.com/checkpoint/"
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(monkeypatch, pages):
+    calls = []
+    get_next_items_page = mondays.get_next_items_page
+
+    def flaky(client, cursor, limit=mondays.PAGE_LIMIT):
+        calls.append(cursor)
+        if len(calls) > pages:
+            raise Interrupted()
+        return get_next_items_page(client, cursor, limit)
+
+    monkeypatch.setattr(mondays, "get_next_items_page", flaky)
+
+
+def list_keys(s3, prefix):
+    return [obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET, Prefix=prefix).get("Contents", [])]
+
+
+@pytest.fixture
+def board():
+    return make_board("111", 1203)
+
+
+def open_checkpoint(s3, run_id="job-1"):
+    return Checkpoint(CHECKPOINTS, run_id, rows_per_part=300, s3_client=s3).open(
+        datetime(2024, 3, 1, tzinfo=timezone.utc), {}
+    )
+
+
+def test_interrupted_board_resumes_from_saved_cursor(s3, board, monkeypatch):
+    with FakeMondayServer({"111": board}) as fake, MondayClient(fake.url, "api-key") as client:
+        interrupt_after(monkeypatch, 1)
+        with pytest.raises(Interrupted):
+            mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3))
+        monkeypatch.undo()
+
+        saved = open_checkpoint(s3).board("111")
+        assert saved["done"] is False
+        assert saved["rows"] == 1000
+        assert len(list_keys(s3, "_job_state/monday.com/checkpoint/job-1/board_id=111/")) == 2
+
+        fake.requests.clear()
+        table = mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3))
+
+    assert table["id"].to_pylist() == [item["id"] for item in board["items"]]
+    pages = [r for r in fake.requests if "items_page" in r["query"]]
+    assert "next_items_page" in pages[0]["query"]
+    assert pages[0]["variables"]["cursor"] == saved["cursor"]
+
+
+def test_finished_board_is_not_fetched_again(s3, board):
+    with FakeMondayServer({"111": board}) as fake, MondayClient(fake.url, "api-key") as client:
+        mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3))
+        fake.requests.clear()
+        table = mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3))
+
+    assert fake.requests == []
+    assert table.num_rows == 1203
+
+
+def test_expired_cursor_restarts_the_board(s3, board, monkeypatch):
+    with FakeMondayServer({"111": board}) as fake, MondayClient(fake.url, "api-key", max_retries=0) as client:
+        interrupt_after(monkeypatch, 1)
+        with pytest.raises(Interrupted):
+            mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3))
+        monkeypatch.undo()
+
+        fake.failures.append((200, {"errors": [{"message": "CursorExpiredError"}]}))
+        table = mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3))
+
+    assert table["id"].to_pylist() == [item["id"] for item in board["items"]]
+
+
+def test_other_api_errors_keep_the_saved_parts(s3, board, monkeypatch):
+    with FakeMondayServer({"111": board}) as fake, MondayClient(fake.url, "api-key", max_retries=0) as client:
+        interrupt_after(monkeypatch, 1)
+        with pytest.raises(Interrupted):
+            mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3))
+        monkeypatch.undo()
+
+        fake.failures.append((502, {}))
+        with pytest.raises(MondayThrottledError):
+            mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3))
+
+    assert open_checkpoint(s3).board("111")["rows"] == 1000
+    assert len(list_keys(s3, "_job_state/monday.com/checkpoint/job-1/board_id=111/")) == 2
+
+
+def test_concurrent_runs_keep_their_own_checkpoints(s3, board):
+    with FakeMondayServer({"111": board}) as fake, MondayClient(fake.url, "api-key") as client:
+        mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3, "job-1"))
+
+    checkpoint = open_checkpoint(s3, "job-2")
+
+    assert checkpoint.board("111")["parts"] == []
+    assert open_checkpoint(s3, "job-1").board("111")["done"] is True
+    assert list_keys(s3, "_job_state/monday.com/checkpoint/job-1/board_id=111/")
+
+
+def test_stale_checkpoints_of_other_runs_are_discarded(s3, board):
+    with FakeMondayServer({"111": board}) as fake, MondayClient(fake.url, "api-key") as client:
+        mondays.extract_board(client, "111", checkpoint=open_checkpoint(s3, "job-1"))
+
+    Checkpoint(CHECKPOINTS, "job-2", s3_client=s3, stale_after=timedelta(seconds=-1)).open(
+        datetime(2024, 3, 2, tzinfo=timezone.utc), {}
+    )
+
+    assert list_keys(s3, "_job_state/monday.com/checkpoint/job-1/") == []
+    assert list_keys(s3, "_job_state/monday.com/checkpoint/job-2/") == ["_job_state/monday.com/checkpoint/job-2/checkpoint.json"]
+
+
+def test_run_writes_manifest_and_clears_checkpoint(s3, monkeypatch):
+    boards = {"111": make_board("111", 700), "222": make_board("222", 0)}
+    monkeypatch.setattr(mondays, "get_api_key", lambda config: "api-key")
+    with FakeMondayServer(boards) as fake:
+        config = JobConfig(board_ids=["111", "222"], api_url=fake.url, bucket=BUCKET, run_id="job-1")
+        mondays.run(config)
+
+    [manifest_key] = list_keys(s3, "_job_state/monday.com/manifests/")
+    manifest = json.loads(s3.get_object(Bucket=BUCKET, Key=manifest_key)["Body"].read())
+    assert manifest["run_id"] == "job-1"
+    assert manifest["rows"] == {"111": 700, "222": 0}
+    assert manifest["files"]["111"] == list_keys(s3, "monday.com/items/board_id=111/")
+    assert list_keys(s3, "_job_state/monday.com/checkpoint/") == []
+
+
+def test_job_config_uses_batch_job_id_as_run_id():
+    assert JobConfig.load({"AWS_BATCH_JOB_ID": "abc-123"}).run_id == "abc-123"
+    assert JobConfig.load({"AWS_BATCH_JOB_ID": "abc-123", "MONDAY_RUN_ID": "manual"}).run_id == "manual"
+    assert JobConfig.load({}).run_id.startswith("local-")
+    assert JobConfig.load({}).run_id != JobConfig.load({}).run_id
@@ -0,0 +1,105 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from config import DEFAULT_BOARD_IDS, JobConfig, SecretCache
+
+SECRET_ID = "/api_keys/MONDAYS_COM"
+
+
+@pytest.fixture
+def aws(aws_credentials):
+    with mock_aws():
+        yield
+
+
+class CountingClient:
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+
+    def get_secret_value(self, **kwargs):
+        self.calls += 1
+        return self.client.get_secret_value(**kwargs)
+
+
+@pytest.fixture
+def secrets(aws):
+    client = boto3.client("secretsmanager")
+    client.create_secret(Name=SECRET_ID, SecretString=json.dumps({SECRET_ID: "api-key"}))
+    return CountingClient(client)
+
+
+def test_defaults_without_environment():
+    config = JobConfig.load(environ={})
+
+    assert config.board_ids == DEFAULT_BOARD_IDS
+    assert config.warehouse_s3path == "s3://cdk-batch-s3-glue-test-bucket/monday.com/items/"
+
+
+def test_environment_overrides_ssm_document(aws):
+    ssm = boto3.client("ssm")
+    ssm.put_parameter(
+        Name="/monday/job-config",
+        Type="String",
+        Value=json.dumps({"board_ids": ["1", "2"], "bucket": "from-ssm", "max_workers": 8}),
+    )
+
+    config = JobConfig.load(environ={
+        "MONDAY_CONFIG_PARAMETER": "/monday/job-config",
+        "MONDAY_BOARD_IDS": "3, 4",
+        "MONDAY_COMPACT_EVERY": "2",
+    })
+
+    assert config.board_ids == ["3", "4"]
+    assert config.bucket == "from-ssm"
+    assert config.max_workers == 8
+    assert config.compact_every == 2
+    assert config.delta_s3path == "s3://from-ssm/monday.com/items_delta/"
+
+
+def test_secret_is_fetched_once_across_workers(secrets):
+    cache = SecretCache(ttl=300, client=secrets)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        keys = list(executor.map(lambda _: cache.get_json_field(SECRET_ID, SECRET_ID), range(16)))
+
+    assert keys == ["api-key"] * 16
+    assert secrets.calls == 1
+
+
+def test_secret_is_refetched_after_ttl(secrets):
+    now = [1000.0]
+    cache = SecretCache(ttl=60, client=secrets, clock=lambda: now[0])
+
+    cache.get(SECRET_ID)
+    now[0] += 59
+    cache.get(SECRET_ID)
+    assert secrets.calls == 1
+
+    now[0] += 2
+    cache.get(SECRET_ID)
+    assert secrets.calls == 2
+
+
+def test_file_cache_is_shared_between_instances(secrets, tmp_path):
+    SecretCache(ttl=300, cache_dir=str(tmp_path), client=secrets).get(SECRET_ID)
+    other = SecretCache(ttl=300, cache_dir=str(tmp_path), client=secrets)
+
+    assert other.get_json_field(SECRET_ID, SECRET_ID) == "api-key"
+    assert secrets.calls == 1
+    assert all(oct(path.stat().st_mode)[-3:] == "600" for path in tmp_path.iterdir())
+
+    other.invalidate(SECRET_ID)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bucket_moves_the_watermark_state_too():
+    config = JobConfig.load(environ={"MONDAY_BUCKET": "other-bucket"})
+
+    assert config.state_location == "s3://other-bucket/_job_state/monday.com/watermarks.json"
+    assert config.board_state_path("1") == "s3://other-bucket/_job_state/monday.com/watermarks/board_id=1.json"
+    assert JobConfig(state_path="/tmp/state.json").state_location == "/tmp/state.json"
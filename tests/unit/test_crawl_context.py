@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from crawl_context import CrawlContextResolver, NoCrawlFoundError, reports_no_table_changes
+
+COMPLETED = {"FieldName": "STATE", "FilterOperator": "EQ", "FieldValue": "COMPLETED"}
+ENDED_AROUND_COMPLETION = [
+    {"FieldName": "END_TIME", "FilterOperator": "GE", "FieldValue": "2024-03-02T09:55:00Z"},
+    {"FieldName": "END_TIME", "FilterOperator": "LE", "FieldValue": "2024-03-02T10:05:00Z"},
+]
+STARTED_THE_DAY_BEFORE = [
+    {"FieldName": "START_TIME", "FilterOperator": "GE", "FieldValue": "2024-03-01T10:00:00Z"},
+    {"FieldName": "START_TIME", "FilterOperator": "LE", "FieldValue": "2024-03-02T10:05:00Z"},
+]
+SUMMARY = '{"TABLE": {"UPDATE": "{\\"Details\\": {\\"names\\": [\\"t1\\"]}}"}}'
+
+
+def crawl(crawl_id, day, summary=SUMMARY, started="09:00", ended="10:00"):
+    at = datetime(2024, 3, day, tzinfo=timezone.utc)
+    return {
+        "CrawlId": crawl_id,
+        "StartTime": at + timedelta(hours=int(started[:2]), minutes=int(started[3:])),
+        "EndTime": at + timedelta(hours=int(ended[:2]), minutes=int(ended[3:])),
+        "Summary": summary,
+    }
+
+
+def event(**detail):
+    return {"detail": {"crawlerName": "crawler", "tablesCreated": "0", "tablesUpdated": "1", "tablesDeleted": "0",
+                       "completionDate": "2024-03-02T10:00:00Z", **detail}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def glue(aws_credentials):
+    client = boto3.client("glue")
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+@pytest.mark.parametrize("detail, expected", [
+    ({"tablesCreated": "0", "tablesUpdated": "0", "tablesDeleted": "0"}, True),
+    ({"tablesCreated": "0", "tablesUpdated": "2", "tablesDeleted": "0"}, False),
+    ({"tablesCreated": "0"}, False),
+    ({"tablesCreated": "N/A", "tablesUpdated": "0", "tablesDeleted": "0"}, False),
+])
+def test_reports_no_table_changes(detail, expected):
+    assert reports_no_table_changes(detail) is expected
+
+
+def test_resolve_needs_one_list_call_and_caches_the_database(glue):
+    client, stubber = glue
+    list_params = {"CrawlerName": "crawler", "Filters": [COMPLETED, *ENDED_AROUND_COMPLETION], "MaxResults": 100}
+    stubber.add_response("list_crawls", {"Crawls": [crawl("latest", 2)]}, list_params)
+    stubber.add_response("get_crawler", {"Crawler": {"Name": "crawler", "DatabaseName": "db"}}, {"Name": "crawler"})
+    stubber.add_response("list_crawls", {"Crawls": [crawl("next", 3)]}, list_params)
+    clock = Clock()
+    resolver = CrawlContextResolver(client, ttl_seconds=60, clock=clock)
+
+    first = resolver.resolve(event())
+    clock.now = 59
+    second = resolver.resolve(event())
+
+    assert (first.crawl_id, first.database, first.crawl["Summary"]) == ("latest", "db", SUMMARY)
+    assert (second.crawl_id, second.database) == ("next", "db")
+
+
+def test_database_is_fetched_again_after_the_ttl(glue):
+    client, stubber = glue
+    stubber.add_response("get_crawler", {"Crawler": {"Name": "crawler", "DatabaseName": "db"}})
+    stubber.add_response("get_crawler", {"Crawler": {"Name": "crawler", "DatabaseName": "renamed"}})
+    clock = Clock()
+    resolver = CrawlContextResolver(client, ttl_seconds=60, clock=clock)
+
+    assert resolver.database("crawler") == "db"
+    clock.now = 61
+    assert resolver.database("crawler") == "renamed"
+
+
+def test_resolve_skips_glue_when_no_tables_changed(glue):
+    client, _ = glue
+
+    assert CrawlContextResolver(client).resolve(event(tablesUpdated="0")) is None
+
+
+def test_takes_the_crawl_that_ended_closest_to_the_event(glue):
+    client, stubber = glue
+    crawls = [
+        crawl("early", 2, ended="09:56"),
+        crawl("match", 2, ended="10:01"),
+        crawl("later", 2, started="09:30", ended="10:04"),
+    ]
+    stubber.add_response("list_crawls", {"Crawls": crawls})
+
+    assert CrawlContextResolver(client).latest_crawl("crawler", "2024-03-02T10:00:00Z")["CrawlId"] == "match"
+
+
+def test_falls_back_to_crawls_started_within_the_window(glue):
+    client, stubber = glue
+    fallback_params = {"CrawlerName": "crawler", "Filters": [COMPLETED, *STARTED_THE_DAY_BEFORE], "MaxResults": 100}
+    stubber.add_response("list_crawls", {"Crawls": []})
+    stubber.add_response("list_crawls", {"Crawls": [crawl("c1", 1, ended="11:00")], "NextToken": "t"}, fallback_params)
+    stubber.add_response("list_crawls", {"Crawls": [crawl("c2", 2, ended="10:30")]}, {**fallback_params, "NextToken": "t"})
+
+    assert CrawlContextResolver(client).latest_crawl("crawler", "2024-03-02T10:00:00Z")["CrawlId"] == "c2"
+
+
+def test_falls_back_when_end_time_filters_are_rejected(glue):
+    client, stubber = glue
+    stubber.add_client_error("list_crawls", "InvalidInputException")
+    stubber.add_response("list_crawls", {"Crawls": [crawl("c1", 2)]},
+                         {"CrawlerName": "crawler", "Filters": [COMPLETED, *STARTED_THE_DAY_BEFORE], "MaxResults": 100})
+
+    assert CrawlContextResolver(client).latest_crawl("crawler", "2024-03-02T10:00:00Z")["CrawlId"] == "c1"
+
+
+def test_without_completion_date_takes_the_last_started_crawl(glue):
+    client, stubber = glue
+    stubber.add_response("list_crawls", {"Crawls": [crawl("older", 1), crawl("latest", 2)]})
+
+    assert CrawlContextResolver(client).latest_crawl("crawler")["CrawlId"] == "latest"
+
+
+def test_no_completed_crawl(glue):
+    client, stubber = glue
+    stubber.add_response("list_crawls", {"Crawls": []})
+
+    with pytest.raises(NoCrawlFoundError):
+        CrawlContextResolver(client).latest_crawl("crawler")
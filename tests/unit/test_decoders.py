@@ -0,0 +1,148 @@
+import datetime
+
+import pyarrow as pa
+import pytest
+
+from decoders import DEFAULT_DECODER, JsonDecoder, decoder_for
+from normalize import ColumnarBuilder, combine_tables
+
+
+def decode(column_type, values):
+    decoder = decoder_for(column_type)
+    array = decoder.decode(values)
+    assert array.type == decoder.arrow_type
+    return array.to_pylist()
+
+
+def test_unknown_types_keep_raw_json_value():
+    assert decoder_for("mirror") is DEFAULT_DECODER
+    assert decode("mirror", ['{"a": 1}', None]) == ['{"a": 1}', None]
+
+
+def test_numbers_decode_from_text():
+    assert decode("numbers", ["12.5", "", None, "-3"]) == [12.5, None, None, -3.0]
+    assert decode("numbers", ["12", "n/a"]) == [12.0, None]
+
+
+def test_text_like_columns_use_display_text():
+    assert decoder_for("status").source == "text"
+    assert decode("status", ["Done", ""]) == ["Done", None]
+
+
+def test_date_combines_date_and_time_in_utc():
+    values = ['{"date":"2024-01-02","time":"10:30:00","changed_at":"x"}', '{"date":"2024-01-03"}', None, '{"date":""}']
+
+    assert decode("date", values) == [
+        datetime.datetime(2024, 1, 2, 10, 30, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2024, 1, 3, tzinfo=datetime.timezone.utc),
+        None,
+        None,
+    ]
+
+
+def test_timeline_decodes_to_date_struct():
+    assert decode("timeline", ['{"from":"2024-01-01","to":"2024-01-05"}', None]) == [
+        {"from": datetime.date(2024, 1, 1), "to": datetime.date(2024, 1, 5)},
+        None,
+    ]
+
+
+def test_people_and_board_relation_decode_to_id_lists():
+    people = ['{"personsAndTeams":[{"id":1,"kind":"person"},{"id":2,"kind":"team"}]}', None]
+    relations = ['{"linkedPulseIds":[{"linkedPulseId":99}]}', '{"linkedPulseIds":[]}']
+
+    assert decode("people", people) == [[1, 2], None]
+    assert decode("board_relation", relations) == [[99], []]
+
+
+def test_checkbox_rating_and_location():
+    assert decode("checkbox", ['{"checked":"true"}', None]) == [True, None]
+    assert decode("rating", ['{"rating":4}', None]) == [4, None]
+    assert decode("location", ['{"lat":"40.5","lng":"-73.9","address":"NYC"}', None]) == [
+        {"lat": 40.5, "lng": -73.9, "address": "NYC"},
+        None,
+    ]
+
+
+def test_empty_column_keeps_its_type():
+    assert decoder_for("date").decode([]).type == decoder_for("date").arrow_type
+
+
+def typed_item(item_id, board_id, column_values):
+    return {
+        "id": item_id,
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z",
+        "name": f"Item {item_id}",
+        "board": {"id": board_id},
+        "column_values": [
+            {"id": cid, "type": ctype, "value": value, "text": text}
+            for cid, ctype, value, text in column_values
+        ],
+    }
+
+
+def test_builder_produces_stable_typed_schema():
+    columns = [
+        {"id": "n", "title": "Amount", "type": "numbers"},
+        {"id": "d", "title": "Due", "type": "date"},
+        {"id": "p", "title": "Owner", "type": "people"},
+    ]
+    items = [typed_item("1", "1", [
+        ("n", "numbers", '"5"', "5"),
+        ("d", "date", '{"date":"2024-02-01"}', "2024-02-01"),
+        ("p", "people", '{"personsAndTeams":[{"id":7,"kind":"person"}]}', "Ann"),
+    ])]
+
+    empty = ColumnarBuilder(columns).to_table()
+    table = ColumnarBuilder(columns, batch_size=1).extend(items).to_table()
+
+    assert table.schema == empty.schema
+    assert table.schema.field("Amount").type == pa.float64()
+    assert table.schema.field("Owner").metadata == {b"monday_type": b"people"}
+    assert table["Owner"].to_pylist() == [[7]]
+
+
+def test_combine_tables_renames_clashing_column_types():
+    first = ColumnarBuilder([{"id": "a", "title": "Score", "type": "numbers"}]).extend(
+        [typed_item("1", "1", [("a", "numbers", '"3"', "3")])]
+    ).to_table()
+    second = ColumnarBuilder([{"id": "b", "title": "Score", "type": "status"}]).extend(
+        [typed_item("2", "2", [("b", "status", '{"index":1}', "High")])]
+    ).to_table()
+
+    table = combine_tables([first, second], datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc))
+
+    assert table["Score"].to_pylist() == [3.0, None]
+    assert table["Score_status"].to_pylist() == [None, "High"]
+
+
+def test_json_cells_in_other_shapes_fall_back_per_value():
+    assert decode("date", ['{"date":"2024-01-02","time":"12:30"}', '{"date":"not a date"}']) == [
+        datetime.datetime(2024, 1, 2, 12, 30, tzinfo=datetime.timezone.utc),
+        None,
+    ]
+    assert decode("location", ['{"lat":40.5,"lng":"-73.9","address":"NYC"}', '{"lat":"x","lng":null}']) == [
+        {"lat": 40.5, "lng": -73.9, "address": "NYC"},
+        None,
+    ]
+    assert decode("checkbox", ['{"checked":true}', '{"checked":"false"}', None]) == [True, False, None]
+    assert decode("timeline", ['{"from":"2024-01-01","to":"2024-02-30"}', "not json"]) == [
+        {"from": datetime.date(2024, 1, 1), "to": None},
+        None,
+    ]
+    assert decode("people", ['{"personsAndTeams":[{"id":"7"}]}', '{"personsAndTeams":{"id":1}}']) == [[7], None]
+
+
+def test_json_decoders_must_implement_transform_and_parse():
+    with pytest.raises(TypeError):
+        JsonDecoder()
+
+
+def test_decode_checked_counts_cells_the_fallback_nulled():
+    dates = ['{"date":"2024-01-02"}', '{"date":"not a date"}', None, '{"changed_at":"2024-01-01"}']
+    numbers = ["1", "abc", ""]
+
+    assert decoder_for("date").decode_checked(dates)[1:] == (True, 1)
+    assert decoder_for("numbers").decode_checked(numbers)[1:] == (True, 1)
+    assert decoder_for("date").decode_checked(dates[:1])[1:] == (False, 0)
@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+
+import pyarrow as pa
+
+import mondays
+from incremental import advance_watermark, dedupe_latest, read_parquet_keys
+from monday_client import MondayClient
+from normalize import ColumnarBuilder
+
+from tests.unit.fake_monday import FakeMondayServer, make_board
+
+BUCKET = "test-bucket"
+ITEMS = f"s3://{BUCKET}/monday.com/items/"
+DELTAS = f"s3://{BUCKET}/monday.com/items_delta/"
+
+
+def touch(board, index, updated_at, value):
+    item = board["items"][index]
+    item["updated_at"] = updated_at
+    item["column_values"][0]["value"] = value
+
+
+def test_dedupe_latest_keeps_last_row_per_id():
+    table = pa.table({"id": ["1", "2", "1", "3", "2"], "v": ["a", "b", "c", "d", "e"]})
+
+    assert dedupe_latest(table).to_pydict() == {"id": ["1", "3", "2"], "v": ["c", "d", "e"]}
+
+
+def test_advance_watermark():
+    table = pa.table({"updated_at": ["2024-01-03T00:00:00Z", "2024-01-05T10:00:00Z"]})
+
+    assert advance_watermark(table, None) == "2024-01-05T10:00:00Z"
+    assert advance_watermark(table, "2024-02-01T00:00:00Z") == "2024-02-01T00:00:00Z"
+    assert advance_watermark(table.slice(0, 0), "2024-01-01T00:00:00Z") == "2024-01-01T00:00:00Z"
+
+
+def test_extract_board_only_returns_items_changed_since_watermark():
+    board = make_board("1", 600)
+    touch(board, 10, "2024-03-01T08:00:00Z", '"old"')
+    touch(board, 550, "2024-03-01T12:00:00Z", '"new"')
+    with FakeMondayServer({"1": board}) as fake, MondayClient(fake.url, "api-key") as client:
+        table = mondays.extract_board(client, "1", updated_since="2024-03-01T09:00:00Z")
+        filters = [r["variables"].get("query_params") for r in fake.requests if "items_page" in r["query"]]
+
+    assert table["id"].to_pylist() == [board["items"][550]["id"]]
+    assert filters[0]["rules"][0]["compare_value"] == ["EXACT", "2024-03-01"]
+
+
+def test_write_incremental_snapshots_then_deltas_then_compacts(s3):
+    board = make_board("1", 5)
+    def run(day, state, compact_every=2):
+        since = state["1"]["watermark"] if "1" in state else ""
+        changed = [item for item in board["items"] if item["updated_at"] > since]
+        tables = {"1": ColumnarBuilder(board["columns"]).extend(changed).to_table()}
+        now = datetime(2024, 3, day, tzinfo=timezone.utc)
+        return mondays.write_incremental(tables, state, ITEMS, DELTAS, now, None, compact_every)
+
+    state = run(1, {})
+    assert state["1"]["watermark"] == "2024-01-01T00:00:00Z"
+    assert state["1"]["deltas"] == []
+    assert state["1"]["snapshot"][0].startswith("monday.com/items/board_id=1/ds=2024-03-01/")
+
+    touch(board, 2, "2024-03-02T00:00:00Z", '"v2"')
+    state = run(2, state)
+    assert state["1"]["watermark"] == "2024-03-02T00:00:00Z"
+    assert len(state["1"]["deltas"]) == 1
+    assert read_parquet_keys(BUCKET, state["1"]["deltas"], s3).num_rows == 1
+
+    state = run(3, state)
+    assert len(state["1"]["deltas"]) == 1, "a run without changes writes nothing"
+
+    touch(board, 2, "2024-03-04T00:00:00Z", '"v3"')
+    touch(board, 4, "2024-03-04T00:00:00Z", '"v3"')
+    state = run(4, state)
+
+    assert state["1"]["deltas"] == []
+    assert state["1"]["snapshot"][0].startswith("monday.com/items/board_id=1/ds=2024-03-04/")
+    snapshot = read_parquet_keys(BUCKET, state["1"]["snapshot"], s3)
+    assert sorted(snapshot["id"].to_pylist()) == [item["id"] for item in board["items"]]
+    assert dict(zip(snapshot["id"].to_pylist(), snapshot["Column 0"].to_pylist()))[board["items"][2]["id"]] == '"v3"'
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET, Prefix="monday.com/items_delta/")
@@ -0,0 +1,78 @@
+import io
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from layout import ParquetOptions, partition_path, write_parquet_to_s3, write_partitioned
+from s3_writer import MiB
+
+BUCKET = "test-bucket"
+
+
+def read_parquet(s3, key):
+    return pq.ParquetFile(io.BytesIO(s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()))
+
+
+def test_options_from_env():
+    options = ParquetOptions.from_env({
+        "PARQUET_COMPRESSION": "zstd",
+        "PARQUET_ROW_GROUP_SIZE": "5000",
+        "PARQUET_MAX_ROWS_PER_FILE": "20000",
+        "PARQUET_TARGET_FILE_SIZE_MB": "64",
+    })
+
+    assert options.compression == "zstd"
+    assert options.row_group_size == 5000
+    assert options.max_rows_per_file == 20000
+    assert options.target_file_size == 64 * MiB
+
+
+def test_partition_path():
+    assert partition_path("s3://b/monday.com/items/", "42", "2024-01-01") == "s3://b/monday.com/items/board_id=42/ds=2024-01-01/"
+
+
+def test_rolls_files_at_max_rows_with_configured_row_groups(s3):
+    table = pa.table({"id": [str(i) for i in range(1000)], "value": list(range(1000))})
+    options = ParquetOptions(compression="zstd", row_group_size=150, max_rows_per_file=400)
+
+    keys = write_parquet_to_s3("run", table, f"s3://{BUCKET}/out/", options, s3)
+
+    assert keys == ["out/run-00001.parquet", "out/run-00002.parquet", "out/run-00003.parquet"]
+    files = [read_parquet(s3, key) for key in keys]
+    assert [f.metadata.num_rows for f in files] == [400, 400, 200]
+    assert [f.metadata.num_row_groups for f in files] == [3, 3, 2]
+    assert files[0].metadata.row_group(0).column(0).compression == "ZSTD"
+    assert pa.concat_tables(f.read() for f in files).equals(table)
+
+
+def test_rolls_files_at_target_size(s3):
+    table = pa.table({"blob": [os.urandom(64 * 1024) for _ in range(200)]})
+    options = ParquetOptions(compression="none", row_group_size=20, target_file_size=1 * MiB)
+
+    keys = write_parquet_to_s3("run", table, f"s3://{BUCKET}/out/", options, s3)
+
+    assert len(keys) > 1
+    assert sum(read_parquet(s3, key).metadata.num_rows for key in keys) == 200
+
+
+def test_empty_table_still_writes_a_file(s3):
+    table = pa.table({"id": pa.array([], pa.string())})
+
+    keys = write_parquet_to_s3("run", table, f"s3://{BUCKET}/out/", None, s3)
+
+    assert read_parquet(s3, keys[0]).schema_arrow == table.schema
+
+
+def test_write_partitioned_splits_boards_into_hive_partitions(s3):
+    table = pa.table({"id": ["1", "2", "3"], "board_id": ["10", "20", "10"]})
+
+    written = write_partitioned(table, f"s3://{BUCKET}/monday.com/items/", "2024-01-01", "run", None, s3)
+
+    assert written == {
+        "10": ["monday.com/items/board_id=10/ds=2024-01-01/run-00001.parquet"],
+        "20": ["monday.com/items/board_id=20/ds=2024-01-01/run-00001.parquet"],
+    }
+    board_10 = read_parquet(s3, written["10"][0]).read()
+    assert board_10.column_names == ["id"]
+    assert board_10["id"].to_pylist() == ["1", "3"]
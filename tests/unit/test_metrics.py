@@ -0,0 +1,112 @@
+import io
+import json
+import logging
+
+import pytest
+
+import metrics as metrics_module
+from metrics import Metrics
+
+
+def test_incr_accumulates_per_dimension_set():
+    m = Metrics()
+    m.incr("Pages", BoardId="1")
+    m.incr("Pages", BoardId="1")
+    m.incr("Pages", BoardId="2")
+    m.incr("Retries")
+
+    assert m.get("Pages", BoardId="1") == 2
+    assert m.get("Pages", BoardId="2") == 1
+    assert m.get("Retries") == 1
+    assert m.get("Missing") == 0
+
+
+def test_total_sums_matching_dimension_sets():
+    m = Metrics()
+    m.incr("StageSeconds", 1.5, Stage="fetch", BoardId="1")
+    m.incr("StageSeconds", 2.0, Stage="fetch", BoardId="2")
+    m.incr("StageSeconds", 4.0, Stage="write", BoardId="1")
+
+    assert m.total("StageSeconds", Stage="fetch") == 3.5
+    assert m.total("StageSeconds", BoardId="1") == 5.5
+    assert m.total("Missing") == 0
+
+
+def test_gauge_keeps_the_maximum():
+    m = Metrics()
+    m.gauge("PeakRssMB", 10)
+    m.gauge("PeakRssMB", 30)
+    m.gauge("PeakRssMB", 20)
+
+    assert m.get("PeakRssMB") == 30
+
+
+def test_stage_records_seconds_and_logs(caplog):
+    m = Metrics()
+    with caplog.at_level(logging.INFO, logger="mondays"):
+        with m.stage("extract", BoardId="1"):
+            pass
+
+    assert m.get("StageSeconds", Stage="extract", BoardId="1") >= 0
+    assert m.get("PeakRssMB") > 0
+    event = json.loads(caplog.records[-1].getMessage())
+    assert event["event"] == "stage"
+    assert event["stage"] == "extract"
+    assert event["status"] == "ok"
+    assert event["BoardId"] == "1"
+
+
+def test_stage_logs_errors_and_reraises(caplog):
+    m = Metrics()
+    with caplog.at_level(logging.INFO, logger="mondays"):
+        with pytest.raises(ValueError):
+            with m.stage("write"):
+                raise ValueError("boom")
+
+    assert json.loads(caplog.records[-1].getMessage())["status"] == "error"
+    assert ("StageSeconds", (("Stage", "write"),)) in m._values
+
+
+def test_quiet_stage_does_not_log(caplog):
+    m = Metrics()
+    with caplog.at_level(logging.INFO, logger="mondays"):
+        with m.stage("fetch", log=False, BoardId="1"):
+            pass
+
+    assert not caplog.records
+    assert ("StageSeconds", (("BoardId", "1"), ("Stage", "fetch"))) in m._values
+
+
+def test_emit_writes_one_emf_document_per_dimension_set():
+    m = Metrics(clock=lambda: 1700000000.5)
+    m.incr("Pages", 3, BoardId="1")
+    m.incr("Items", 1500, BoardId="1")
+    m.incr("BytesWritten", 2048, unit="Bytes")
+
+    stream = io.StringIO()
+    m.emit(stream)
+    documents = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    by_board = {document.get("BoardId"): document for document in documents}
+    board = by_board["1"]
+    assert board["Pages"] == 3
+    assert board["Items"] == 1500
+    assert board["_aws"]["Timestamp"] == 1700000000500
+    directive = board["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == metrics_module.NAMESPACE
+    assert directive["Dimensions"] == [["BoardId"]]
+    assert {"Name": "Pages", "Unit": "Count"} in directive["Metrics"]
+
+    job = by_board[None]
+    assert job["BytesWritten"] == 2048
+    assert job["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [[]]
+    assert job["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [{"Name": "BytesWritten", "Unit": "Bytes"}]
+
+
+def test_log_event_writes_json(caplog):
+    with caplog.at_level(logging.INFO, logger="mondays"):
+        metrics_module.log_event("board_failed", level=logging.ERROR, board_id="1", error="boom")
+
+    record = caplog.records[-1]
+    assert record.levelno == logging.ERROR
+    assert json.loads(record.getMessage()) == {"event": "board_failed", "board_id": "1", "error": "boom"}
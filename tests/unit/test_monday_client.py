@@ -0,0 +1,104 @@
+import pytest
+
+from monday_client import MondayApiError, MondayClient, MondayCursorError, MondayThrottledError
+
+from tests.unit.fake_monday import FakeMondayServer, make_board
+
+COLUMNS_QUERY = "query ($board_id: [ID!]) { complexity { query after reset_in_x_seconds } boards (ids: $board_id) { columns { id title } } }"
+
+
+@pytest.fixture
+def server():
+    with FakeMondayServer({"1": make_board("1", 2)}) as fake:
+        yield fake
+
+
+def make_client(server, sleeps, **kwargs):
+    return MondayClient(server.url, "api-key", backoff_base=0.5, sleep=sleeps.append, **kwargs)
+
+
+def test_execute_reuses_one_pooled_session(server):
+    with make_client(server, []) as client:
+        client.execute(COLUMNS_QUERY, {"board_id": ["1"]})
+        client.execute(COLUMNS_QUERY, {"board_id": ["1"]})
+
+    assert client.session.headers["Authorization"] == "api-key"
+    assert len(server.requests) == 2
+
+
+def test_retries_429_and_5xx_with_jittered_backoff(server):
+    server.failures = [(429, {"errors": [{"message": "slow down"}]}), (503, {}), (500, {})]
+    sleeps = []
+
+    data = make_client(server, sleeps).execute(COLUMNS_QUERY, {"board_id": ["1"]})
+
+    assert data["boards"][0]["columns"]
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= 0.5 * 2 ** attempt
+
+
+def test_complexity_error_waits_for_reported_reset(server):
+    server.failures = [(200, {
+        "errors": [{
+            "message": "Complexity budget exhausted",
+            "extensions": {"code": "COMPLEXITY_BUDGET_EXHAUSTED", "retry_in_seconds": 17},
+        }],
+    })]
+    sleeps = []
+
+    make_client(server, sleeps).execute(COLUMNS_QUERY, {"board_id": ["1"]})
+
+    assert sleeps == [17.0]
+
+
+def test_legacy_complexity_exception_parses_reset_from_message(server):
+    server.failures = [(200, {
+        "error_code": "ComplexityException",
+        "error_message": "Complexity budget exhausted, query cost 30001 budget remaining 10 out of 1000000 reset in 42 seconds",
+    })]
+    sleeps = []
+
+    make_client(server, sleeps).execute(COLUMNS_QUERY, {"board_id": ["1"]})
+
+    assert sleeps == [42.0]
+
+
+def test_low_complexity_budget_slows_down_before_next_query(server):
+    server.complexity_after = 50
+    sleeps = []
+    client = make_client(server, sleeps)
+
+    client.execute(COLUMNS_QUERY, {"board_id": ["1"]})
+    assert sleeps == []
+    client.execute(COLUMNS_QUERY, {"board_id": ["1"]})
+
+    assert len(sleeps) == 1 and 0 < sleeps[0] <= 30
+
+
+def test_graphql_errors_are_raised_instead_of_returning_none(server):
+    server.failures = [(200, {"errors": [{"message": "Field 'nope' doesn't exist"}]})]
+
+    with pytest.raises(MondayApiError, match="nope"):
+        make_client(server, []).execute(COLUMNS_QUERY, {"board_id": ["1"]})
+
+
+def test_expired_cursor_raises_cursor_error(server):
+    server.failures = [
+        (200, {"errors": [{"message": "CursorExpiredError: the cursor has expired"}]}),
+        (200, {"error_code": "CursorException", "error_message": "bad"}),
+    ]
+    client = make_client(server, [])
+
+    for _ in range(2):
+        with pytest.raises(MondayCursorError):
+            client.execute(COLUMNS_QUERY, {"board_id": ["1"]})
+
+
+def test_gives_up_after_max_retries(server):
+    server.failures = [(502, {})] * 3
+    sleeps = []
+
+    with pytest.raises(MondayThrottledError):
+        make_client(server, sleeps, max_retries=2).execute(COLUMNS_QUERY, {"board_id": ["1"]})
+    assert len(sleeps) == 2
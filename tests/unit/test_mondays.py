@@ -0,0 +1,181 @@
+import time
+
+import pytest
+
+import mondays
+from monday_client import MondayClient
+
+from tests.unit.fake_monday import FakeMondayServer, make_board
+
+
+@pytest.fixture
+def server():
+    boards = {"111": make_board("111", 1203), "222": make_board("222", 0)}
+    with FakeMondayServer(boards) as fake:
+        yield fake
+
+
+@pytest.fixture
+def client(server):
+    with MondayClient(server.url, "api-key") as client:
+        yield client
+
+
+def test_iter_board_items_follows_cursor_across_pages(server, client):
+    items = list(mondays.iter_board_items(client, "111", limit=500))
+
+    assert [item["id"] for item in items] == [
+        item["id"] for item in server.boards["111"]["items"]
+    ]
+    next_page_calls = [r for r in server.requests if "next_items_page" in r["query"]]
+    assert [r["variables"]["cursor"] for r in next_page_calls] == ["111::500", "111::1000"]
+
+
+def test_iter_board_items_is_lazy(server, client):
+    items = mondays.iter_board_items(client, "111", limit=100)
+
+    assert next(items)["id"] == "111000000"
+    assert len(server.requests) == 1
+
+
+def test_iter_board_items_empty_board(client):
+    assert list(mondays.iter_board_items(client, "222")) == []
+
+
+def test_get_board_columns(server, client):
+    columns = mondays.get_board_columns(client, "111")
+
+    assert columns == server.boards["111"]["columns"]
+
+
+def test_extract_boards_merges_in_board_order_and_isolates_failures():
+    boards = {board_id: make_board(board_id, 3) for board_id in ("1", "2", "3")}
+    with FakeMondayServer(boards) as fake, MondayClient(fake.url, "api-key") as client:
+        tables, failures = mondays.extract_boards(client, ["3", "missing", "1", "2"], max_workers=4)
+
+    assert list(tables) == ["3", "1", "2"]
+    assert [table["board_id"][0].as_py() for table in tables.values()] == ["3", "1", "2"]
+    assert list(failures) == ["missing"]
+
+
+def test_extract_boards_runs_boards_concurrently():
+    boards = {str(board_id): make_board(str(board_id), 3) for board_id in range(4)}
+    with FakeMondayServer(boards, latency=0.2) as fake, MondayClient(fake.url, "api-key") as client:
+        start = time.monotonic()
+        tables, failures = mondays.extract_boards(client, list(boards), max_workers=4)
+        elapsed = time.monotonic() - start
+
+    assert len(tables) == 4 and not failures
+    # Two round trips per board: 1.6s serially, ~0.4s with four workers.
+    assert elapsed < 1.2
+
+
+def test_extract_board_records_page_and_item_metrics(client):
+    mondays.metrics.reset()
+
+    mondays.extract_board(client, "111")
+
+    assert mondays.metrics.get("Pages", BoardId="111") == 3
+    assert mondays.metrics.get("Items", BoardId="111") == 1203
+    assert mondays.metrics.get("StageSeconds", Stage="extract", BoardId="111") > 0
+    assert mondays.metrics.get("ApiRequests") == 4
+
+
+def test_extract_boards_decodes_pages_on_a_process_pool(client):
+    from normalize import page_pool
+
+    with page_pool(2) as pool:
+        tables, failures = mondays.extract_boards(client, ["111", "222"], pool=pool)
+    expected, _ = mondays.extract_boards(client, ["111", "222"])
+
+    assert failures == {}
+    assert tables["111"].equals(expected["111"])
+    assert tables["222"].num_rows == 0
+
+
+def run_job(s3, monkeypatch, boards, **config):
+    from datetime import datetime, timedelta, timezone
+
+    from config import JobConfig
+
+    monkeypatch.setattr(mondays, "get_api_key", lambda config: "api-key")
+    run_number = len(s3.list_objects_v2(Bucket="test-bucket", Prefix="_job_state/monday.com/manifests/").get("Contents", []))
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 3, 1, tzinfo=timezone.utc) + timedelta(days=run_number)
+
+    monkeypatch.setattr(mondays, "datetime", Clock)
+    with FakeMondayServer(boards) as fake:
+        mondays.run(JobConfig(board_ids=list(boards), api_url=fake.url, bucket="test-bucket", **config))
+    return mondays.latest_manifest(JobConfig(bucket="test-bucket"), s3)
+
+
+def parquet_keys(s3, prefix="monday.com/items/"):
+    return [o["Key"] for o in s3.list_objects_v2(Bucket="test-bucket", Prefix=prefix).get("Contents", [])]
+
+
+def test_unchanged_boards_are_not_rewritten(s3, monkeypatch):
+    boards = {"111": make_board("111", 20), "222": make_board("222", 10)}
+    first = run_job(s3, monkeypatch, boards)
+    written = parquet_keys(s3)
+
+    boards["222"]["items"][0]["name"] = "Renamed"
+    second = run_job(s3, monkeypatch, boards)
+
+    assert second["unchanged_boards"] == ["111"]
+    assert second["files"]["111"] == first["files"]["111"]
+    assert second["files"]["222"] != first["files"]["222"]
+    assert len(parquet_keys(s3)) == len(written) + 1
+
+    third = run_job(s3, monkeypatch, boards)
+
+    assert third["unchanged_boards"] == ["111", "222"]
+    assert third["files"] == second["files"]
+    assert len(parquet_keys(s3)) == len(written) + 1
+
+
+def test_incremental_run_without_changes_writes_no_delta(s3, monkeypatch):
+    boards = {"111": make_board("111", 20)}
+    state_path = "s3://test-bucket/_job_state/monday.com/watermarks.json"
+    run_job(s3, monkeypatch, boards, extract_mode="incremental", state_path=state_path)
+    run_job(s3, monkeypatch, boards, extract_mode="incremental", state_path=state_path)
+
+    assert parquet_keys(s3, "monday.com/items_delta/") == []
+
+
+class FakeCatalog:
+    def __init__(self, matches):
+        self.matches = matches
+        self.partitions = []
+
+    def __call__(self, database, table, bucket, registry_prefix):
+        return self
+
+    def precheck(self, schema):
+        return self.matches
+
+    def add_partitions(self, base_s3path, board_ids, ds):
+        self.partitions.append((base_s3path, sorted(board_ids), ds))
+
+
+def test_matching_schema_skips_the_crawled_prefix(s3, monkeypatch):
+    catalog = FakeCatalog(matches=True)
+    monkeypatch.setattr(mondays, "CatalogTable", catalog)
+
+    manifest = run_job(s3, monkeypatch, {"111": make_board("111", 20)}, schema_precheck=1)
+
+    assert parquet_keys(s3) == []
+    assert manifest["files"]["111"][0].startswith("monday.com/items_registered/board_id=111/ds=2024-03-01/")
+    assert catalog.partitions == [("s3://test-bucket/monday.com/items_registered/", ["111"], "2024-03-01")]
+
+
+def test_drifted_schema_is_written_for_the_crawler(s3, monkeypatch):
+    catalog = FakeCatalog(matches=False)
+    monkeypatch.setattr(mondays, "CatalogTable", catalog)
+
+    run_job(s3, monkeypatch, {"111": make_board("111", 20)}, schema_precheck=1)
+
+    assert len(parquet_keys(s3)) == 1
+    assert catalog.partitions == []
@@ -0,0 +1,155 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from metrics import metrics
+from normalize import (
+    LOADED_AT_TYPE,
+    ColumnarBuilder,
+    PooledBuilder,
+    build_column_index,
+    combine_tables,
+    content_hash,
+    page_pool,
+)
+
+
+def item(item_id, column_values, board_id="1"):
+    return {
+        "id": item_id,
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-02T00:00:00Z",
+        "name": f"Item {item_id}",
+        "board": {"id": board_id},
+        "column_values": [{"id": cid, "value": value} for cid, value in column_values],
+    }
+
+
+def test_build_column_index_maps_ids_to_normalized_titles():
+    columns = [{"id": "status", "title": "Status"}, {"id": "date4", "title": "Due.Date"}]
+
+    assert build_column_index(columns) == {"status": "Status", "date4": "Due_Date"}
+
+
+def test_builder_fills_row_aligned_column_arrays_across_batches():
+    columns = [{"id": "a", "title": "A"}, {"id": "b", "title": "B"}]
+    builder = ColumnarBuilder(columns, batch_size=2).extend([
+        item("1", [("a", '"x"'), ("b", '"y"')]),
+        item("2", [("b", '"z"')]),
+        item("3", [("a", '"p"'), ("a", '"q"'), ("b", None)]),
+    ])
+
+    table = builder.to_table()
+    assert builder.num_rows == 3
+    assert table.to_pydict() == {
+        "A": ['"x"', None, '"p"'],
+        "B": ['"y"', '"z"', None],
+        "id": ["1", "2", "3"],
+        "created_at": ["2024-01-01T00:00:00Z"] * 3,
+        "updated_at": ["2024-01-02T00:00:00Z"] * 3,
+        "name": ["Item 1", "Item 2", "Item 3"],
+        "board_id": ["1", "1", "1"],
+    }
+
+
+def test_builder_ignores_unknown_ids_when_a_known_value_is_missing():
+    columns = [{"id": "a", "title": "A"}, {"id": "b", "title": "B"}]
+    table = ColumnarBuilder(columns).extend([
+        item("1", [("a", '"x"'), ("zzz", '"?"')]),
+        item("2", [("a", '"y"'), ("b", '"z"')]),
+    ]).to_table()
+
+    assert table["A"].to_pylist() == ['"x"', '"y"']
+    assert table["B"].to_pylist() == [None, '"z"']
+
+
+def test_builder_item_fields_and_later_duplicate_titles_win():
+    columns = [
+        {"id": "n", "title": "name"},
+        {"id": "s1", "title": "Status"},
+        {"id": "s2", "title": "Status"},
+    ]
+    table = ColumnarBuilder(columns).extend([item("1", [("n", '"col"'), ("s1", "1"), ("s2", "2")])]).to_table()
+
+    assert table.column_names == ["Status", "id", "created_at", "updated_at", "name", "board_id"]
+    assert table["name"].to_pylist() == ["Item 1"]
+    assert table["Status"].to_pylist() == ["2"]
+
+
+def test_empty_board_keeps_its_schema():
+    table = ColumnarBuilder([{"id": "a", "title": "A"}]).to_table()
+
+    assert table.num_rows == 0
+    assert table.schema.names == ["A", "id", "created_at", "updated_at", "name", "board_id"]
+
+
+def test_combine_tables_unifies_board_schemas_and_stamps_loaded_at():
+    first = ColumnarBuilder([{"id": "a", "title": "A"}]).extend([item("1", [("a", "1")])]).to_table()
+    second = ColumnarBuilder([{"id": "b", "title": "B"}]).extend([item("2", [("b", "2")], board_id="2")]).to_table()
+    loaded_at = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+    table = combine_tables([first, second], loaded_at)
+
+    assert table.column_names == ["A", "id", "created_at", "updated_at", "name", "board_id", "B", "loaded_at"]
+    assert table["A"].to_pylist() == ["1", None]
+    assert table["B"].to_pylist() == [None, "2"]
+    assert table.schema.field("loaded_at").type == LOADED_AT_TYPE
+    assert table["loaded_at"].to_pylist() == [loaded_at, loaded_at]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with page_pool(2) as pool:
+        yield pool
+
+
+def test_pooled_builder_matches_columnar_builder(pool):
+    columns = [{"id": "a", "title": "A"}, {"id": "b", "title": "B", "type": "date"}]
+    pages = [
+        [item(str(i), [("a", f'"{i}"'), ("b", '{"date": "2024-01-02"}')]) for i in range(start, start + 50)]
+        for start in range(0, 500, 50)
+    ]
+
+    pooled = PooledBuilder(columns, pool, max_pending=3)
+    for page in pages:
+        pooled.extend(page)
+        assert len(pooled._pending) <= 3
+    expected = ColumnarBuilder(columns).extend(item for page in pages for item in page).to_table()
+
+    assert pooled.num_rows == 500
+    assert pooled.to_table().equals(expected)
+
+
+def test_pooled_builder_without_pages_keeps_schema(pool):
+    columns = [{"id": "a", "title": "A", "type": "numbers"}]
+
+    table = PooledBuilder(columns, pool).extend([]).to_table()
+
+    assert table.num_rows == 0
+    assert table.schema == ColumnarBuilder(columns).schema
+
+
+def test_content_hash_ignores_row_order_and_chunking():
+    columns = [{"id": "a", "title": "A"}]
+    items = [item(str(i), [("a", f'"{i}"')]) for i in range(10)]
+    table = ColumnarBuilder(columns, batch_size=3).extend(items).to_table()
+    reordered = ColumnarBuilder(columns).extend(reversed(items)).to_table()
+    changed = ColumnarBuilder(columns).extend(items[:-1] + [item("9", [("a", '"changed"')])]).to_table()
+
+    assert content_hash(table) == content_hash(reordered)
+    assert content_hash(table) != content_hash(changed)
+
+
+def test_builders_report_cells_they_could_not_decode(pool):
+    columns = [{"id": "a", "title": "A"}, {"id": "b", "title": "B", "type": "date"}]
+    items = [item("1", [("b", '{"date": "2024-01-02"}')]), item("2", [("b", '{"date": "soon"}')])]
+    metrics.reset()
+
+    builder = ColumnarBuilder(columns).extend(items)
+    builder.to_table()
+    pooled = PooledBuilder(columns, pool).extend(items[:1]).extend(items[1:])
+    pooled.to_table()
+
+    assert builder.decode_errors == {"B": {"column_type": "date", "fallbacks": 1, "nulled_cells": 1}}
+    assert pooled.decode_errors == builder.decode_errors
+    assert metrics.get("DecodeErrors", ColumnType="date") == 2
@@ -0,0 +1,211 @@
+import json
+from datetime import datetime, timezone
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from notifications import (
+    MAX_BATCH_ENTRIES,
+    Digest,
+    NotificationError,
+    Notifier,
+    build_report,
+    merge_reports,
+    split_report,
+)
+
+
+def updated(name, breaking=False, width=1):
+    return {
+        "table_name": name,
+        "dropped_columns": [],
+        "added_columns": [f"column_{i}" for i in range(width)],
+        "updated_columns": [],
+        "partition_keys": {"added": [], "dropped": [], "updated": [], "breaking": False},
+        "breaking": breaking,
+    }
+
+
+def report(tables=(), deleted=(), crawler="crawler", crawl_id="c1", database="db"):
+    return build_report(crawler, crawl_id, database, list(tables), list(deleted), ["new_table"], [])
+
+
+class FakeSns:
+    def __init__(self, failures=None):
+        self.published = []
+        self.batches = []
+        # entry id -> how many more times to reject it
+        self.failures = dict(failures or {})
+
+    def publish(self, TopicArn, **message):
+        self.published.append(message)
+        return {"MessageId": f"m{len(self.published)}"}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        self.batches.append(PublishBatchRequestEntries)
+        failed_ids = [e["Id"] for e in PublishBatchRequestEntries if self.failures.get(e["Id"])]
+        for i in failed_ids:
+            self.failures[i] -= 1
+        return {
+            "Successful": [{"Id": e["Id"], "MessageId": f"m{e['Id']}"} for e in PublishBatchRequestEntries
+                           if e["Id"] not in failed_ids],
+            "Failed": [{"Id": i, "Code": "InternalError", "SenderFault": False} for i in failed_ids],
+        }
+
+
+def test_report_is_breaking_when_tables_are_deleted_or_break():
+    assert report([updated("a")])["breaking"] is False
+    assert report([updated("a", breaking=True)])["breaking"] is True
+    assert report(deleted=["gone"])["breaking"] is True
+
+
+def test_small_report_is_one_json_message_with_filterable_attributes():
+    sns = FakeSns()
+
+    Notifier(sns, "arn:topic").publish(report([updated("a", breaking=True)]))
+
+    (message,) = sns.published
+    body = json.loads(message["Message"])
+    assert body["tables_updated"][0]["table_name"] == "a"
+    assert "part" not in body
+    assert message["Subject"] == "Crawler crawler detects breaking schema changes"
+    assert message["MessageAttributes"]["breaking"] == {"DataType": "String", "StringValue": "true"}
+    assert message["MessageAttributes"]["tables"] == {"DataType": "Number", "StringValue": "2"}
+    assert sns.batches == []
+
+
+def test_split_report_keeps_every_table_and_stays_under_the_limit():
+    big = report([updated(f"t{i}", width=50) for i in range(200)])
+
+    parts = split_report(big, 20_000)
+
+    assert len(parts) > 1
+    assert all(len(json.dumps(part).encode()) <= 20_000 for part in parts)
+    assert [t["table_name"] for part in parts for t in part["tables_updated"]] == [f"t{i}" for i in range(200)]
+    assert all(part["crawler"] == "crawler" for part in parts)
+
+
+def test_oversized_table_is_truncated():
+    (part,) = split_report(report([updated("wide", breaking=True, width=5000)]), 20_000)
+
+    assert part["tables_updated"] == [{"table_name": "wide", "breaking": True, "truncated": True}]
+
+
+def test_large_report_goes_out_in_publish_batches():
+    sns = FakeSns()
+    notifier = Notifier(sns, "arn:topic", max_message_bytes=24_000, max_parts=100)
+
+    message_ids = notifier.publish(report([updated(f"t{i}", width=50) for i in range(400)]))
+
+    entries = [entry for batch in sns.batches for entry in batch]
+    assert len(message_ids) == len(entries) > MAX_BATCH_ENTRIES
+    assert all(len(batch) <= MAX_BATCH_ENTRIES for batch in sns.batches)
+    bodies = [json.loads(entry["Message"]) for entry in entries]
+    assert {body["report_id"] for body in bodies} == {bodies[0]["report_id"]}
+    assert [body["part"] for body in bodies] == list(range(1, len(bodies) + 1))
+    assert entries[0]["Subject"].endswith(f"(1/{len(bodies)})")
+
+
+def test_failed_batch_entries_are_retried():
+    sns = FakeSns(failures={"1": 1})
+    notifier = Notifier(sns, "arn:topic", max_message_bytes=24_000, max_parts=100)
+
+    message_ids = notifier.publish(report([updated(f"t{i}", width=50) for i in range(60)]))
+
+    assert [entry["Id"] for entry in sns.batches[-1]] == ["1"]
+    assert "m1" in message_ids
+
+
+def test_persistent_failures_raise():
+    sns = FakeSns(failures={"0": 3})
+    notifier = Notifier(sns, "arn:topic", max_message_bytes=24_000, max_parts=100)
+
+    with pytest.raises(NotificationError):
+        notifier.publish(report([updated(f"t{i}", width=50) for i in range(60)]))
+
+
+def test_report_with_too_many_parts_is_offloaded_to_s3(s3):
+    sns = FakeSns()
+    notifier = Notifier(sns, "arn:topic", s3_client=s3, report_bucket="test-bucket", report_prefix="reports/",
+                        max_message_bytes=24_000, max_parts=2)
+    big = report([updated(f"t{i}", width=50) for i in range(400)])
+
+    notifier.publish(big)
+
+    (message,) = sns.published
+    body = json.loads(message["Message"])
+    assert body["tables_updated_count"] == 400
+    key = body["report_location"].removeprefix("s3://test-bucket/")
+    assert key.startswith("reports/schema_change/")
+    assert json.loads(s3.get_object(Bucket="test-bucket", Key=key)["Body"].read()) == big
+
+
+def test_messages_are_accepted_by_sns(aws_credentials):
+    with mock_aws():
+        sns = boto3.client("sns")
+        topic = sns.create_topic(Name="schema-changes")["TopicArn"]
+        notifier = Notifier(sns, topic, max_message_bytes=24_000, max_parts=100)
+
+        assert len(notifier.publish(report([updated(f"t{i}", width=50) for i in range(60)]))) > 1
+        assert len(notifier.publish(report([updated("a")]))) == 1
+
+
+def test_merge_reports_qualifies_tables_with_their_database():
+    digest = merge_reports([
+        report([updated("a")], crawl_id="c1", database="db1"),
+        report([updated("b", breaking=True)], crawl_id="c2", database="db2"),
+    ])
+
+    assert digest["event_type"] == "schema_change_digest"
+    assert digest["crawl_id"] == "c1,c2"
+    assert digest["breaking"] is True
+    assert digest["tables_added"] == ["db1.new_table", "db2.new_table"]
+    assert [t["table_name"] for t in digest["tables_updated"]] == ["db1.a", "db2.b"]
+
+
+def test_digest_waits_for_the_window(s3):
+    now = [datetime.now(timezone.utc).timestamp()]
+    digest = Digest(s3, "test-bucket", "reports/digest/", window_seconds=600, clock=lambda: now[0])
+
+    digest.add(report(crawl_id="c1"))
+    digest.add(report(crawl_id="c2"))
+    assert digest.flush() is None
+
+    now[0] += 601
+    merged = digest.flush()
+    assert set(merged["crawl_id"].split(",")) == {"c1", "c2"}
+    assert s3.list_objects_v2(Bucket="test-bucket", Prefix="reports/digest/")["KeyCount"] == 0
+    assert digest.flush() is None
+
+
+def test_digest_skips_reports_claimed_by_another_flush(s3):
+    digest = Digest(s3, "test-bucket", "reports/digest/", window_seconds=0)
+    digest.add(report(crawl_id="c1"))
+    [held] = [obj["Key"] for obj in s3.list_objects_v2(Bucket="test-bucket", Prefix=digest.prefix)["Contents"]]
+    digest.add(report(crawl_id="c2"))
+    claim = held.replace("/pending/", "/claimed/")
+    s3.put_object(Bucket="test-bucket", Key=claim, Body=b"")
+
+    assert digest.flush()["crawl_id"] == "c2"
+    left = s3.list_objects_v2(Bucket="test-bucket", Prefix="reports/digest/")["Contents"]
+    assert sorted(obj["Key"] for obj in left) == [claim, held]
+
+
+def test_concurrent_flushes_send_each_report_once(s3):
+    first = Digest(s3, "test-bucket", "reports/digest/", window_seconds=0)
+    second = Digest(boto3.client("s3", region_name="us-east-1"), "test-bucket", "reports/digest/", window_seconds=0)
+    first.add(report(crawl_id="c1"))
+    first.add(report(crawl_id="c2"))
+    merged = []
+
+    # The second flush runs to completion after the first has listed the reports.
+    def flush_second(**kwargs):
+        if not merged:
+            merged.append(second.flush())
+
+    s3.meta.events.register("after-call.s3.ListObjectsV2", flush_second)
+
+    assert first.flush() is None
+    assert sorted(merged[0]["crawl_id"].split(",")) == ["c1", "c2"]
+    assert s3.list_objects_v2(Bucket="test-bucket", Prefix="reports/digest/")["KeyCount"] == 0
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from s3_writer import MiB, S3MultipartWriter, delete_keys, split_s3_path
+
+BUCKET = "test-bucket"
+
+
+def test_split_s3_path():
+    assert split_s3_path("s3://bucket/monday.com/items/") == ("bucket", "monday.com/items/")
+    assert split_s3_path("s3://bucket") == ("bucket", "")
+
+
+def test_delete_keys_stays_within_the_per_request_limit(s3):
+    keys = [f"k/{i:05d}" for i in range(2500)]
+    for key in keys[:3] + keys[-3:]:
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+    requests = []
+    s3.meta.events.register("before-call.s3.DeleteObjects", lambda **kwargs: requests.append(kwargs["params"]))
+
+    delete_keys(s3, BUCKET, keys)
+
+    assert len(requests) == 3
+    assert s3.list_objects_v2(Bucket=BUCKET).get("KeyCount") == 0
+
+
+def test_streams_object_in_bounded_parts(s3):
+    payload = os.urandom(12 * MiB + 123)
+
+    with S3MultipartWriter(BUCKET, "big.bin", part_size=5 * MiB, max_concurrency=2, s3_client=s3) as writer:
+        for offset in range(0, len(payload), MiB):
+            writer.write(payload[offset:offset + MiB])
+        assert len(writer._buffer) < 5 * MiB
+        assert writer.tell() == len(payload)
+
+    head = s3.head_object(Bucket=BUCKET, Key="big.bin", PartNumber=1)
+    assert head["PartsCount"] == 3
+    assert s3.get_object(Bucket=BUCKET, Key="big.bin")["Body"].read() == payload
+
+
+def test_small_object_is_a_single_part(s3):
+    with S3MultipartWriter(BUCKET, "small.bin", s3_client=s3) as writer:
+        writer.write(b"hello")
+
+    assert s3.get_object(Bucket=BUCKET, Key="small.bin")["Body"].read() == b"hello"
+
+
+def test_failure_aborts_the_multipart_upload(s3):
+    with pytest.raises(RuntimeError):
+        with S3MultipartWriter(BUCKET, "broken.bin", part_size=5 * MiB, s3_client=s3) as writer:
+            writer.write(os.urandom(6 * MiB))
+            raise RuntimeError("encoder blew up")
+
+    assert "Uploads" not in s3.list_multipart_uploads(Bucket=BUCKET)
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
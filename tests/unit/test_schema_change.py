@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from botocore.stub import Stubber
+
+# The Lambda reads its configuration and builds its clients at import time.
+os.environ.setdefault("SNS_TOPIC", "arn:aws:sns:us-east-1:123456789012:schema-changes")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import schema_change  # noqa: E402
+from schema_registry import LocalSchemaStore, SchemaRegistry, schema_entry  # noqa: E402
+
+
+def version(columns, version_id="1", **parameters):
+    return {
+        "VersionId": version_id,
+        "Table": {
+            "Name": "t",
+            "Parameters": parameters,
+            "StorageDescriptor": {"Columns": [{"Name": name, "Type": type_} for name, type_ in columns]},
+        },
+    }
+
+
+class FakeGlue:
+    """Answers get_table_versions and get_tables from a dict of versions, newest first.
+
+    Records how many get_table_versions calls overlap and which tables they read.
+    """
+
+    def __init__(self, versions, delay=0.05):
+        self.versions = versions
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.versions_read = []
+        self._lock = threading.Lock()
+
+    def get_paginator(self, operation):
+        paginate = {"get_table_versions": self.paginate_versions, "get_tables": self.paginate_tables}[operation]
+        return SimpleNamespace(paginate=paginate)
+
+    def paginate_tables(self, DatabaseName, Expression):
+        names = Expression.split("|")
+        yield {"TableList": [{**self.versions[name][0]["Table"], "Name": name} for name in names if name in self.versions]}
+
+    def paginate_versions(self, DatabaseName, TableName, PaginationConfig):
+        with self._lock:
+            self.versions_read.append(TableName)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        yield {"TableVersions": self.versions[TableName][:PaginationConfig["PageSize"]]}
+
+
+@pytest.fixture
+def glue_stub():
+    with Stubber(schema_change.glue) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+def test_table_versions_fetch_only_the_newest_two(glue_stub):
+    glue_stub.add_response(
+        "get_table_versions",
+        {"TableVersions": [version([("a", "int")], "3"), version([("a", "string")], "2")], "NextToken": "more"},
+        {"DatabaseName": "db", "TableName": "t", "MaxResults": 2},
+    )
+
+    versions = schema_change.get_latest_table_versions("db", ["t"])
+
+    assert [v["VersionId"] for v in versions["t"]] == ["3", "2"]
+
+
+def test_table_dropped_since_the_crawl_has_no_versions(glue_stub):
+    glue_stub.add_client_error("get_table_versions", "EntityNotFoundException")
+    glue_stub.add_response("get_table_versions", {"TableVersions": [version([("a", "int")], "1")]})
+
+    versions = schema_change.get_latest_table_versions("db", ["gone", "t"], max_workers=1)
+
+    assert versions["gone"] == []
+    assert [v["VersionId"] for v in versions["t"]] == ["1"]
+
+
+def test_table_versions_are_fetched_concurrently_within_the_bound(monkeypatch):
+    tables = [f"table_{i}" for i in range(12)]
+    fake = FakeGlue({table: [version([("a", "int")], "2"), version([("a", "int")], "1")] for table in tables})
+    monkeypatch.setattr(schema_change, "glue", fake)
+
+    versions = schema_change.get_latest_table_versions("db", tables, max_workers=4)
+
+    assert list(versions) == tables
+    assert fake.max_in_flight == 4
+
+
+def test_compare_version_report(monkeypatch):
+    fake = FakeGlue({
+        "changed": [version([("a", "bigint"), ("c", "string")]), version([("a", "int"), ("b", "string")])],
+        "deprecated": [version([("a", "int")], DEPRECATED_BY_CRAWLER="123"), version([("a", "int")])],
+        "new": [version([("a", "int")])],
+    }, delay=0)
+    monkeypatch.setattr(schema_change, "glue", fake)
+
+    report, deprecated = schema_change.get_compare_version_report("db", ["changed", "deprecated", "new"], [])
+
+    assert deprecated == ["deprecated"]
+    assert len(report) == 1
+    assert report[0]["table_name"] == "changed"
+    assert report[0]["dropped_columns"] == ["b"]
+    assert report[0]["added_columns"] == ["c"]
+    assert [(c["column_name"], c["change"]) for c in report[0]["updated_columns"]] == [("a", "widening")]
+    assert report[0]["breaking"] is True
+
+
+def test_registered_tables_are_diffed_against_the_registry(monkeypatch, tmp_path):
+    registry = SchemaRegistry(LocalSchemaStore(str(tmp_path)))
+    monkeypatch.setattr(schema_change, "schema_registry", registry)
+    fake = FakeGlue({
+        "seen": [version([("a", "int")])],
+        "same": [version([("a", "int")])],
+        "unseen": [version([("a", "bigint")], "2"), version([("a", "int")], "1")],
+        "gone": [version([("a", "int")])],
+    }, delay=0)
+    monkeypatch.setattr(schema_change, "glue", fake)
+    registry.register("db", {
+        "seen": schema_entry(version([("a", "string"), ("b", "int")])["Table"]),
+        "same": schema_entry(version([("A", "INT")])["Table"]),
+        "gone": schema_entry(version([("a", "int")])["Table"]),
+    })
+
+    report, _ = schema_change.get_compare_version_report("db", ["seen", "same", "unseen"], ["gone"])
+
+    assert fake.versions_read == ["unseen"]
+    assert [(t["table_name"], t["dropped_columns"]) for t in report] == [("seen", ["b"]), ("unseen", [])]
+    assert registry.lookup("db", ["seen"])["seen"]["columns"] == [{"Name": "a", "Type": "int"}]
+    assert registry.lookup("db", ["unseen"])["unseen"]["columns"] == [{"Name": "a", "Type": "bigint"}]
+    assert registry.lookup("db", ["gone"]) == {"gone": None}
+
+    fake.versions_read.clear()
+    report, _ = schema_change.get_compare_version_report("db", ["seen", "unseen"], [])
+    assert report == [] and fake.versions_read == []
+
+
+def test_name_expressions_stay_under_the_limit():
+    names = [f"table_{i:03d}" for i in range(100)]
+
+    expressions = list(schema_change._name_expressions(names, 100))
+
+    assert all(len(expression) <= 100 for expression in expressions)
+    assert [name for expression in expressions for name in expression.split("|")] == names
+
+
+def test_crawler_report_without_updates():
+    summary = '{"TABLE": {"ADD": "{\\"Details\\": {\\"names\\": [\\"t1\\"]}}"}}'
+
+    assert schema_change.get_crawler_report({"CrawlId": "c1", "Summary": summary}) == ([], [], ["t1"])
+
+
+def test_crawler_report_without_table_changes():
+    with pytest.raises(schema_change.NoChangeError):
+        schema_change.get_crawler_report({"CrawlId": "c1", "Summary": '{"PARTITION": {}}'})
+
+
+def test_handler_exits_early_when_the_event_reports_no_table_changes(glue_stub):
+    event = {"detail": {"crawlerName": "crawler", "tablesCreated": "0", "tablesUpdated": "0", "tablesDeleted": "0"}}
+
+    assert schema_change.lambda_handler(event, None) is None
+
+
+def test_handler_skips_events_whose_crawl_is_not_found(glue_stub):
+    event = {"detail": {"crawlerName": "crawler", "tablesCreated": "0", "tablesUpdated": "1", "tablesDeleted": "0",
+                        "completionDate": "2024-03-02T10:00:00Z"}}
+    glue_stub.add_response("list_crawls", {"Crawls": []})
+    glue_stub.add_response("list_crawls", {"Crawls": []})
+
+    assert schema_change.lambda_handler(event, None) is None
@@ -0,0 +1,130 @@
+import json
+
+import boto3
+import pyarrow as pa
+import pytest
+from botocore.stub import Stubber
+
+from schema_check import CatalogTable, hive_type, output_columns, schema_drift
+
+PARTITION_KEYS = [{"Name": "board_id", "Type": "string"}, {"Name": "ds", "Type": "string"}]
+STORAGE = {
+    "Columns": [{"Name": "id", "Type": "string"}, {"Name": "score", "Type": "double"}],
+    "Location": "s3://test-bucket/monday.com/items/",
+    "InputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+    "SerdeInfo": {"SerializationLibrary": "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"},
+}
+
+
+@pytest.mark.parametrize("arrow_type, expected", [
+    (pa.string(), "string"),
+    (pa.int64(), "bigint"),
+    (pa.int32(), "int"),
+    (pa.float64(), "double"),
+    (pa.bool_(), "boolean"),
+    (pa.timestamp("us", tz="UTC"), "timestamp"),
+    (pa.date32(), "date"),
+    (pa.decimal128(12, 2), "decimal(12,2)"),
+    (pa.list_(pa.string()), "array<string>"),
+    (pa.struct([("from", pa.date32()), ("to", pa.date32())]), "struct<from:date,to:date>"),
+    (pa.map_(pa.string(), pa.int64()), "map<string,bigint>"),
+    (pa.dictionary(pa.int32(), pa.string()), "string"),
+    (pa.null(), None),
+    (pa.list_(pa.null()), None),
+])
+def test_hive_type(arrow_type, expected):
+    assert hive_type(arrow_type) == expected
+
+
+def test_output_columns_leave_out_the_partition_column():
+    schema = pa.schema([("id", pa.string()), ("board_id", pa.string()), ("score", pa.float64())])
+
+    assert output_columns(schema) == [{"Name": "id", "Type": "string"}, {"Name": "score", "Type": "double"}]
+
+
+def test_schema_drift():
+    registered = [{"Name": "id", "Type": "string"}, {"Name": "Score", "Type": "DOUBLE"}, {"Name": "gone", "Type": "int"}]
+
+    assert schema_drift([{"Name": "id", "Type": "string"}, {"Name": "score", "Type": "double"}],
+                        registered, PARTITION_KEYS) == []
+    assert schema_drift([{"Name": "id", "Type": None}], registered, PARTITION_KEYS) == []
+    assert schema_drift([{"Name": "id", "Type": "bigint"}, {"Name": "new", "Type": "string"}], registered, PARTITION_KEYS) == [
+        "column id is bigint, registered as string",
+        "new column new",
+    ]
+    assert schema_drift([], registered, PARTITION_KEYS[:1]) == ["partition keys ['board_id'] are not ['board_id', 'ds']"]
+
+
+@pytest.fixture
+def glue(aws_credentials):
+    client = boto3.client("glue")
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+def get_table_response():
+    return {"Table": {"Name": "items", "StorageDescriptor": STORAGE, "PartitionKeys": PARTITION_KEYS}}
+
+
+def test_precheck_prefers_the_registry(s3, glue):
+    client, _ = glue
+    entry = {"columns": [{"Name": "id", "Type": "string"}], "partition_keys": PARTITION_KEYS}
+    s3.put_object(Bucket="test-bucket", Key="registry/db/items.json", Body=json.dumps(entry))
+    catalog = CatalogTable("db", "items", "test-bucket", "registry/", glue_client=client, s3_client=s3)
+
+    assert catalog.precheck(pa.schema([("id", pa.string()), ("board_id", pa.string())])) is True
+    assert catalog.precheck(pa.schema([("id", pa.string()), ("score", pa.float64())])) is False
+
+
+def test_precheck_falls_back_to_the_catalog(s3, glue):
+    client, stubber = glue
+    stubber.add_response("get_table", get_table_response(), {"DatabaseName": "db", "Name": "items"})
+    catalog = CatalogTable("db", "items", "test-bucket", "registry/", glue_client=client, s3_client=s3)
+
+    assert catalog.precheck(pa.schema([("id", pa.string()), ("score", pa.float64())])) is True
+
+
+def test_precheck_of_a_table_that_does_not_exist_yet(s3, glue):
+    client, stubber = glue
+    stubber.add_client_error("get_table", "EntityNotFoundException")
+    catalog = CatalogTable("db", "items", "test-bucket", glue_client=client, s3_client=s3)
+
+    assert catalog.precheck(pa.schema([("id", pa.string())])) is False
+
+
+def test_add_partitions_creates_new_and_moves_existing_ones(s3, glue):
+    client, stubber = glue
+    stubber.add_response("get_table", get_table_response())
+
+    def partition(board_id):
+        location = f"s3://test-bucket/registered/board_id={board_id}/ds=2024-03-01/"
+        return {"Values": [board_id, "2024-03-01"], "StorageDescriptor": {**STORAGE, "Location": location}}
+
+    stubber.add_response(
+        "batch_create_partition",
+        {"Errors": [{"PartitionValues": ["222", "2024-03-01"],
+                     "ErrorDetail": {"ErrorCode": "AlreadyExistsException", "ErrorMessage": "exists"}}]},
+        {"DatabaseName": "db", "TableName": "items", "PartitionInputList": [partition("111"), partition("222")]},
+    )
+    stubber.add_response(
+        "batch_update_partition",
+        {"Errors": []},
+        {"DatabaseName": "db", "TableName": "items",
+         "Entries": [{"PartitionValueList": ["222", "2024-03-01"], "PartitionInput": partition("222")}]},
+    )
+    catalog = CatalogTable("db", "items", "test-bucket", glue_client=client, s3_client=s3)
+
+    catalog.add_partitions("s3://test-bucket/registered/", ["111", "222"], "2024-03-01")
+
+
+def test_add_partitions_raises_on_other_errors(s3, glue):
+    client, stubber = glue
+    stubber.add_response("get_table", get_table_response())
+    stubber.add_response("batch_create_partition", {"Errors": [
+        {"PartitionValues": ["111", "2024-03-01"], "ErrorDetail": {"ErrorCode": "AccessDeniedException"}},
+    ]})
+    catalog = CatalogTable("db", "items", "test-bucket", glue_client=client, s3_client=s3)
+
+    with pytest.raises(RuntimeError, match="AccessDeniedException"):
+        catalog.add_partitions("s3://test-bucket/registered/", ["111"], "2024-03-01")
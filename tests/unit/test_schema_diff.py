@@ -0,0 +1,130 @@
+import time
+
+import pytest
+
+from schema_diff import (
+    BREAKING,
+    WIDENING,
+    SchemaParseError,
+    diff_columns,
+    diff_table,
+    is_widening,
+    parse_type,
+)
+
+
+def columns(*pairs):
+    return [{"Name": name, "Type": type_} for name, type_ in pairs]
+
+
+def table(cols, partition_keys=()):
+    return {"StorageDescriptor": {"Columns": columns(*cols)}, "PartitionKeys": columns(*partition_keys)}
+
+
+def test_parse_nested_types():
+    assert parse_type("struct<id: bigint, tags: array<string>, attrs: map<string, decimal(10,2)>>") == (
+        "struct",
+        {"id": "bigint", "tags": ("array", "string"), "attrs": ("map", "string", "decimal(10,2)")},
+    )
+    assert parse_type("ARRAY<STRUCT<`x`:INT>>") == ("array", ("struct", {"x": "int"}))
+
+
+@pytest.mark.parametrize("bad", ["struct<a int>", "array<int", "map<string>", "int>", ""])
+def test_parse_rejects_invalid_types(bad):
+    with pytest.raises(SchemaParseError):
+        parse_type(bad)
+
+
+@pytest.mark.parametrize("old, new, widening", [
+    ("int", "bigint", True),
+    ("bigint", "int", False),
+    ("float", "double", True),
+    ("int", "string", False),
+    ("decimal(10,2)", "decimal(12,2)", True),
+    ("decimal(10,2)", "decimal(10,3)", False),
+    ("decimal", "decimal(12,2)", True),
+    ("varchar(10)", "varchar(20)", True),
+    ("varchar(10)", "string", True),
+    ("date", "timestamp", True),
+])
+def test_is_widening(old, new, widening):
+    assert is_widening(old, new) is widening
+
+
+def test_diff_columns_reports_added_dropped_and_updated_in_schema_order():
+    diff = diff_columns(
+        columns(("id", "int"), ("name", "string"), ("score", "float")),
+        columns(("id", "bigint"), ("Score", "string"), ("email", "string")),
+    )
+
+    assert diff["added"] == ["email"]
+    assert diff["dropped"] == ["name"]
+    assert [(u["column_name"], u["change"]) for u in diff["updated"]] == [("id", WIDENING), ("Score", BREAKING)]
+    assert diff["breaking"] is True
+
+
+def test_only_added_columns_and_widened_types_are_not_breaking():
+    diff = diff_columns(columns(("id", "int")), columns(("id", "bigint"), ("email", "string")))
+
+    assert diff["breaking"] is False
+
+
+def test_nested_changes_are_reported_by_field_path():
+    diff = diff_columns(
+        columns(("address", "struct<street:string,zip:int,geo:struct<lat:float>>"), ("tags", "array<int>")),
+        columns(("address", "struct<street:string,zip:string,geo:struct<lat:double,lon:double>>"),
+                ("tags", "array<bigint>")),
+    )
+
+    address, tags = diff["updated"]
+    assert [(f["path"], f["old_type"], f["new_type"], f["change"]) for f in address["fields"]] == [
+        ("address.zip", "int", "string", BREAKING),
+        ("address.geo.lat", "float", "double", WIDENING),
+        ("address.geo.lon", None, "double", WIDENING),
+    ]
+    assert address["change"] == BREAKING
+    assert tags["fields"] == [{"path": "tags[]", "old_type": "int", "new_type": "bigint", "change": WIDENING}]
+    assert tags["change"] == WIDENING
+
+
+def test_dropped_struct_field_and_kind_change_are_breaking():
+    diff = diff_columns(
+        columns(("s", "struct<a:int,b:int>"), ("m", "map<string,int>")),
+        columns(("s", "struct<a:int>"), ("m", "array<int>")),
+    )
+
+    assert [f["path"] for f in diff["updated"][0]["fields"]] == ["s.b"]
+    assert diff["updated"][1]["fields"][0]["change"] == BREAKING
+    assert all(u["change"] == BREAKING for u in diff["updated"])
+
+
+def test_formatting_only_differences_are_ignored():
+    diff = diff_columns(columns(("s", "struct<a:int, b:string>")), columns(("s", "STRUCT<a:INT,b:STRING>")))
+
+    assert diff["updated"] == []
+
+
+def test_partition_key_changes_are_breaking():
+    diff = diff_table(
+        table([("id", "int")], partition_keys=[("dt", "date")]),
+        table([("id", "int")], partition_keys=[("dt", "timestamp"), ("region", "string")]),
+    )
+
+    assert diff["columns"]["breaking"] is False
+    assert diff["partition_keys"]["added"] == ["region"]
+    assert diff["partition_keys"]["updated"][0]["change"] == BREAKING
+    assert diff["breaking"] is True
+
+
+def test_wide_tables_diff_in_linear_time():
+    old = columns(*((f"c{i}", "int") for i in range(20_000)))
+    new = columns(*((f"c{i}", "bigint" if i % 2 else "int") for i in range(1, 20_001)))
+
+    start = time.perf_counter()
+    diff = diff_columns(old, new)
+    elapsed = time.perf_counter() - start
+
+    assert diff["added"] == ["c20000"]
+    assert diff["dropped"] == ["c0"]
+    assert len(diff["updated"]) == 10_000
+    assert elapsed < 1.0
@@ -0,0 +1,54 @@
+from schema_registry import LocalSchemaStore, S3SchemaStore, SchemaRegistry, as_table, fingerprint, schema_entry
+
+
+def glue_table(columns, partition_keys=()):
+    return {
+        "Name": "t",
+        "VersionId": "7",
+        "StorageDescriptor": {
+            "Columns": [{"Name": n, "Type": t, "Comment": "ignored"} for n, t in columns],
+            "Location": "s3://bucket/t/",
+        },
+        "PartitionKeys": [{"Name": n, "Type": t} for n, t in partition_keys],
+    }
+
+
+def test_fingerprint_ignores_case_and_formatting_but_not_order_or_partitions():
+    base = fingerprint([{"Name": "a", "Type": "struct<x:int>"}], [{"Name": "dt", "Type": "string"}])
+
+    assert fingerprint([{"Name": "A", "Type": "STRUCT< x : INT >"}], [{"Name": "dt", "Type": "string"}]) == base
+    assert fingerprint([{"Name": "a", "Type": "struct<x:int>"}]) != base
+    assert fingerprint([{"Name": "a", "Type": "int"}, {"Name": "b", "Type": "int"}]) != \
+        fingerprint([{"Name": "b", "Type": "int"}, {"Name": "a", "Type": "int"}])
+
+
+def test_schema_entry_keeps_only_names_and_types():
+    entry = schema_entry(glue_table([("a", "int")], [("dt", "string")]))
+
+    assert entry["columns"] == [{"Name": "a", "Type": "int"}]
+    assert entry["partition_keys"] == [{"Name": "dt", "Type": "string"}]
+    assert entry["version_id"] == "7"
+    assert schema_entry(as_table(entry))["fingerprint"] == entry["fingerprint"]
+
+
+def test_local_store_round_trip(tmp_path):
+    registry = SchemaRegistry(LocalSchemaStore(str(tmp_path)))
+    entry = schema_entry(glue_table([("a", "int")]))
+
+    registry.register("db", {"t": entry})
+
+    assert registry.lookup("db", ["t", "other"]) == {"t": entry, "other": None}
+    registry.forget("db", ["t", "other"])
+    assert registry.lookup("db", ["t"]) == {"t": None}
+
+
+def test_s3_store_round_trip(s3):
+    registry = SchemaRegistry(S3SchemaStore(s3, "test-bucket", "_job_state/schema_registry/"))
+    entry = schema_entry(glue_table([("a", "int")]))
+
+    registry.register("db", {"t": entry})
+
+    assert s3.list_objects_v2(Bucket="test-bucket")["Contents"][0]["Key"] == "_job_state/schema_registry/db/t.json"
+    assert registry.lookup("db", ["t", "other"]) == {"t": entry, "other": None}
+    registry.forget("db", ["t"])
+    assert registry.lookup("db", ["t"]) == {"t": None}
@@ -0,0 +1,105 @@
+from datetime import date
+
+import pyarrow as pa
+import pytest
+
+import mondays
+from config import JobConfig
+from monday_client import MondayClient
+from sharding import Shard, created_at_rules, group_rules, merge_shards, parse_shards, plan_shards
+
+from tests.unit.fake_monday import FakeMondayServer, make_board
+
+
+def test_parse_shards():
+    assert parse_shards("1=group:3, 2=created_at:4,3=group") == {
+        "1": ("group", 3), "2": ("created_at", 4), "3": ("group", 2),
+    }
+    assert parse_shards("") == {}
+    with pytest.raises(ValueError):
+        parse_shards("1=id:3")
+
+
+def test_plan_shards_expands_sharded_boards_in_order():
+    plan = plan_shards(["1", "2"], {"1": ("group", 2)})
+
+    assert plan == [Shard("1", "group", 0, 2), Shard("1", "group", 1, 2), Shard("2")]
+    assert [shard.key for shard in plan] == ["1.0", "1.1", "2"]
+
+
+def test_group_rules_deal_groups_round_robin():
+    groups = [{"id": g} for g in ["a", "b", "c"]]
+
+    assert group_rules(Shard("1", "group", 0, 2), groups)[0]["compare_value"] == ["a", "c"]
+    assert group_rules(Shard("1", "group", 1, 2), groups)[0]["compare_value"] == ["b"]
+    assert group_rules(Shard("1", "group", 3, 4), groups) is None
+
+
+def test_created_at_rules_split_days_without_gaps():
+    first, last = date(2024, 1, 1), date(2024, 1, 10)
+    rules = [created_at_rules(Shard("1", "created_at", i, 3), first, last) for i in range(3)]
+
+    assert [(r["operator"], r["compare_value"][1]) for r in rules[0]] == [("lower_than", "2024-01-04")]
+    assert [(r["operator"], r["compare_value"][1]) for r in rules[1]] == [
+        ("greater_than_or_equals", "2024-01-04"), ("lower_than", "2024-01-07"),
+    ]
+    assert [(r["operator"], r["compare_value"][1]) for r in rules[2]] == [("greater_than_or_equals", "2024-01-07")]
+
+
+def test_merge_shards_keeps_newest_copy():
+    a = pa.table({"id": ["1", "2"], "updated_at": ["2024-01-01", "2024-01-05"]})
+    b = pa.table({"id": ["2", "3"], "updated_at": ["2024-01-02", "2024-01-03"]})
+
+    merged = merge_shards([a, b])
+
+    assert sorted(zip(merged["id"].to_pylist(), merged["updated_at"].to_pylist())) == [
+        ("1", "2024-01-01"), ("2", "2024-01-05"), ("3", "2024-01-03"),
+    ]
+
+
+def big_board():
+    board = make_board("111", 900, groups=("new", "done", "archived"))
+    for i, item in enumerate(board["items"]):
+        item["created_at"] = f"2024-01-{i % 30 + 1:02d}T00:00:00Z"
+    return board
+
+
+@pytest.mark.parametrize("mode", ["group", "created_at"])
+def test_sharded_board_matches_whole_board(mode):
+    board = big_board()
+    with FakeMondayServer({"111": board}) as fake, MondayClient(fake.url, "api-key") as client:
+        shards = plan_shards(["111"], {"111": (mode, 4)})
+        tables, failures = mondays.extract_boards(client, ["111"], max_workers=4, shards=shards)
+        filtered = [
+            r for r in fake.requests
+            if "items_page" in r["query"] and (r["variables"].get("query_params") or {}).get("rules")
+        ]
+
+    assert failures == {}
+    assert sorted(tables["111"]["id"].to_pylist()) == sorted(item["id"] for item in board["items"])
+    assert len(filtered) >= 3
+
+
+def test_duplicate_items_across_slices_are_merged(monkeypatch):
+    board = big_board()
+    # Pretend every slice also sees the first item, as if it moved between groups mid-run.
+    iter_board_pages = mondays.iter_board_pages
+
+    def with_duplicate(client, board_id, *args, **kwargs):
+        for n, (items, cursor) in enumerate(iter_board_pages(client, board_id, *args, **kwargs)):
+            yield ([board["items"][0]] + items if n == 0 else items), cursor
+
+    monkeypatch.setattr(mondays, "iter_board_pages", with_duplicate)
+    with FakeMondayServer({"111": board}) as fake, MondayClient(fake.url, "api-key") as client:
+        shards = plan_shards(["111"], {"111": ("group", 3)})
+        tables, _ = mondays.extract_boards(client, ["111"], shards=shards)
+
+    assert tables["111"].num_rows == 900
+
+
+def test_array_child_takes_one_slice():
+    config = JobConfig(board_ids=["1", "2"], shards="1=created_at:3", array_index=2)
+
+    assert [shard.key for shard in config.shard_plan] == ["1.0", "1.1", "1.2", "2"]
+    assert config.task_shards == [Shard("1", "created_at", 2, 3)]
+    assert config.task_board_ids == ["1"]
@@ -0,0 +1,32 @@
+import pytest
+
+from state import JsonState
+
+
+def test_local_state_round_trip(tmp_path):
+    state = JsonState(str(tmp_path / "nested" / "state.json"))
+
+    assert state.load(default={}) == {}
+    state.save({"42": {"watermark": "2024-01-01T00:00:00Z"}})
+
+    assert state.load() == {"42": {"watermark": "2024-01-01T00:00:00Z"}}
+    assert not (tmp_path / "nested" / "state.json.tmp").exists()
+
+
+def test_s3_state_round_trip(s3):
+    state = JsonState("s3://test-bucket/_job_state/state.json", s3_client=s3)
+
+    assert state.load() is None
+    state.save({"a": 1})
+
+    assert state.load() == {"a": 1}
+
+
+@pytest.mark.parametrize("location", ["local", "s3"])
+def test_save_if_absent_keeps_the_first_document(location, tmp_path, s3):
+    path = str(tmp_path / "layout.json") if location == "local" else "s3://test-bucket/_job_state/layout.json"
+    state = JsonState(path, s3_client=s3)
+
+    assert state.save_if_absent({"first_day": "2024-01-01"}) == {"first_day": "2024-01-01"}
+    assert state.save_if_absent({"first_day": "2024-02-01"}) == {"first_day": "2024-01-01"}
+    assert state.load() == {"first_day": "2024-01-01"}
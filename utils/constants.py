@@ -2,4 +2,39 @@ ECR_REPO_NAME='TestRepo'
 S3_BUCKET_NAME='cdk-batch-s3-glue-test-bucket'
 SNS_TOPIC="MondaySchemaChange"
 LAMBDA_NAME="MondaySchemaChangeHandler"
-LAMBDA_IAM_ROLE="SchemaChangeExecutionRole"
\ No newline at end of file
+LAMBDA_IAM_ROLE="SchemaChangeExecutionRole"
+# ids for  [monday_listings board, monday_dispositions PGY, monday_dispositions SLD]
+MONDAY_BOARD_IDS=["6255740472", "6058656936", "6125794481"]
+# board id -> (mode, count) for boards split across several array children, e.g. {"6255740472": ("created_at", 4)}
+MONDAY_SHARDS={}
+# S3 prefix for schema change reports too large for SNS and for pending digests
+SCHEMA_REPORT_PREFIX="_job_state/schema_reports/"
+# coalesce schema change notifications over this many minutes; 0 sends one per crawl
+SCHEMA_DIGEST_MINUTES=0
+# S3 prefix for the last seen schema of each crawled table
+SCHEMA_REGISTRY_PREFIX="_job_state/schema_registry/"
+# only objects created under these prefixes trigger a Glue crawl
+GLUE_CRAWL_PREFIXES=["monday.com/items/", "monday.com/items_delta/"]
+# let the batch job add partitions itself when its output schema is unchanged (see src/schema_check.py)
+MONDAY_SCHEMA_PRECHECK=True
+# start one crawl per this many new objects, or after this many seconds, whichever comes first
+GLUE_EVENT_BATCH_SIZE=100
+GLUE_EVENT_BATCH_WINDOW_SECONDS=900
+# files the crawler reads per leaf folder (None reads them all); the job writes one schema per run
+GLUE_CRAWLER_SAMPLE_SIZE=10
+# glob patterns the crawler skips under every prefix, e.g. ["**/_SUCCESS"]
+GLUE_CRAWLER_EXCLUSIONS=[]
+# resources of each array child; boards listed in MONDAY_BOARD_PROFILES run with a named profile instead
+BATCH_JOB_CPU=0.25
+BATCH_JOB_MEMORY_MIB=512
+# local disk for each child in GiB (21-200); None keeps Fargate's default 20 GiB
+BATCH_JOB_EPHEMERAL_STORAGE_GIB=None
+# profile name -> (cpu, memory_mib, ephemeral_storage_gib), each a valid Fargate size
+BATCH_JOB_PROFILES={"large": (2, 8192, 50)}
+# board id -> profile name for the boards too heavy for the default size, e.g. {"6255740472": "large"}
+MONDAY_BOARD_PROFILES={}
+# jobs run on Fargate Spot up to BATCH_SPOT_MAX_VCPUS, then fall back to on-demand Fargate
+BATCH_USE_SPOT=True
+BATCH_SPOT_MAX_VCPUS=16
+BATCH_ON_DEMAND_MAX_VCPUS=8
+BATCH_RETRY_ATTEMPTS=3